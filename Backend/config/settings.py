@@ -162,6 +162,17 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Nearby-store search: 'db' (geohash/bounding-box prefilter in SQL) or
+# 'memory' (process-local NumPy snapshot, see stores/snapshot.py)
+STORE_GEO_ENGINE = config('STORE_GEO_ENGINE', default='db')
+# Seconds before a 'memory' snapshot is rebuilt even without a Store signal
+# (changes made by other worker processes or by bulk updates)
+STORE_SNAPSHOT_TTL = config('STORE_SNAPSHOT_TTL', default=60, cast=float)
+
+# Seconds an inventory import's error CSV (MEDIA_ROOT/inventory_imports/) is
+# kept; older files are purged on the next import or by purge_import_errors
+INVENTORY_IMPORT_ERRORS_MAX_AGE = config('INVENTORY_IMPORT_ERRORS_MAX_AGE', default=7 * 24 * 3600, cast=int)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
@@ -0,0 +1,195 @@
+"""
+Streaming inventory import from CSV or NDJSON files.
+
+Rows are read one at a time, validated with InventoryBulkUpdateSerializer and
+written through services.bulk_upsert in chunks, each chunk in its own
+transaction, so memory use stays flat however large the file is. A row that
+fails is written to the error CSV (line, medicine_id, error) and the import
+carries on; chunks already written stay written if a later row fails.
+
+CSV files need a header row with the InventoryBulkUpdateSerializer fields:
+
+    medicine_id,price,available,stock_qty
+    12,45.50,true,30
+
+NDJSON files hold one JSON object with the same keys per line.
+
+Error CSVs of API imports are kept in default_storage under IMPORT_ERRORS_DIR
+for settings.INVENTORY_IMPORT_ERRORS_MAX_AGE seconds (purge_error_files).
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from . import services
+from .serializers import InventoryBulkUpdateSerializer
+
+FORMATS = ('csv', 'ndjson')
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+ERROR_FIELDS = ['line', 'medicine_id', 'error']
+REQUIRED_FIELDS = list(InventoryBulkUpdateSerializer().fields)
+# Per-row error files of API imports, in default_storage
+IMPORT_ERRORS_DIR = 'inventory_imports'
+
+
+class InvalidImportFile(ValueError):
+    """The file cannot be imported at all (unknown format, bad header, not UTF-8)."""
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+
+
+def detect_format(filename):
+    """Import format from a file name's extension, or None."""
+    name = (filename or '').lower()
+    for extension, fmt in EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return None
+
+
+def _iter_records(stream, fmt):
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = [name for name in REQUIRED_FIELDS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise InvalidImportFile(f"CSV header is missing: {', '.join(missing)}")
+        for row in reader:
+            if None in row:
+                yield reader.line_num, row, 'Too many columns'
+            else:
+                yield reader.line_num, row, None
+    else:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, None, 'Invalid JSON'
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, 'Expected a JSON object'
+            else:
+                yield line_no, row, None
+
+
+def iter_rows(stream, fmt):
+    """
+    (line number, row dict or None, error message or None) for each record
+    of a binary `stream`, decoded and parsed incrementally.
+    """
+    if fmt not in FORMATS:
+        raise InvalidImportFile(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    # newline='' keeps line breaks inside quoted CSV fields intact
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from _iter_records(text, fmt)
+    except UnicodeDecodeError:
+        raise InvalidImportFile('File is not UTF-8 encoded')
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def _format_errors(errors):
+    return '; '.join(f"{field}: {' '.join(str(m) for m in messages)}" for field, messages in errors.items())
+
+
+def iter_import(store_id, stream, fmt, errors, chunk_size=services.UPSERT_CHUNK_SIZE):
+    """
+    Import inventory rows for a store from a binary `stream` in `fmt`,
+    yielding the running ImportResult after each chunk is written and once
+    more at the end if rows were read since; the last one is the final total.
+    The same object is yielded each time, updated in place.
+
+    Failed rows are written to `errors`, a text file, as CSV with a header.
+    Raises InvalidImportFile if the file cannot be read.
+    """
+    result = ImportResult()
+    reported = None
+    writer = csv.writer(errors)
+    writer.writerow(ERROR_FIELDS)
+    chunk = []
+
+    def fail(line_no, row, message):
+        result.failed += 1
+        writer.writerow([line_no, row.get('medicine_id', '') if isinstance(row, dict) else '', message])
+
+    def flush():
+        missing = set(services.missing_medicine_ids(item['medicine_id'] for _, _, item in chunk))
+        items = []
+        for line_no, row, item in chunk:
+            if item['medicine_id'] in missing:
+                fail(line_no, row, 'Unknown medicine_id')
+            else:
+                items.append(item)
+        created, updated = services.bulk_upsert(store_id, items)
+        result.created += created
+        result.updated += updated
+        chunk.clear()
+
+    for line_no, row, error in iter_rows(stream, fmt):
+        result.rows += 1
+        if error is None:
+            serializer = InventoryBulkUpdateSerializer(data=row)
+            if serializer.is_valid():
+                chunk.append((line_no, row, serializer.validated_data))
+                if len(chunk) >= chunk_size:
+                    flush()
+                    reported = result.rows
+                    yield result
+                continue
+            error = _format_errors(serializer.errors)
+        fail(line_no, row, error)
+    if chunk:
+        flush()
+    if result.rows != reported:
+        yield result
+
+
+def import_inventory(store_id, stream, fmt, errors, chunk_size=services.UPSERT_CHUNK_SIZE, progress=None):
+    """
+    iter_import() run to completion: `progress(result)` is called with each
+    result it yields. Returns the final ImportResult.
+    """
+    result = ImportResult()
+    for result in iter_import(store_id, stream, fmt, errors, chunk_size):
+        if progress is not None:
+            progress(result)
+    return result
+
+
+def purge_error_files(max_age=None):
+    """
+    Delete error files in IMPORT_ERRORS_DIR older than `max_age` seconds
+    (default settings.INVENTORY_IMPORT_ERRORS_MAX_AGE). Returns the count.
+    """
+    if max_age is None:
+        max_age = settings.INVENTORY_IMPORT_ERRORS_MAX_AGE
+    try:
+        _, names = default_storage.listdir(IMPORT_ERRORS_DIR)
+    except FileNotFoundError:
+        return 0
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    purged = 0
+    for name in names:
+        path = f'{IMPORT_ERRORS_DIR}/{name}'
+        try:
+            if default_storage.get_modified_time(path) < cutoff:
+                default_storage.delete(path)
+                purged += 1
+        except FileNotFoundError:
+            pass  # removed by a concurrent purge
+    return purged
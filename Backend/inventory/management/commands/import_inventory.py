@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import importer, services
+from stores.models import Store
+
+
+class Command(BaseCommand):
+    help = "Import a store's inventory from a CSV or NDJSON file, streamed in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('store_id', type=int, help='Store to import into')
+        parser.add_argument('path', help="CSV/NDJSON file to import ('-' reads stdin)")
+        parser.add_argument(
+            '--format',
+            choices=importer.FORMATS,
+            help='File format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--errors',
+            help='Where to write the per-row error CSV (default: <path>.errors.csv, '
+                 'or inventory_import.errors.csv when reading stdin)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=services.UPSERT_CHUNK_SIZE,
+            help=f'Rows validated and written per transaction (default: {services.UPSERT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        store_id = options['store_id']
+        if not Store.objects.filter(pk=store_id).exists():
+            raise CommandError(f'Store {store_id} not found')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        path = options['path']
+        fmt = options['format'] or importer.detect_format(path)
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+        errors_path = Path(options['errors'] or (
+            'inventory_import.errors.csv' if path == '-' else f'{path}.errors.csv'
+        ))
+
+        def progress(result):
+            self.stdout.write(
+                f'{result.rows} rows read: {result.created} created, '
+                f'{result.updated} updated, {result.failed} failed'
+            )
+
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+        try:
+            with errors_path.open('w', encoding='utf-8', newline='') as errors:
+                result = importer.import_inventory(
+                    store_id, stream, fmt, errors,
+                    chunk_size=options['chunk_size'], progress=progress,
+                )
+        except importer.InvalidImportFile as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+        summary = (f'Imported {result.rows} rows into store {store_id}: {result.created} created, '
+                   f'{result.updated} updated, {result.failed} failed')
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'{summary}. Errors written to {errors_path}'))
+        else:
+            errors_path.unlink()
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import importer
+
+
+class Command(BaseCommand):
+    help = "Delete inventory import error files older than INVENTORY_IMPORT_ERRORS_MAX_AGE"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=settings.INVENTORY_IMPORT_ERRORS_MAX_AGE,
+            help='Age in seconds above which error files are deleted '
+                 f'(default: INVENTORY_IMPORT_ERRORS_MAX_AGE, {settings.INVENTORY_IMPORT_ERRORS_MAX_AGE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['max_age'] < 0:
+            raise CommandError('--max-age must not be negative')
+        purged = importer.purge_error_files(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {purged} import error files'))
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['medicine', 'available'], name='inventory_med_avail_idx'),
+        ),
+        migrations.AlterField(
+            model_name='inventory',
+            name='medicine',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inventory_items', to='medicines.medicine'),
+        ),
+    ]
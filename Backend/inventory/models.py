@@ -1,19 +1,67 @@
 from django.db import models
 
+from stores import geo
+from stores.models import KNN_START_RADIUS_KM, bounding_box_q
+
+
+def nearby_sort_key(distance, price, pk):
+    """Order of nearby results: nearest first, then cheapest (unpriced last), then id."""
+    return (distance, price is None, price if price is not None else 0, pk)
+
+
+class InventoryQuerySet(models.QuerySet):
+    def in_stock_near(self, latitude, longitude, radius_km, limit, after=None):
+        """
+        Up to `limit` available items at stores within `radius_km`, in
+        nearby_sort_key order, each with a `distance` (km) attribute and its
+        store loaded. `after` is the sort key of the last item of the previous
+        page; only items after it are returned.
+
+        One query per search radius: (medicine, available) narrows the
+        inventory rows and the store bounding box is joined in the same
+        statement. Like StoreQuerySet.nearest, the radius starts small (just
+        past the previous page) and grows until a page is filled.
+        """
+        start = after[0] if after else 0.0
+        radius = min(start + KNN_START_RADIUS_KM, radius_km)
+        queryset = self.filter(available=True).select_related('store')
+        while True:
+            items = []
+            for item in queryset.filter(bounding_box_q(latitude, longitude, radius, prefix='store__')):
+                distance = geo.haversine_km(latitude, longitude, item.store.latitude, item.store.longitude)
+                if distance > radius:
+                    continue
+                item.distance = distance
+                if after is None or nearby_sort_key(distance, item.price, item.pk) > after:
+                    items.append(item)
+            # Complete within `radius`, so with `limit` hits these come first
+            if len(items) >= limit or radius >= radius_km:
+                items.sort(key=lambda i: nearby_sort_key(i.distance, i.price, i.pk))
+                return items[:limit]
+            radius = min(start + (radius - start) * 4, radius_km)
+
 
 class Inventory(models.Model):
     """Store inventory for medicines."""
     
     store = models.ForeignKey('stores.Store', on_delete=models.CASCADE, related_name='inventory_items')
-    medicine = models.ForeignKey('medicines.Medicine', on_delete=models.CASCADE, related_name='inventory_items')
+    # Indexed through inventory_med_avail_idx (medicine first) instead of its own index
+    medicine = models.ForeignKey('medicines.Medicine', on_delete=models.CASCADE, related_name='inventory_items',
+                                 db_index=False)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     available = models.BooleanField(default=False)
     stock_qty = models.IntegerField(null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)
+
+    objects = InventoryQuerySet.as_manager()
     
     class Meta:
         db_table = 'inventory'
         unique_together = ('store', 'medicine')
+        indexes = [
+            # "Which stores have this medicine in stock" lookups
+            models.Index(fields=['medicine', 'available'], name='inventory_med_avail_idx'),
+        ]
         
     def __str__(self):
         return f"{self.store.name} - {self.medicine.name_en}"
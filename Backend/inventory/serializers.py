@@ -24,3 +24,15 @@ class InventoryBulkUpdateSerializer(serializers.Serializer):
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
     available = serializers.BooleanField()
     stock_qty = serializers.IntegerField()
+
+
+class InventoryNearbySerializer(serializers.ModelSerializer):
+    """Serializer for in-stock items near a location, with store and distance"""
+    store = StoreSerializer(read_only=True)
+    medicine_id = serializers.IntegerField(read_only=True)
+    distance = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    
+    class Meta:
+        model = Inventory
+        fields = ['id', 'medicine_id', 'price', 'stock_qty', 'last_updated',
+                  'distance', 'store']
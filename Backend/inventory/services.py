@@ -0,0 +1,70 @@
+"""
+Set-based inventory writes.
+
+`bulk_upsert` replaces per-item `update_or_create` (a SELECT plus an INSERT
+or UPDATE for every row) with one existence query and one
+INSERT ... ON CONFLICT (store, medicine) DO UPDATE per chunk of items.
+"""
+from django.db import transaction
+
+from medicines.models import Medicine
+from .models import Inventory
+
+# Rows per INSERT; also bounds the size of the IN (...) lists on SQLite
+UPSERT_CHUNK_SIZE = 500
+UPSERT_FIELDS = ['price', 'available', 'stock_qty', 'last_updated']
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def missing_medicine_ids(medicine_ids, chunk_size=UPSERT_CHUNK_SIZE):
+    """Ids from `medicine_ids` that have no Medicine row, sorted."""
+    wanted = sorted(set(medicine_ids))
+    found = set()
+    for chunk in _chunks(wanted, chunk_size):
+        found.update(Medicine.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    return [pk for pk in wanted if pk not in found]
+
+
+def bulk_upsert(store_id, items, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    Create or update a store's inventory from validated
+    InventoryBulkUpdateSerializer data, in one transaction.
+
+    Returns (created, updated), counted the way per-item update_or_create
+    would: an item is created if its (store, medicine) row did not exist
+    before, and a repeated medicine_id counts as an update (last one wins).
+    Medicine ids must already be checked with missing_medicine_ids().
+    """
+    # One row per medicine: a single INSERT ... ON CONFLICT may not touch a row twice
+    latest = {}
+    for item in items:
+        latest[item['medicine_id']] = item
+
+    created = 0
+    with transaction.atomic():
+        for chunk in _chunks(list(latest.values()), chunk_size):
+            medicine_ids = [item['medicine_id'] for item in chunk]
+            existing = Inventory.objects.filter(
+                store_id=store_id, medicine_id__in=medicine_ids
+            ).count()
+            created += len(chunk) - existing
+            Inventory.objects.bulk_create(
+                [
+                    Inventory(
+                        store_id=store_id,
+                        medicine_id=item['medicine_id'],
+                        price=item['price'],
+                        available=item['available'],
+                        stock_qty=item['stock_qty'],
+                    )
+                    for item in chunk
+                ],
+                update_conflicts=True,
+                unique_fields=['store', 'medicine'],
+                update_fields=UPSERT_FIELDS,
+            )
+    return created, len(items) - created
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from medicines.models import Medicine
+from stores import geo
+from stores.models import Store
+from . import importer, services
+from .models import Inventory, nearby_sort_key
+from .views import _decode_cursor, _encode_cursor
+
+
+class InventoryAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        owner = get_user_model().objects.create_user(email='owner@example.com')
+        self.client.force_authenticate(owner)
+        self.store = Store.objects.create(name='Apollo', address='MG Road', latitude=17.385, longitude=78.4867)
+        self.medicines = Medicine.objects.bulk_create(
+            [Medicine(name_en=f'Medicine {i}') for i in range(10)]
+        )
+
+
+class NearbyTests(InventoryAPITestCase):
+    CENTER = (17.385, 78.4867)
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:inventory-nearby')
+        self.medicine, other = self.medicines[:2]
+        self.medicine.name_te = 'పారాసెటమాల్'
+        self.medicine.save()
+        rng = random.Random(7)
+        stores = []
+        for i in range(120):
+            # Pairs of stores at the same spot make distance ties; prices tie within them
+            if i % 2 == 0:
+                latitude = Decimal(f'{self.CENTER[0] + rng.uniform(-0.15, 0.15):.6f}')
+                longitude = Decimal(f'{self.CENTER[1] + rng.uniform(-0.15, 0.15):.6f}')
+            stores.append(Store(name=f'Store {i}', address='-', latitude=latitude, longitude=longitude,
+                                geohash=geo.encode_geohash(latitude, longitude)))
+        stores = Store.objects.bulk_create(stores)
+        items = []
+        for store in stores:
+            price = rng.choice([None, Decimal('10.00'), Decimal('12.50'), Decimal(rng.randint(100, 999)) / 100])
+            items.append(Inventory(store=store, medicine=self.medicine, price=price,
+                                   available=rng.random() < 0.8, stock_qty=rng.randint(0, 20)))
+            items.append(Inventory(store=store, medicine=other, price=1, available=True))
+        Inventory.objects.bulk_create(items)
+
+    def brute_force(self, radius_km):
+        hits = []
+        for item in Inventory.objects.filter(medicine=self.medicine, available=True).select_related('store'):
+            distance = geo.haversine_km(*self.CENTER, item.store.latitude, item.store.longitude)
+            if distance <= radius_km:
+                hits.append((nearby_sort_key(distance, item.price, item.pk), item.pk))
+        return [pk for _, pk in sorted(hits)]
+
+    def pages(self, params):
+        response = self.client.get(self.url, {'latitude': self.CENTER[0], 'longitude': self.CENTER[1], **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            yield response.json()['results']
+            if response.json()['next'] is None:
+                return
+            response = self.client.get(response.json()['next'].replace('http://testserver', ''))
+
+    def test_pages_follow_brute_force_order(self):
+        for radius_km, page_size, min_pages in ((5, 2, 3), (10, 7, 4), (25, 100, 1)):
+            with self.subTest(radius_km=radius_km, page_size=page_size):
+                pages = list(self.pages({'medicine_id': self.medicine.pk, 'radius_km': radius_km,
+                                         'page_size': page_size}))
+                self.assertGreaterEqual(len(pages), min_pages)
+                self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+                ids = [item['id'] for page in pages for item in page]
+                self.assertEqual(ids, self.brute_force(radius_km))
+
+    def test_lookup_by_telugu_name(self):
+        results = next(self.pages({'medicine': 'పారాసెటమాల్', 'radius_km': 25, 'page_size': 100}))
+        self.assertEqual([item['id'] for item in results], self.brute_force(25)[:100])
+        self.assertEqual({item['medicine_id'] for item in results}, {self.medicine.pk})
+        self.assertIn('name', results[0]['store'])
+
+    def test_cursor_round_trip(self):
+        item = Inventory.objects.filter(medicine=self.medicine).first()
+        for distance, price in ((0.0, None), (1 / 3, Decimal('12.50')), (2.123456789012345, Decimal('0.10'))):
+            item.distance, item.price = distance, price
+            self.assertEqual(_decode_cursor(_encode_cursor(item)), nearby_sort_key(distance, price, item.pk))
+
+    def test_invalid_requests(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        base = {'latitude': self.CENTER[0], 'longitude': self.CENTER[1], 'medicine_id': self.medicine.pk}
+        cases = [
+            {'medicine_id': ''},
+            {'latitude': 'north'},
+            {'radius_km': 0},
+            {'page_size': 0},
+            {'page_size': 101},
+            {'cursor': '%%%'},
+            {'cursor': encode('1.0:2.0')},
+            {'cursor': encode('nan:1:1')},
+            {'cursor': encode('1.0:inf:1')},
+            {'cursor': encode('1.0:x:1')},
+        ]
+        for params in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, {**base, **params}).status_code, 400)
+
+
+class BulkUpsertTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:inventory-bulk-upsert')
+
+    def item(self, medicine, price='5.00', available=True, stock_qty=1):
+        return {'medicine_id': medicine.pk, 'price': price, 'available': available, 'stock_qty': stock_qty}
+
+    def test_counts_match_update_or_create(self):
+        for medicine in self.medicines[:4]:
+            Inventory.objects.create(store=self.store, medicine=medicine, price=1, available=False)
+        items = [self.item(m) for m in self.medicines]
+        # A repeated medicine counts as an update and the last one wins
+        items.append(self.item(self.medicines[9], price='7.25', stock_qty=9))
+
+        response = self.client.post(self.url, {'store_id': self.store.pk, 'items': items}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['updated']), (6, 5))
+        self.assertEqual(Inventory.objects.filter(store=self.store).count(), 10)
+        last = Inventory.objects.get(store=self.store, medicine=self.medicines[9])
+        self.assertEqual((last.price, last.stock_qty), (Decimal('7.25'), 9))
+        self.assertTrue(Inventory.objects.get(store=self.store, medicine=self.medicines[0]).available)
+
+    def test_chunked_upsert(self):
+        Inventory.objects.create(store=self.store, medicine=self.medicines[5], price=1)
+        items = [{**self.item(m), 'price': Decimal('2.00')} for m in self.medicines]
+        self.assertEqual(services.bulk_upsert(self.store.pk, items, chunk_size=3), (9, 1))
+        self.assertEqual(services.bulk_upsert(self.store.pk, items, chunk_size=4), (0, 10))
+        # Other stores' rows for the same medicines are untouched
+        other = Store.objects.create(name='Other', address='-', latitude=0, longitude=0)
+        self.assertEqual(services.bulk_upsert(other.pk, items[:2]), (2, 0))
+        self.assertEqual(Inventory.objects.count(), 12)
+
+    def test_missing_medicine_ids(self):
+        known = [m.pk for m in self.medicines]
+        self.assertEqual(services.missing_medicine_ids(known + [999998, 999999, 999998], chunk_size=4),
+                         [999998, 999999])
+        self.assertEqual(services.missing_medicine_ids(known), [])
+
+    def test_rejected_requests_write_nothing(self):
+        valid = self.item(self.medicines[0])
+        cases = [
+            ({'items': [valid]}, 'store_id is required'),
+            ({'store_id': 999999, 'items': [valid]}, 'Store 999999 not found'),
+            ({'store_id': 'abc', 'items': [valid]}, 'Store abc not found'),
+            ({'store_id': self.store.pk, 'items': [valid, {**valid, 'medicine_id': 999999}]}, 'Unknown medicine_id'),
+        ]
+        for data, error in cases:
+            with self.subTest(data=data):
+                response = self.client.post(self.url, data, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], error)
+        self.assertEqual(response.json()['medicine_ids'], [999999])
+
+        response = self.client.post(self.url, {'store_id': self.store.pk, 'items': [{**valid, 'price': 'x'}]},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Inventory.objects.exists())
+
+
+class ImportFileTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Error files are written to a fresh MEDIA_ROOT per test
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def post(self, name, content, query=''):
+        return self.client.post(
+            reverse('inventory:inventory-import-file') + query,
+            {'store_id': self.store.pk, 'file': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+
+    def error_rows(self, url):
+        download = self.client.get(url.replace('http://testserver', ''))
+        self.assertEqual(download.status_code, 200)
+        text = b''.join(download.streaming_content).decode('utf-8')
+        return list(csv.DictReader(io.StringIO(text)))
+
+    def test_csv_import_with_error_rows(self):
+        first, second = self.medicines[:2]
+        Inventory.objects.create(store=self.store, medicine=first, price=1, available=False)
+        content = (
+            '﻿medicine_id,price,available,stock_qty,note\r\n'
+            f'{first.pk},10.50,true,5,"multi\nline, quoted"\r\n'
+            f'{second.pk},20,false,0,\r\n'
+            'abc,1,true,1,\r\n'
+            '999999,1,true,1,\r\n'
+            f'{second.pk},1,true,1,x,extra\r\n'
+        ).encode('utf-8')
+        response = self.post('stock.csv', content)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            {k: body[k] for k in ('rows', 'created', 'updated', 'failed')},
+            {'rows': 5, 'created': 1, 'updated': 1, 'failed': 3},
+        )
+        item = Inventory.objects.get(store=self.store, medicine=first)
+        self.assertEqual((str(item.price), item.available, item.stock_qty), ('10.50', True, 5))
+
+        # Line numbers count physical lines; unknown ids are reported when their chunk is written
+        errors = {row['line']: row for row in self.error_rows(body['error_file'])}
+        self.assertEqual(sorted(errors), ['5', '6', '7'])
+        self.assertIn('medicine_id', errors['5']['error'])
+        self.assertEqual((errors['6']['medicine_id'], errors['6']['error']), ('999999', 'Unknown medicine_id'))
+        self.assertEqual(errors['7']['error'], 'Too many columns')
+
+    def test_ndjson_import_with_error_rows(self):
+        medicine = self.medicines[0]
+        lines = [
+            json.dumps({'medicine_id': medicine.pk, 'price': '9.99', 'available': True, 'stock_qty': 3}),
+            '',
+            '{bad',
+            '[1]',
+            json.dumps({'medicine_id': medicine.pk, 'price': 'x', 'available': True, 'stock_qty': 1}),
+        ]
+        response = self.post('stock.jsonl', '\n'.join(lines).encode())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (1, 3))
+        errors = self.error_rows(response.json()['error_file'])
+        self.assertEqual(
+            [(row['line'], row['error']) for row in errors[:2]],
+            [('3', 'Invalid JSON'), ('4', 'Expected a JSON object')],
+        )
+        self.assertEqual(errors[2]['line'], '5')
+
+    def test_clean_import_has_no_error_file(self):
+        content = 'medicine_id,price,available,stock_qty\n' + ''.join(
+            f'{m.pk},1.00,true,1\n' for m in self.medicines
+        )
+        response = self.post('stock.csv', content.encode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['created'], response.json()['error_file']), (10, None))
+
+    def test_unreadable_files_are_rejected(self):
+        cases = [
+            ('stock.txt', b'medicine_id,price,available,stock_qty\n'),
+            ('stock.csv', b'medicine_id,price\n1,2\n'),
+            ('stock.csv', b'medicine_id,price,available,stock_qty\n\xff\xfe,1,true,1\n'),
+        ]
+        for name, content in cases:
+            for query in ('', '?stream=true'):
+                with self.subTest(name=name, content=content, query=query):
+                    response = self.post(name, content, query)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('error', response.json())
+        self.assertFalse(Inventory.objects.exists())
+
+    def test_missing_store_and_file(self):
+        url = reverse('inventory:inventory-import-file')
+        response = self.client.post(url, {'store_id': self.store.pk}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            url, {'store_id': 999999, 'file': SimpleUploadedFile('stock.csv', b'')}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_streamed_progress(self):
+        Medicine.objects.bulk_create([Medicine(name_en=f'Bulk {i}') for i in range(1190)])
+        ids = list(Medicine.objects.values_list('pk', flat=True))
+        content = 'medicine_id,price,available,stock_qty\n' + ''.join(
+            f'{pk},1.00,true,1\n' for pk in ids
+        ) + '999999,1,true,1\n'
+        response = self.post('stock.csv', content.encode(), '?stream=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        # Running totals after each chunk of 500 rows, the remainder, then the summary
+        self.assertEqual([line['rows'] for line in lines], [500, 1000, 1201, 1201])
+        summary = lines[-1]
+        self.assertEqual((summary['message'], summary['created'], summary['failed']), ('Import finished', 1200, 1))
+        self.assertEqual(self.error_rows(summary['error_file'])[0]['medicine_id'], '999999')
+
+    def test_abandoned_stream_closes_error_file(self):
+        opened = []
+        real_temporary_file = tempfile.TemporaryFile
+
+        def temporary_file(*args, **kwargs):
+            opened.append(real_temporary_file(*args, **kwargs))
+            return opened[-1]
+
+        with mock.patch('inventory.views.tempfile.TemporaryFile', temporary_file):
+            response = self.post('stock.csv', b'medicine_id,price,available,stock_qty\nabc,1,true,1\n',
+                                 '?stream=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(opened[0].closed)
+        # The client goes away before reading anything
+        response.close()
+        self.assertTrue(opened[0].closed)
+
+    def test_expired_error_files_are_purged(self):
+        old = default_storage.save(f'{importer.IMPORT_ERRORS_DIR}/{"a" * 32}.csv', ContentFile(b'x'))
+        recent = default_storage.save(f'{importer.IMPORT_ERRORS_DIR}/{"b" * 32}.csv', ContentFile(b'x'))
+        expired = time.time() - 2 * 24 * 3600
+        os.utime(default_storage.path(old), (expired, expired))
+
+        with override_settings(INVENTORY_IMPORT_ERRORS_MAX_AGE=24 * 3600):
+            # Saving a new error file purges the expired ones
+            response = self.post('stock.csv', b'medicine_id,price,available,stock_qty\nabc,1,true,1\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(recent))
+
+        out = io.StringIO()
+        call_command('purge_import_errors', '--max-age', '0', stdout=out)
+        self.assertIn('Deleted 2 import error files', out.getvalue())
+        self.assertEqual(default_storage.listdir(importer.IMPORT_ERRORS_DIR)[1], [])
+
+
+class ImportCommandTests(InventoryAPITestCase):
+    def test_import_from_file(self):
+        medicine = self.medicines[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stock.ndjson')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'medicine_id': medicine.pk, 'price': '5', 'available': True, 'stock_qty': 2}))
+                f.write('\n{bad\n')
+            out = io.StringIO()
+            call_command('import_inventory', self.store.pk, path, stdout=out)
+
+            self.assertIn('1 created, 0 updated, 1 failed', out.getvalue())
+            with open(f'{path}.errors.csv', encoding='utf-8') as f:
+                self.assertEqual(list(csv.reader(f))[1], ['2', '', 'Invalid JSON'])
+        self.assertTrue(Inventory.objects.filter(store=self.store, medicine=medicine).exists())
@@ -1,10 +1,106 @@
+import base64
+import io
+import itertools
+import json
+import logging
+import math
+import tempfile
+import uuid
+from dataclasses import asdict
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db import transaction
-from .models import Inventory
-from .serializers import InventorySerializer, InventoryBulkUpdateSerializer
+from rest_framework.utils.urls import replace_query_param
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from medicines.models import Medicine
+from stores.models import Store
+from stores.views import MAX_RADIUS_KM
+from . import importer, services
+from .models import Inventory, nearby_sort_key
+from .serializers import InventorySerializer, InventoryBulkUpdateSerializer, InventoryNearbySerializer
+
+NEARBY_PAGE_SIZE = 20
+NEARBY_MAX_PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+def _store_exists(store_id):
+    try:
+        return Store.objects.filter(pk=store_id).exists()
+    except (TypeError, ValueError):
+        return False
+
+
+def _save_import_errors(request, errors):
+    """Store an import's error CSV and return its download URL; purges expired ones."""
+    name = uuid.uuid4().hex
+    errors.flush()
+    errors.buffer.seek(0)
+    default_storage.save(f'{importer.IMPORT_ERRORS_DIR}/{name}.csv', File(errors.buffer))
+    importer.purge_error_files()
+    return request.build_absolute_uri(
+        reverse('inventory:inventory-import-errors', kwargs={'name': name})
+    )
+
+
+def _import_summary(request, result, errors):
+    return {
+        'message': 'Import finished',
+        **asdict(result),
+        'error_file': _save_import_errors(request, errors) if result.failed else None
+    }
+
+
+def _stream_import(request, store_id, stream, fmt, log_progress):
+    """
+    NDJSON body of a streamed import: running totals per chunk, then the
+    summary. The first next() imports the first chunk and yields nothing to
+    send; from then on the generator is started, so closing it (the server
+    does when the client goes away) always removes the error file.
+    """
+    errors = io.TextIOWrapper(tempfile.TemporaryFile(), encoding='utf-8', newline='')
+    try:
+        progress = importer.iter_import(store_id, stream, fmt, errors)
+        chunks = itertools.chain([next(progress)], progress)
+        yield ''
+        try:
+            for result in chunks:
+                log_progress(result)
+                yield json.dumps(asdict(result)) + '\n'
+            yield json.dumps(_import_summary(request, result, errors)) + '\n'
+        except importer.InvalidImportFile as exc:
+            # Chunks already written stay written
+            yield json.dumps({'error': str(exc), 'fatal': True}) + '\n'
+    finally:
+        errors.close()
+
+
+def _encode_cursor(item):
+    """Opaque cursor holding the sort key (distance, price, id) of a nearby item."""
+    raw = f"{item.distance!r}:{'' if item.price is None else item.price}:{item.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Sort key from a cursor made by _encode_cursor; ValueError if malformed."""
+    try:
+        distance, price, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        price = Decimal(price) if price else None
+    except InvalidOperation:
+        raise ValueError('invalid cursor')
+    distance = float(distance)
+    if not math.isfinite(distance) or (price is not None and not price.is_finite()):
+        raise ValueError('invalid cursor')
+    return nearby_sort_key(distance, price, int(pk))
 
 
 class InventoryViewSet(viewsets.ModelViewSet):
@@ -40,33 +136,164 @@ class InventoryViewSet(viewsets.ModelViewSet):
                 {'error': 'store_id is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not _store_exists(store_id):
+            return Response(
+                {'error': f'Store {store_id} not found'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = InventoryBulkUpdateSerializer(data=items, many=True)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Bulk upsert
-        created_count = 0
-        updated_count = 0
+        missing = services.missing_medicine_ids(item['medicine_id'] for item in serializer.validated_data)
+        if missing:
+            return Response(
+                {'error': 'Unknown medicine_id', 'medicine_ids': missing},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        with transaction.atomic():
-            for item_data in serializer.validated_data:
-                inventory, created = Inventory.objects.update_or_create(
-                    store_id=store_id,
-                    medicine_id=item_data['medicine_id'],
-                    defaults={
-                        'price': item_data['price'],
-                        'available': item_data['available'],
-                        'stock_qty': item_data['stock_qty'],
-                    }
-                )
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
+        created_count, updated_count = services.bulk_upsert(store_id, serializer.validated_data)
         
         return Response({
             'message': 'Bulk upsert successful',
             'created': created_count,
             'updated': updated_count
         }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser, FormParser])
+    def import_file(self, request):
+        """
+        Bulk create or update a store's inventory from an uploaded CSV or
+        NDJSON `file`, streamed and written in chunks. Rows that fail are
+        listed in a downloadable error file. With `?stream=true` the running
+        totals are streamed back as NDJSON after each chunk.
+        """
+        store_id = request.data.get('store_id')
+        upload = request.FILES.get('file')
+        
+        if not store_id or upload is None:
+            return Response(
+                {'error': 'store_id and file are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not _store_exists(store_id):
+            return Response(
+                {'error': f'Store {store_id} not found'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fmt = request.data.get('format') or importer.detect_format(upload.name)
+        if fmt not in importer.FORMATS:
+            return Response(
+                {'error': f"format must be one of {', '.join(importer.FORMATS)} "
+                          f"(or use a .csv, .ndjson or .jsonl file name)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def log_progress(result):
+            logger.info('Inventory import for store %s: %d rows read, %d created, %d updated, %d failed',
+                        store_id, result.rows, result.created, result.updated, result.failed)
+
+        if request.query_params.get('stream', '').lower() in ('1', 'true'):
+            body = _stream_import(request, store_id, upload.file, fmt, log_progress)
+            try:
+                # Runs up to the first chunk, so an unreadable file is still a 400
+                next(body)
+            except importer.InvalidImportFile as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            return StreamingHttpResponse(body, content_type='application/x-ndjson')
+
+        # Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are already on disk; errors go to disk too
+        errors = io.TextIOWrapper(tempfile.TemporaryFile(), encoding='utf-8', newline='')
+        progress = importer.iter_import(store_id, upload.file, fmt, errors)
+        try:
+            chunks = itertools.chain([next(progress)], progress)
+        except importer.InvalidImportFile as exc:
+            errors.close()
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            for result in chunks:
+                log_progress(result)
+            summary = _import_summary(request, result, errors)
+        except importer.InvalidImportFile as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            errors.close()
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path=r'import_errors/(?P<name>[0-9a-f]{32})')
+    def import_errors(self, request, name=None):
+        """Download the per-row error file of a file import"""
+        path = f'{importer.IMPORT_ERRORS_DIR}/{name}.csv'
+        if not default_storage.exists(path):
+            return Response({'error': 'Error file not found'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            default_storage.open(path, 'rb'),
+            as_attachment=True,
+            filename='inventory_import_errors.csv',
+            content_type='text/csv'
+        )
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        In-stock items of one medicine (`medicine_id`, or `medicine` matching
+        the English or Telugu name) at stores within `radius_km` (default 10)
+        of a location, nearest first, then cheapest. Paginated by distance:
+        `next` continues after the last item of this page.
+        """
+        params = request.query_params
+        medicine_name = params.get('medicine', '').strip()
+        try:
+            medicine_id = params.get('medicine_id')
+            medicine_id = int(medicine_id) if medicine_id not in (None, '') else None
+            latitude = float(params.get('latitude'))
+            longitude = float(params.get('longitude'))
+            radius_km = float(params.get('radius_km', '10'))
+            page_size = int(params.get('page_size', NEARBY_PAGE_SIZE))
+            cursor = params.get('cursor')
+            after = _decode_cursor(cursor) if cursor else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Invalid medicine_id, latitude, longitude, radius_km, page_size or cursor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if medicine_id is None and not medicine_name:
+            return Response(
+                {'error': 'medicine_id or medicine is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or not 0 < radius_km <= MAX_RADIUS_KM:
+            return Response(
+                {'error': f'latitude must be within ±90, longitude within ±180 '
+                          f'and radius_km in (0, {MAX_RADIUS_KM}]'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= page_size <= NEARBY_MAX_PAGE_SIZE:
+            return Response(
+                {'error': f'page_size must be between 1 and {NEARBY_MAX_PAGE_SIZE}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        items = Inventory.objects.all()
+        if medicine_id is not None:
+            items = items.filter(medicine_id=medicine_id)
+        else:
+            items = items.filter(medicine__in=Medicine.objects.filter(
+                Q(name_en__iexact=medicine_name) | Q(name_te__iexact=medicine_name)
+            ))
+
+        # One extra item tells whether there is a next page
+        page = items.in_stock_near(latitude, longitude, radius_km, page_size + 1, after)
+        next_url = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', _encode_cursor(page[-1])
+            )
+        for item in page:
+            item.distance = round(item.distance, 2)
+
+        serializer = InventoryNearbySerializer(page, many=True)
+        return Response({'next': next_url, 'results': serializer.data})
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from medicines.models import Medicine
+
+
+DEFAULT_OUTPUT = Path(settings.BASE_DIR).parent / 'ai_model' / 'data' / 'medicine_names_te.json'
+
+
+class Command(BaseCommand):
+    help = "Export English->Telugu medicine names for the AI service's translation table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=str(DEFAULT_OUTPUT),
+            help=f'Path of the JSON table to write (default: {DEFAULT_OUTPUT})',
+        )
+        parser.add_argument(
+            '--merge',
+            action='store_true',
+            help='Keep entries already in the output file that are not in the database',
+        )
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        names = {}
+        if options['merge'] and output.exists():
+            with output.open('r', encoding='utf-8') as f:
+                names = json.load(f)
+
+        rows = (
+            Medicine.objects
+            .exclude(name_te__isnull=True)
+            .exclude(name_te='')
+            .values_list('name_en', 'name_te')
+        )
+        for name_en, name_te in rows.iterator():
+            names[name_en.strip()] = name_te.strip()
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_suffix(output.suffix + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump(dict(sorted(names.items())), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        tmp.replace(output)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(names)} medicine names to {output}'))
@@ -0,0 +1,122 @@
+"""
+Benchmark inventory bulk upsert: per-item update_or_create (the old
+bulk_upsert loop) against the set-based inventory.services.bulk_upsert.
+
+Each size is measured twice: a first sync into an empty store (all inserts)
+and a re-sync of the same items with new prices (all updates). Benchmark
+medicines and a benchmark store are created in the configured database and
+deleted afterwards.
+
+Run with: python scripts/bench_bulk_upsert.py [--sizes 100 1000 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+import django
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection, transaction
+
+from inventory import services
+from inventory.models import Inventory
+from medicines.models import Medicine
+from stores.models import Store
+
+BENCH_PREFIX = '__bench_upsert__'
+
+
+def make_items(medicine_ids, seed):
+    rng = random.Random(seed)
+    return [
+        {
+            'medicine_id': medicine_id,
+            'price': Decimal(rng.randint(100, 99999)) / 100,
+            'available': rng.random() < 0.9,
+            'stock_qty': rng.randint(0, 500),
+        }
+        for medicine_id in medicine_ids
+    ]
+
+
+def loop_upsert(store_id, items):
+    """The previous implementation: update_or_create per item."""
+    created_count = updated_count = 0
+    with transaction.atomic():
+        for item_data in items:
+            _, created = Inventory.objects.update_or_create(
+                store_id=store_id,
+                medicine_id=item_data['medicine_id'],
+                defaults={
+                    'price': item_data['price'],
+                    'available': item_data['available'],
+                    'stock_qty': item_data['stock_qty'],
+                }
+            )
+            if created:
+                created_count += 1
+            else:
+                updated_count += 1
+    return created_count, updated_count
+
+
+def set_upsert(store_id, items):
+    """What the view does now: validate medicine ids, then the set-based upsert."""
+    assert not services.missing_medicine_ids(item['medicine_id'] for item in items)
+    return services.bulk_upsert(store_id, items)
+
+
+def measure(fn, store_id, items):
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_queries):
+        started = time.perf_counter()
+        counts = fn(store_id, items)
+        elapsed = time.perf_counter() - started
+    return elapsed, queries, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark inventory bulk upsert')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"Database: {connection.vendor}")
+    Medicine.objects.bulk_create(
+        [Medicine(name_en=f'{BENCH_PREFIX}{i}') for i in range(max(args.sizes))],
+        batch_size=services.UPSERT_CHUNK_SIZE,
+    )
+    medicine_ids = list(
+        Medicine.objects.filter(name_en__startswith=BENCH_PREFIX).order_by('pk').values_list('pk', flat=True)
+    )
+    store = Store.objects.create(name=BENCH_PREFIX, address='-', latitude=Decimal('0'), longitude=Decimal('0'))
+    try:
+        print(f"\n{'items':>7}  {'method':<18}{'pass':<8}{'seconds':>9}{'queries':>9}{'items/s':>10}  created/updated")
+        for size in args.sizes:
+            for name, fn in (('update_or_create', loop_upsert), ('bulk_upsert', set_upsert)):
+                Inventory.objects.filter(store=store).delete()
+                for pass_name, seed in (('insert', 1), ('update', 2)):
+                    items = make_items(medicine_ids[:size], seed)
+                    elapsed, queries, counts = measure(fn, store.pk, items)
+                    print(f"{size:>7}  {name:<18}{pass_name:<8}{elapsed:>9.3f}{queries:>9}"
+                          f"{size / elapsed:>10.0f}  {counts[0]}/{counts[1]}")
+    finally:
+        store.delete()
+        Medicine.objects.filter(name_en__startswith=BENCH_PREFIX).delete()
+
+
+if __name__ == '__main__':
+    main()
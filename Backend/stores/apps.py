@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class StoresConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stores'
+
+    def ready(self):
+        if settings.STORE_GEO_ENGINE == 'memory':
+            from .snapshot import connect_signals
+            connect_signals()
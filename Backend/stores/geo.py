@@ -0,0 +1,124 @@
+"""
+Geo helpers for store lookups: geohash encoding, lat/lon bounding boxes and
+Haversine distances.
+
+A geohash is a base-32 string naming a lat/lon cell; every extra character
+splits the cell 32 ways, and all points inside a cell share its prefix. Stores
+keep a fixed-precision geohash in an indexed column, so the cells covering a
+search area turn into a few index range scans instead of a full table scan.
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 9  # ~4.8 m x 4.8 m cells
+# Cover a search area with at most this many geohash cells (one range scan each)
+MAX_COVER_CELLS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point, `precision` characters long."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # bits alternate longitude, latitude, starting with longitude
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) in degrees of a geohash cell of the given precision."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Smallest lat/lon box containing the circle of `radius_km` around a point,
+    as (min_lat, max_lat, [(min_lon, max_lon), ...]). Longitude is split into
+    two ranges when the box crosses the antimeridian, and spans all longitudes
+    when the circle reaches a pole.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = latitude - math.degrees(angular)
+    max_lat = latitude + math.degrees(angular)
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+    dlon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(latitude)))))
+    min_lon, max_lon = longitude - dlon, longitude + dlon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def _cells_in(min_lat, max_lat, lon_ranges, precision):
+    height, width = _cell_size(precision)
+    cells = set()
+    lat = math.floor(min_lat / height) * height
+    while lat <= max_lat:
+        for min_lon, max_lon in lon_ranges:
+            lon = math.floor(min_lon / width) * width
+            while lon <= max_lon:
+                # Encode the cell centre (clamped into range) to get its hash
+                cells.add(encode_geohash(min(lat + height / 2, 90.0), min(lon + width / 2, 180.0),
+                                         precision))
+                lon += width
+        lat += height
+    return cells
+
+
+def covering_cells(min_lat, max_lat, lon_ranges, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose cells together cover the box: the finest precision
+    that needs at most `max_cells` cells, so the prefilter stays tight while
+    the number of range scans stays small. Empty when the box is so large
+    that scanning by cell would not help.
+    """
+    best = set()
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = _cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = sum(math.floor(hi / width) - math.floor(lo / width) + 1 for lo, hi in lon_ranges)
+        if rows * cols > max_cells:
+            break
+        best = _cells_in(min_lat, max_lat, lon_ranges, precision)
+    return sorted(best)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
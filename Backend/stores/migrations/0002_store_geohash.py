@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+from stores.geo import encode_geohash
+
+
+def populate_geohash(apps, schema_editor):
+    Store = apps.get_model('stores', 'Store')
+    stores = list(Store.objects.only('id', 'latitude', 'longitude'))
+    for store in stores:
+        store.geohash = encode_geohash(store.latitude, store.longitude)
+    Store.objects.bulk_update(stores, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='geohash',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['latitude', 'longitude'], name='stores_lat_lon_idx'),
+        ),
+    ]
@@ -1,4 +1,66 @@
 from django.db import models
+from django.db.models import Q
+
+from . import geo
+
+# k-nearest searches start this small and widen until enough stores are found
+KNN_START_RADIUS_KM = 1.0
+
+
+def bounding_box_q(latitude, longitude, radius_km, prefix=''):
+    """
+    Q for stores inside the lat/lon box around the circle of `radius_km`: a
+    superset of the circle, selected through the geohash and lat/lon indexes.
+    `prefix` (e.g. 'store__') applies it across a relation to Store.
+    """
+    min_lat, max_lat, lon_ranges = geo.bounding_box(latitude, longitude, radius_km)
+    # Pad by ~0.1 m so rounding to the columns' 6 decimals never drops an edge row
+    pad = 1e-6
+    lon_q = Q()
+    for min_lon, max_lon in lon_ranges:
+        lon_q |= Q(**{f'{prefix}longitude__gte': min_lon - pad, f'{prefix}longitude__lte': max_lon + pad})
+    q = lon_q & Q(**{f'{prefix}latitude__gte': min_lat - pad, f'{prefix}latitude__lte': max_lat + pad})
+    cells = geo.covering_cells(min_lat, max_lat, lon_ranges)
+    if cells:
+        # One index range scan per cell: every geohash in a cell starts with its prefix
+        cell_q = Q()
+        for cell in cells:
+            cell_q |= Q(**{f'{prefix}geohash__gte': cell, f'{prefix}geohash__lt': cell + '~'})
+        q &= cell_q
+    return q
+
+
+class StoreQuerySet(models.QuerySet):
+    def in_bounding_box(self, latitude, longitude, radius_km):
+        """Stores inside the lat/lon box around the circle of `radius_km` (see bounding_box_q)."""
+        return self.filter(bounding_box_q(latitude, longitude, radius_km))
+
+    def within_radius(self, latitude, longitude, radius_km):
+        """Stores within `radius_km`, nearest first, each with a `distance` (km) attribute."""
+        stores = []
+        for store in self.in_bounding_box(latitude, longitude, radius_km):
+            distance = geo.haversine_km(latitude, longitude, store.latitude, store.longitude)
+            if distance <= radius_km:
+                store.distance = distance
+                stores.append(store)
+        stores.sort(key=lambda s: (s.distance, s.pk))
+        return stores
+
+    def nearest(self, latitude, longitude, radius_km, limit=None):
+        """
+        The `limit` nearest stores within `radius_km` (all of them when
+        `limit` is None). The search radius starts small and grows, so a
+        k-nearest query in a dense city only reads the stores close by.
+        """
+        if limit is None:
+            return self.within_radius(latitude, longitude, radius_km)
+        radius = min(KNN_START_RADIUS_KM, radius_km)
+        while True:
+            stores = self.within_radius(latitude, longitude, radius)
+            # Complete within `radius`, so with `limit` hits these are the nearest
+            if len(stores) >= limit or radius >= radius_km:
+                return stores[:limit]
+            radius = min(radius * 4, radius_km)
 
 
 class Store(models.Model):
@@ -12,10 +74,25 @@ class Store(models.Model):
     is_verified = models.BooleanField(default=False)
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    # Derived from latitude/longitude in save(); bulk_create/update() callers
+    # must set it themselves (geo.encode_geohash)
+    geohash = models.CharField(max_length=12, db_index=True, editable=False, default='')
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StoreQuerySet.as_manager()
     
     class Meta:
         db_table = 'stores'
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='stores_lat_lon_idx'),
+        ]
         
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        self.geohash = geo.encode_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
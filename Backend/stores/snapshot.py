@@ -0,0 +1,116 @@
+"""
+Process-local snapshot of store locations for nearby-store queries
+(STORE_GEO_ENGINE = 'memory').
+
+Store ids, coordinates (radians) and the serialized fields of every store are
+held in NumPy arrays and plain dicts. A query computes all Haversine distances
+in one vectorized expression, picks the k nearest with `argpartition` and
+returns ready-made response dicts without touching the database.
+
+Store save/delete signals mark the snapshot stale (after the transaction
+commits) and the next query rebuilds it. Signals only reach the process that
+made the change, and bulk_create()/update() send none, so every process also
+rebuilds once the snapshot is older than STORE_SNAPSHOT_TTL seconds.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .geo import EARTH_RADIUS_KM
+from .models import Store
+from .serializers import StoreNearbySerializer
+
+
+class _Snapshot:
+    """Immutable arrays for one point in time; swapped whole on rebuild."""
+
+    def __init__(self, stores):
+        serializer = StoreNearbySerializer()
+        fields = [field for name, field in serializer.fields.items() if name != 'distance']
+        self.distance_field = serializer.fields['distance']
+        self.rows = []
+        ids, lats, lons = [], [], []
+        for store in stores:
+            row = {}
+            for field in fields:
+                value = field.get_attribute(store)
+                row[field.field_name] = None if value is None else field.to_representation(value)
+            self.rows.append(row)
+            ids.append(store.pk)
+            lats.append(float(store.latitude))
+            lons.append(float(store.longitude))
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lat = np.radians(np.asarray(lats, dtype=np.float64))
+        self.lon = np.radians(np.asarray(lons, dtype=np.float64))
+        self.cos_lat = np.cos(self.lat)
+        self.built_at = time.monotonic()
+
+    def distances_km(self, latitude, longitude):
+        lat = np.radians(latitude)
+        lon = np.radians(longitude)
+        a = (np.sin((self.lat - lat) / 2) ** 2
+             + np.cos(lat) * self.cos_lat * np.sin((self.lon - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearby(self, latitude, longitude, radius_km, limit=None):
+        if not len(self.ids):
+            return []
+        distances = self.distances_km(latitude, longitude)
+        candidates = np.flatnonzero(distances <= radius_km)
+        if limit is not None and len(candidates) > limit:
+            part = np.argpartition(distances[candidates], limit - 1)[:limit]
+            candidates = candidates[part]
+        # Nearest first; equal distances by id, like the database path
+        order = np.lexsort((self.ids[candidates], distances[candidates]))
+        results = []
+        for i in candidates[order].tolist():
+            row = dict(self.rows[i])
+            row['distance'] = self.distance_field.to_representation(round(float(distances[i]), 2))
+            results.append(row)
+        return results
+
+
+class StoreLocationIndex:
+    """Builds the snapshot on first use and rebuilds it when stale."""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._snapshot = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        ttl = self.ttl if self.ttl is not None else settings.STORE_SNAPSHOT_TTL
+        if snapshot is not None and not self._stale and time.monotonic() - snapshot.built_at < ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._stale or time.monotonic() - snapshot.built_at >= ttl:
+                # Clear first: a change committed during the rebuild marks it stale again
+                self._stale = False
+                snapshot = self._snapshot = _Snapshot(Store.objects.order_by('pk'))
+        return snapshot
+
+    def nearby(self, latitude, longitude, radius_km, limit=None):
+        """Response dicts for stores within `radius_km`, nearest first."""
+        return self.snapshot().nearby(latitude, longitude, radius_km, limit)
+
+
+store_locations = StoreLocationIndex()
+
+
+def _invalidate(sender, **kwargs):
+    transaction.on_commit(store_locations.invalidate)
+
+
+def connect_signals():
+    post_save.connect(_invalidate, sender=Store, dispatch_uid='stores.snapshot.save')
+    post_delete.connect(_invalidate, sender=Store, dispatch_uid='stores.snapshot.delete')
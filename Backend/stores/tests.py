@@ -1,3 +1,221 @@
-from django.test import TestCase
+import math
+import random
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from . import geo, snapshot
+from .models import Store
+
+
+def destination(latitude, longitude, bearing, distance_km):
+    """Point `distance_km` from a start point along a bearing (degrees)."""
+    lat1, lon1, theta = map(math.radians, (latitude, longitude, bearing))
+    angular = distance_km / geo.EARTH_RADIUS_KM
+    lat2 = math.asin(math.sin(lat1) * math.cos(angular)
+                     + math.cos(lat1) * math.sin(angular) * math.cos(theta))
+    lon2 = lon1 + math.atan2(math.sin(theta) * math.sin(angular) * math.cos(lat1),
+                             math.cos(angular) - math.sin(lat1) * math.sin(lat2))
+    return math.degrees(lat2), (math.degrees(lon2) + 540) % 360 - 180
+
+
+def make_stores(points):
+    """Stores at (lat, lon) points, rounded to the columns' 6 decimals like the API does."""
+    stores = []
+    for i, (latitude, longitude) in enumerate(points):
+        latitude = Decimal(f'{latitude:.6f}')
+        longitude = Decimal(f'{longitude:.6f}')
+        stores.append(Store(name=f'Store {i}', address='-', latitude=latitude, longitude=longitude,
+                            geohash=geo.encode_geohash(latitude, longitude)))
+    return Store.objects.bulk_create(stores)
+
+
+def brute_force(latitude, longitude, radius_km, limit=None):
+    """Ids of the stores within `radius_km` by Haversine over every row, nearest first."""
+    hits = []
+    for store in Store.objects.all():
+        distance = geo.haversine_km(latitude, longitude, store.latitude, store.longitude)
+        if distance <= radius_km:
+            hits.append((distance, store.pk))
+    return [pk for _, pk in sorted(hits)][:limit]
+
+
+def cell_corners(precision, count, rng):
+    """Random corners of geohash cells of the given precision."""
+    height, width = geo._cell_size(precision)
+    return [
+        (rng.randrange(int(-80 / height), int(80 / height)) * height,
+         rng.randrange(int(-180 / width), int(180 / width)) * width)
+        for _ in range(count)
+    ]
+
+
+class GeoTests(SimpleTestCase):
+    def test_encode_geohash(self):
+        self.assertEqual(geo.encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(len(geo.encode_geohash(17.385, 78.4867)), geo.GEOHASH_PRECISION)
+
+    def test_bounding_box_contains_circle(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            latitude, longitude = rng.uniform(-85, 85), rng.uniform(-180, 180)
+            radius_km = rng.choice([0.01, 0.5, 5, 50, 500])
+            min_lat, max_lat, lon_ranges = geo.bounding_box(latitude, longitude, radius_km)
+            for bearing in range(0, 360, 15):
+                lat, lon = destination(latitude, longitude, bearing, radius_km)
+                self.assertTrue(min_lat - 1e-9 <= lat <= max_lat + 1e-9)
+                self.assertTrue(any(lo - 1e-9 <= lon <= hi + 1e-9 for lo, hi in lon_ranges))
+
+    def test_bounding_box_antimeridian_and_pole(self):
+        _, _, lon_ranges = geo.bounding_box(0, 179.99, 10)
+        self.assertEqual(len(lon_ranges), 2)
+        self.assertEqual((lon_ranges[0][1], lon_ranges[1][0]), (180.0, -180.0))
+        self.assertEqual(geo.bounding_box(89.99, 0, 10)[2], [(-180.0, 180.0)])
+
+    def test_covering_cells_cover_box(self):
+        rng = random.Random(2)
+        for _ in range(100):
+            latitude, longitude = rng.uniform(-80, 80), rng.uniform(-179, 179)
+            min_lat, max_lat, lon_ranges = geo.bounding_box(latitude, longitude, rng.choice([0.05, 2, 30]))
+            cells = geo.covering_cells(min_lat, max_lat, lon_ranges)
+            self.assertLessEqual(len(cells), geo.MAX_COVER_CELLS)
+            for _ in range(20):
+                lo, hi = rng.choice(lon_ranges)
+                point = geo.encode_geohash(rng.uniform(min_lat, max_lat), rng.uniform(lo, hi))
+                self.assertTrue(any(point.startswith(cell) for cell in cells))
+
+
+class NearbyPrefilterTests(TestCase):
+    """The geohash/bounding-box prefilter must never drop a store the full Haversine scan finds."""
+
+    def test_matches_haversine_near_cell_edges(self):
+        rng = random.Random(3)
+        queries = []
+        points = []
+        for precision in (4, 5, 6):
+            height, width = geo._cell_size(precision)
+            for corner_lat, corner_lon in cell_corners(precision, 3, rng):
+                queries.append((corner_lat, corner_lon, precision))
+                # Stores on, just inside and just outside the cell edges through the corner
+                for _ in range(25):
+                    dlat = rng.choice([-1, 0, 1]) * rng.choice([0, 1e-6, 2e-6, height / 3, height])
+                    dlon = rng.choice([-1, 0, 1]) * rng.choice([0, 1e-6, 2e-6, width / 3, width])
+                    points.append((corner_lat + dlat, corner_lon + dlon))
+        make_stores(points)
+
+        for latitude, longitude, precision in queries:
+            # Radii landing exactly on store distances probe the inclusive boundary
+            exact = [geo.haversine_km(latitude, longitude, store.latitude, store.longitude)
+                     for store in Store.objects.all()]
+            radii = sorted(d for d in exact if d < 40)[::7] + [0.001, 0.5, 5]
+            for radius_km in radii:
+                with self.subTest(latitude=latitude, longitude=longitude, radius_km=radius_km):
+                    found = [s.pk for s in Store.objects.within_radius(latitude, longitude, radius_km)]
+                    self.assertEqual(found, brute_force(latitude, longitude, radius_km))
+
+    def test_stores_exactly_on_the_radius(self):
+        rng = random.Random(6)
+        for _ in range(40):
+            latitude, longitude = round(rng.uniform(-60, 60), 6), round(rng.uniform(-179, 179), 6)
+            radius_km = rng.choice([0.05, 1, 3, 25])
+            # Due north/east/south/west stores sit on the bounding box edges
+            stores = make_stores([destination(latitude, longitude, bearing, radius_km)
+                                  for bearing in range(0, 360, 45)])
+            for store in stores:
+                distance = geo.haversine_km(latitude, longitude, store.latitude, store.longitude)
+                found = [s.pk for s in Store.objects.within_radius(latitude, longitude, distance)]
+                self.assertIn(store.pk, found)
+                found = [s.pk for s in Store.objects.within_radius(latitude, longitude, distance * (1 - 1e-9))]
+                self.assertNotIn(store.pk, found)
+            Store.objects.all().delete()
+
+    def test_antimeridian_and_pole(self):
+        make_stores([(0.0, 179.995), (0.0, -179.995), (0.001, 180.0), (89.995, 0.0), (89.995, 180.0),
+                     (89.9, -90.0), (0.0, 0.0)])
+        for latitude, longitude in ((0.0, 179.999), (0.0, -179.999), (89.999, 45.0)):
+            for radius_km in (0.5, 2, 20):
+                found = [s.pk for s in Store.objects.within_radius(latitude, longitude, radius_km)]
+                self.assertEqual(found, brute_force(latitude, longitude, radius_km))
+        self.assertEqual(len(Store.objects.within_radius(0.0, 180.0, 2)), 3)
+
+    def test_nearest_limit(self):
+        rng = random.Random(4)
+        make_stores([(17.385 + rng.gauss(0, 0.2), 78.4867 + rng.gauss(0, 0.2)) for _ in range(300)])
+        for limit in (1, 5, 50, 400):
+            for radius_km in (2, 30, 200):
+                found = [s.pk for s in Store.objects.nearest(17.385, 78.4867, radius_km, limit=limit)]
+                self.assertEqual(found, brute_force(17.385, 78.4867, radius_km, limit))
+
+
+@override_settings(STORE_GEO_ENGINE='db')
+class NearbyViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('stores:store-nearby')
+
+    def test_results_nearest_first(self):
+        far, near = make_stores([(17.40, 78.4867), (17.386, 78.4867)])
+        response = self.client.get(self.url, {'latitude': 17.385, 'longitude': 78.4867, 'radius_km': 5})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['id'] for r in results], [near.pk, far.pk])
+        self.assertEqual(results[0]['distance'], '0.11')
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'latitude': 'x', 'longitude': 0}, {'latitude': 91, 'longitude': 0},
+                       {'latitude': 0, 'longitude': 0, 'radius_km': 0},
+                       {'latitude': 0, 'longitude': 0, 'radius_km': 30000},
+                       {'latitude': 0, 'longitude': 0, 'limit': 0}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class MemoryEngineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('stores:store-nearby')
+        snapshot.store_locations.invalidate()
+        self.addCleanup(snapshot.store_locations.invalidate)
+
+    def nearby(self, engine, params):
+        with override_settings(STORE_GEO_ENGINE=engine):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_parity_with_db_engine(self):
+        rng = random.Random(5)
+        points = [(17.385 + rng.gauss(0, 0.3), 78.4867 + rng.gauss(0, 0.3)) for _ in range(400)]
+        points += [(0.0, 179.995), (0.0, -179.995), (89.995, 10.0)]
+        stores = make_stores(points)
+        Store.objects.filter(pk__in=[s.pk for s in stores[::10]]).update(rating=4.5, phone='040-1234')
+
+        queries = [(17.385, 78.4867), (17.5, 78.3), (0.0, 180.0), (89.999, -170.0)]
+        for latitude, longitude in queries:
+            for radius_km in (0.7, 5, 25, 150):
+                for limit in (None, 1, 10):
+                    params = {'latitude': latitude, 'longitude': longitude, 'radius_km': radius_km}
+                    if limit is not None:
+                        params['limit'] = limit
+                    with self.subTest(**params):
+                        self.assertEqual(self.nearby('memory', params), self.nearby('db', params))
+
+    def test_store_changes_invalidate_snapshot(self):
+        snapshot.connect_signals()
+        params = {'latitude': 17.385, 'longitude': 78.4867, 'radius_km': 5}
+        self.assertEqual(self.nearby('memory', params), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            store = Store.objects.create(name='Apollo', address='-', latitude=17.386, longitude=78.4867)
+        self.assertEqual([r['id'] for r in self.nearby('memory', params)], [store.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            store.delete()
+        self.assertEqual(self.nearby('memory', params), [])
+
+    def test_ttl_picks_up_bulk_changes(self):
+        index = snapshot.StoreLocationIndex(ttl=0)
+        self.assertEqual(index.nearby(17.385, 78.4867, 5), [])
+        # bulk_create sends no signals; the expired snapshot is rebuilt anyway
+        make_stores([(17.386, 78.4867)])
+        self.assertEqual(len(index.nearby(17.385, 78.4867, 5)), 1)
@@ -1,12 +1,14 @@
+from django.conf import settings
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from decimal import Decimal
-import math
 from .models import Store
 from .serializers import StoreSerializer, StoreNearbySerializer
 
+# Half the Earth's circumference; any point is within this distance
+MAX_RADIUS_KM = 20038
+
 
 class StoreViewSet(viewsets.ModelViewSet):
     """ViewSet for Store CRUD operations"""
@@ -20,40 +22,38 @@ class StoreViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def nearby(self, request):
-        """Find stores near a given location using Haversine formula"""
+        """
+        Stores within `radius_km` (default 10) of a location, nearest first.
+        `limit` returns only the k nearest.
+        """
         try:
-            latitude = Decimal(request.query_params.get('latitude'))
-            longitude = Decimal(request.query_params.get('longitude'))
-            radius_km = Decimal(request.query_params.get('radius_km', '10'))
+            latitude = float(request.query_params.get('latitude'))
+            longitude = float(request.query_params.get('longitude'))
+            radius_km = float(request.query_params.get('radius_km', '10'))
+            limit = request.query_params.get('limit')
+            limit = int(limit) if limit not in (None, '') else None
         except (TypeError, ValueError):
             return Response(
-                {'error': 'Invalid latitude, longitude, or radius_km'},
+                {'error': 'Invalid latitude, longitude, radius_km or limit'},
+                status=400
+            )
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or not 0 < radius_km <= MAX_RADIUS_KM:
+            return Response(
+                {'error': f'latitude must be within ±90, longitude within ±180 '
+                          f'and radius_km in (0, {MAX_RADIUS_KM}]'},
                 status=400
             )
-        
-        # Haversine formula to calculate distance
-        # Convert to radians
-        lat_rad = float(latitude) * math.pi / 180
-        lon_rad = float(longitude) * math.pi / 180
-        
-        stores = []
-        for store in Store.objects.all():
-            store_lat_rad = float(store.latitude) * math.pi / 180
-            store_lon_rad = float(store.longitude) * math.pi / 180
-            
-            # Haversine formula
-            dlat = store_lat_rad - lat_rad
-            dlon = store_lon_rad - lon_rad
-            a = math.sin(dlat/2)**2 + math.cos(lat_rad) * math.cos(store_lat_rad) * math.sin(dlon/2)**2
-            c = 2 * math.asin(math.sqrt(a))
-            distance = 6371 * c  # Earth radius in km
-            
-            if distance <= float(radius_km):
-                store.distance = round(distance, 2)
-                stores.append(store)
-        
-        # Sort by distance
-        stores.sort(key=lambda x: x.distance)
-        
+        if limit is not None and limit < 1:
+            return Response({'error': 'limit must be a positive integer'}, status=400)
+
+        if settings.STORE_GEO_ENGINE == 'memory':
+            from .snapshot import store_locations
+            return Response({'results': store_locations.nearby(latitude, longitude, radius_km, limit)})
+
+        # Bounding-box prefilter on indexed columns, exact Haversine on the rest
+        stores = Store.objects.nearest(latitude, longitude, radius_km, limit=limit)
+        for store in stores:
+            store.distance = round(store.distance, 2)
+
         serializer = StoreNearbySerializer(stores, many=True)
         return Response({'results': serializer.data})
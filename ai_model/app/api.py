@@ -1,27 +1,187 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List
+import asyncio
+import hmac
+import logging
 import sys
 import os
+import threading
+import time
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils import metrics, settings
+from utils.batcher import MicroBatcher
+from utils.bulk import (InputFormatError, RecordParser, aiter_lines,
+                        fatal_line, format_for_content_type, format_results)
+from utils.cache import ResponseCache, normalize_query
+from utils.embedding_store import file_sha256
+from utils.executor import InferenceExecutor, Overloaded
 from utils.language_detector import detect_language
+from utils.watcher import FileWatcher
+
+logger = logging.getLogger(__name__)
+
+# Models are loaded by load_models(), not at import time, so the server can
+# bind and answer /health before torch and the encoder are ready.
+translator = None
+TRANSLATOR_MODE = None  # "marian" or "lite" once loaded
+predictor = None
+response_cache = None
+ML_AVAILABLE = None
+
+_ready = threading.Event()
+_load_lock = threading.Lock()
+# Guards starting the loader thread only; _load_lock is held for the whole
+# load and must never be waited on from the event loop
+_start_lock = threading.Lock()
+_load_thread = None
+_load_error = None
+_reload_lock = threading.Lock()
+
+
+def load_models() -> None:
+    """Construct the translator, predictor and response cache (idempotent)."""
+    global translator, predictor, response_cache, ML_AVAILABLE, TRANSLATOR_MODE, _load_error
+    with _load_lock:
+        if _ready.is_set():
+            return
+        started = time.perf_counter()
+        try:
+            # Use lite versions that work without heavy ML deps
+            try:
+                from utils.predictor import MedicinePredictor
+                ml_available = True
+            except ImportError:
+                from utils.predictor_lite import MedicinePredictor
+                ml_available = False
+
+            translator, TRANSLATOR_MODE = _load_translator()
+            predictor = MedicinePredictor()
+            response_cache = (
+                ResponseCache(_cache_version(predictor),
+                              maxsize=settings.RESPONSE_CACHE_SIZE,
+                              ttl=settings.RESPONSE_CACHE_TTL or None,
+                              shared_path=settings.RESPONSE_CACHE_PATH or None,
+                              prune_age=settings.RESPONSE_CACHE_PRUNE_AGE)
+                if settings.RESPONSE_CACHE else None
+            )
+            ML_AVAILABLE = ml_available
+            _load_error = None
+        except Exception as exc:
+            _load_error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Model loading failed")
+            raise
+        _ready.set()
+        logger.info("Models ready in %.2fs (ml=%s, translator=%s)", time.perf_counter() - started,
+                    ML_AVAILABLE, TRANSLATOR_MODE)
+
+
+def _load_translator():
+    """(translator, mode) for settings.TRANSLATOR; "auto" falls back to the lite translator."""
+    if settings.TRANSLATOR not in settings.TRANSLATORS:
+        raise ValueError(f"TRANSLATOR must be one of {settings.TRANSLATORS}")
+    if settings.TRANSLATOR != "lite":
+        try:
+            from utils.translator import TranslatorService
+            return TranslatorService(), "marian"
+        except Exception as exc:  # transformers / sentencepiece / model weights
+            if settings.TRANSLATOR == "marian":
+                raise
+            logger.warning("MarianMT translator unavailable, using the lite translator: %s", exc)
+    from utils.translator_lite import TranslatorService
+    return TranslatorService(), "lite"
+
+
+def _cache_version(p) -> str:
+    # Telugu responses depend on the translator as well as the predictor
+    return f"{p.version}:{TRANSLATOR_MODE}"
+
+
+def _start_loading() -> None:
+    """Warm models on a background thread (at most one at a time)."""
+    global _load_thread
+    with _start_lock:
+        if _ready.is_set() or (_load_thread is not None and _load_thread.is_alive()):
+            return
+        _load_thread = threading.Thread(target=_load_models_quietly, name="model-loader", daemon=True)
+        _load_thread.start()
+
+
+def _load_models_quietly() -> None:
+    try:
+        load_models()
+    except Exception:
+        pass  # reported through /ready
+
+
+def reload_dataset() -> dict:
+    """
+    Swap in a predictor for the dataset file's current contents. Only rows
+    with new symptom text are encoded; requests keep using the old predictor
+    until the swap, which is a single assignment. Responses the old predictor
+    finishes after the swap are returned but not cached.
+    """
+    global predictor
+    with _reload_lock:
+        current = predictor
+        if file_sha256(current.dataset_path) == current.dataset_hash:
+            return {"changed": False, "version": current.version}
+        started = time.perf_counter()
+        fresh = current.reloaded()
+        predictor = fresh
+        if response_cache is not None:
+            response_cache.set_version(_cache_version(fresh))
+        elapsed = time.perf_counter() - started
+        logger.info("Dataset reloaded in %.2fs: %s", elapsed, fresh.build_stats)
+        return {"changed": True, "version": fresh.version, "seconds": round(elapsed, 3),
+                **fresh.build_stats}
+
+
+def _reload_if_ready() -> None:
+    if _ready.is_set():
+        reload_dataset()
+
 
-# Use lite versions that work without heavy ML deps
-try:
-    from utils.predictor import MedicinePredictor
-    ML_AVAILABLE = True
-except ImportError:
-    from utils.predictor_lite import MedicinePredictor
-    ML_AVAILABLE = False
+async def _require_ready() -> None:
+    """Wait for models to load, or fail with 503 so clients retry."""
+    if _ready.is_set():
+        return
+    _start_loading()
+    deadline = time.monotonic() + settings.READY_TIMEOUT_S
+    while not _ready.is_set():
+        if _load_error is not None and (_load_thread is None or not _load_thread.is_alive()):
+            raise HTTPException(status_code=503, detail=f"Model loading failed: {_load_error}")
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=503, detail="Models are still loading",
+                                headers={"Retry-After": "5"})
+        await asyncio.sleep(0.05)
 
-# Always use lite translator for now (no sentencepiece)
-from utils.translator_lite import TranslatorService
 
-app = FastAPI(title="Local Medicine AI Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.STARTUP_MODE == "background":
+        _start_loading()
+    watcher = None
+    if settings.DATASET_WATCH_INTERVAL_S > 0:
+        watcher = FileWatcher(lambda: predictor.dataset_path if _ready.is_set() else None,
+                              _reload_if_ready, settings.DATASET_WATCH_INTERVAL_S)
+        watcher.start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    if batcher is not None:
+        await batcher.stop()
+
+
+app = FastAPI(title="Local Medicine AI Service", version="1.0.0", lifespan=lifespan)
 
 # Allow all origins for simplicity (Flutter Web / mobile). Adjust in production if needed.
 app.add_middleware(
@@ -32,14 +192,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-translator = TranslatorService()
-predictor = MedicinePredictor()
+
+# Model work runs on its own bounded pool, never on AnyIO's threadpool, so
+# /health and /ready stay responsive while inference is saturated.
+inference = InferenceExecutor(max_workers=settings.INFERENCE_WORKERS,
+                              max_queue=settings.INFERENCE_QUEUE_SIZE)
+
+REQUEST_SECONDS = metrics.histogram("medicine_request_duration_seconds",
+                                    "Prediction request latency by endpoint", ("endpoint",))
+QUERIES = metrics.counter("medicine_queries", "Predicted queries by detected input language",
+                          ("language",))
+EMPTY_RESULTS = metrics.counter("medicine_empty_results", "Predicted queries with no suggestions")
+PREDICTOR_QUERIES = metrics.counter("medicine_predictor_queries",
+                                    "Queries scored, by predictor mode (ml or lite)", ("mode",))
+CACHE_LOOKUPS = metrics.counter("medicine_response_cache_lookups",
+                                "Response cache lookups by result (hit or miss)", ("result",))
+metrics.gauge("medicine_ml_available", "1 when the ML predictor is loaded, 0 in lite mode",
+              function=lambda: float(bool(ML_AVAILABLE)))
+metrics.gauge("medicine_models_ready", "1 once models are loaded", function=lambda: float(_ready.is_set()))
+metrics.gauge("medicine_inference_queue_depth", "Jobs waiting for an inference worker",
+              function=lambda: inference.queue_depth)
+metrics.gauge("medicine_inference_in_flight", "Jobs running on inference workers",
+              function=lambda: inference.in_flight)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(settings.OVERLOAD_RETRY_AFTER_S)})
+
+
+async def _run_inference(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(inference, fn, *args)
+
+
+def _predict_batch(queries: List[str], top_k: int = 5):
+    return _predict_uncached(queries, top_k)
+
+
+batcher = (
+    MicroBatcher(_predict_batch,
+                 window_ms=settings.BATCH_WINDOW_MS,
+                 max_batch_size=settings.BATCH_MAX_SIZE,
+                 max_queue=settings.INFERENCE_QUEUE_SIZE,
+                 executor=inference)
+    if settings.MICRO_BATCHING else None
+)
+
+if settings.STARTUP_MODE == "eager":
+    load_models()
 
 
 class PredictRequest(BaseModel):
     symptoms: str
 
 
+class PredictBatchRequest(BaseModel):
+    symptoms: List[str] = Field(..., min_length=1, max_length=settings.MAX_BATCH_SIZE)
+
+
 class SuggestionOut(BaseModel):
     medicine: str
     score: float
@@ -49,30 +260,84 @@ class PredictResponse(BaseModel):
     input_language: str
     normalized_symptoms_en: str
     suggestions: List[SuggestionOut]
+    # Stage timings of the batch that produced this response (not serialized)
+    _stage_timings: dict = {}
+    # _cache_version() of the predictor that produced it (not serialized)
+    _cache_version: str | None = None
+
+
+class PredictBatchResponse(BaseModel):
+    results: List[PredictResponse]
 
 
 @app.get("/health")
 def health():
+    """Liveness: the process is up and serving HTTP."""
     return {"status": "ok"}
 
 
-@app.post("/predict_medicine", response_model=PredictResponse)
-def predict(req: PredictRequest):
-    text = req.symptoms.strip()
-    lang = detect_language(text)
+@app.get("/ready")
+def ready():
+    """Readiness: models are loaded and predictions can be served."""
+    if _ready.is_set():
+        return {"status": "ready", "ml_available": ML_AVAILABLE, "translator": TRANSLATOR_MODE}
+    if _load_error is not None and (_load_thread is None or not _load_thread.is_alive()):
+        return JSONResponse(status_code=503, content={"status": "error", "detail": _load_error})
+    return JSONResponse(status_code=503, content={"status": "loading"})
 
-    query_en = text
-    if lang in ("te", "mixed"):
-        query_en = translator.te_to_en(text)
 
-    suggestions = predictor.predict(query_en, top_k=5)
+@app.get("/stats")
+def stats():
+    return {
+        "ml_available": ML_AVAILABLE,
+        "translator": TRANSLATOR_MODE,
+        "inference": inference.stats(),
+        "micro_batching": batcher.stats() if batcher is not None else None,
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "query_embedding_cache": (
+            predictor.query_cache.stats() if hasattr(predictor, "query_cache") else None
+        ),
+    }
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of this process's counters and histograms."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _set_server_timing(response: Response, timings: dict, started: float) -> None:
+    if settings.SERVER_TIMING:
+        timings = dict(timings, total=time.perf_counter() - started)
+        response.headers["Server-Timing"] = metrics.server_timing(timings)
+
+
+def _normalize_queries(symptoms: List[str]):
+    """Detect languages and translate Telugu/mixed input to English."""
+    texts = [text.strip() for text in symptoms]
+    with metrics.stage("detect_language"):
+        langs = [detect_language(text) for text in texts]
+
+    queries_en = list(texts)
+    te_rows = [j for j, lang in enumerate(langs) if lang in ("te", "mixed")]
+    if te_rows:
+        with metrics.stage("te_to_en"):
+            # One model batch for every Telugu/mixed query
+            for j, query_en in zip(te_rows, translator.te_to_en_batch([texts[j] for j in te_rows])):
+                queries_en[j] = query_en
+    return list(zip(langs, queries_en))
+
+
+def _build_response(lang: str, query_en: str, suggestions, te_names=None) -> PredictResponse:
     # If original input was Telugu/mixed, translate medicine names back to Telugu
     if lang in ("te", "mixed"):
-        translated = []
-        for s in suggestions:
-            te_name = translator.en_to_te(s.medicine)
-            translated.append(SuggestionOut(medicine=te_name, score=s.score))
-        out_suggestions = translated
+        if te_names is None:
+            # Name table first, remaining names in a single model batch
+            te_names = translator.en_to_te_batch([s.medicine for s in suggestions])
+        out_suggestions = [
+            SuggestionOut(medicine=te_name, score=s.score)
+            for s, te_name in zip(suggestions, te_names)
+        ]
     else:
         out_suggestions = [SuggestionOut(medicine=s.medicine, score=s.score) for s in suggestions]
 
@@ -81,3 +346,180 @@ def predict(req: PredictRequest):
         normalized_symptoms_en=query_en,
         suggestions=out_suggestions,
     )
+
+
+def _cache_get(text: str):
+    if response_cache is None:
+        return None
+    with metrics.stage("cache"):
+        cached = response_cache.get(normalize_query(text))
+    CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    response = PredictResponse(**cached)
+    if response.input_language == "en":
+        # Keys ignore token order/punctuation; echo this request's own text
+        response.normalized_symptoms_en = text.strip()
+    return response
+
+
+def _cache_set(text: str, response: PredictResponse) -> None:
+    if response_cache is not None:
+        # Skipped if the dataset was reloaded while this response was computed
+        response_cache.set(normalize_query(text), response.model_dump(),
+                           version=response._cache_version)
+
+
+@app.post("/predict_medicine", response_model=PredictResponse)
+async def predict(req: PredictRequest, http_response: Response):
+    started = time.perf_counter()
+    await _require_ready()
+    with metrics.collect_stages() as timings:
+        response = _cache_get(req.symptoms)
+        if response is None:
+            if batcher is not None:
+                # Coalesced with concurrent requests into one pass on the inference pool
+                response = await batcher.submit(req.symptoms, top_k=5)
+            else:
+                response = (await _run_inference(_predict_uncached, [req.symptoms]))[0]
+            metrics.record_stages(response._stage_timings)
+            _cache_set(req.symptoms, response)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/predict_medicine")
+    _set_server_timing(http_response, timings, started)
+    return response
+
+
+def _predict_uncached(symptoms: List[str], top_k: int = 5) -> List[PredictResponse]:
+    """Language detection, translation and prediction for a list of queries."""
+    # One predictor for the whole batch, even if reload_dataset() swaps it meanwhile
+    current = predictor
+    with metrics.collect_stages() as timings:
+        normalized = _normalize_queries(symptoms)
+        # One encode + similarity pass for all queries
+        batch_suggestions = current.predict_batch([q for _, q in normalized], top_k=top_k)
+
+        # Translate every Telugu/mixed result's medicine names in one call
+        te_rows = [j for j, (lang, _) in enumerate(normalized) if lang in ("te", "mixed")]
+        names = [s.medicine for j in te_rows for s in batch_suggestions[j]]
+        translated = []
+        if names:
+            with metrics.stage("en_to_te"):
+                translated = translator.en_to_te_batch(names)
+        translated = iter(translated)
+        te_names = {j: [next(translated) for _ in batch_suggestions[j]] for j in te_rows}
+
+        responses = [
+            _build_response(lang, query_en, suggestions, te_names.get(j))
+            for j, ((lang, query_en), suggestions) in enumerate(zip(normalized, batch_suggestions))
+        ]
+
+    PREDICTOR_QUERIES.inc(len(symptoms), mode="ml" if ML_AVAILABLE else "lite")
+    for lang, _ in normalized:
+        QUERIES.inc(language=lang)
+    empty = sum(1 for suggestions in batch_suggestions if not suggestions)
+    if empty:
+        EMPTY_RESULTS.inc(empty)
+    version = _cache_version(current)
+    for response in responses:
+        response._stage_timings = timings
+        response._cache_version = version
+    return responses
+
+
+def _predict_many(symptoms: List[str]) -> List[PredictResponse]:
+    results = [_cache_get(text) for text in symptoms]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if misses:
+        for i, response in zip(misses, _predict_uncached([symptoms[i] for i in misses])):
+            results[i] = response
+            _cache_set(symptoms[i], response)
+    return results
+
+
+def _predict_many_timed(symptoms: List[str]):
+    with metrics.collect_stages() as timings:
+        results = _predict_many(symptoms)
+    return results, timings
+
+
+@app.post("/predict_medicine_batch", response_model=PredictBatchResponse)
+async def predict_batch(req: PredictBatchRequest, http_response: Response):
+    started = time.perf_counter()
+    await _require_ready()
+    results, timings = await _run_inference(_predict_many_timed, req.symptoms)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/predict_medicine_batch")
+    _set_server_timing(http_response, timings, started)
+    return PredictBatchResponse(results=results)
+
+
+@app.post("/admin/reload_dataset")
+async def admin_reload_dataset(x_admin_token: str | None = Header(default=None)):
+    """Re-read the dataset CSV and hot-swap the predictor (requires X-Admin-Token)."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN")
+    if not hmac.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    await _require_ready()
+    try:
+        return await run_in_threadpool(reload_dataset)
+    except ValueError as exc:
+        # Malformed CSV: keep serving the previous dataset
+        raise HTTPException(status_code=422, detail=f"Dataset not reloaded: {exc}")
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator may keep reading the request body.
+    The stock class listens for disconnects on `receive` while streaming
+    (ASGI < 2.4, i.e. uvicorn), which would swallow request body chunks.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _predict_chunk(chunk) -> str:
+    texts = [symptoms for _, _, symptoms, error in chunk if error is None]
+    while True:
+        try:
+            # Bulk rows skip the response cache: one-off exports would evict the
+            # hot interactive entries and gain nothing from lookups
+            responses = await _run_inference(_predict_uncached, texts) if texts else []
+            break
+        except Overloaded:
+            # Bulk jobs wait for interactive traffic instead of failing mid-stream
+            await asyncio.sleep(settings.OVERLOAD_RETRY_AFTER_S)
+    return "".join(format_results(chunk, (r.model_dump() for r in responses)))
+
+
+async def _stream_predictions(request: Request, parser: RecordParser):
+    chunk = []
+    try:
+        async for line in aiter_lines(request.stream()):
+            record = parser.feed(line)
+            if record is None:
+                continue
+            chunk.append(record)
+            if len(chunk) >= settings.STREAM_CHUNK_SIZE:
+                yield await _predict_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield await _predict_chunk(chunk)
+    except InputFormatError as exc:
+        if chunk:
+            yield await _predict_chunk(chunk)
+        yield fatal_line(parser.line_no, str(exc))
+
+
+@app.post("/predict_medicine_stream")
+async def predict_stream(request: Request):
+    """
+    Bulk predictions for an NDJSON body (or CSV with Content-Type: text/csv),
+    processed in chunks and streamed back as NDJSON, one line per input row.
+    """
+    await _require_ready()
+    parser = RecordParser(format_for_content_type(request.headers.get("content-type", "")))
+    return _DuplexStreamingResponse(_stream_predictions(request, parser),
+                                    media_type="application/x-ndjson")
@@ -0,0 +1,163 @@
+"""
+Pre-forking launcher for the AI service.
+
+The master process loads the models and embeddings once, then forks worker
+processes that serve the same listening socket. Model weights, the mmap'd
+embedding matrix and the index are shared copy-on-write, so each extra
+worker only adds its own interpreter/heap overhead instead of a full copy of
+the model.
+
+POSIX only (requires os.fork). Used by main.py when WORKERS > 1.
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from collections import deque
+
+import uvicorn
+
+logger = logging.getLogger("prefork")
+
+
+def _set_torch_threads(threads: int) -> None:
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class RestartLimiter:
+    """
+    Exponential backoff between worker restarts, capped at `max_restarts`
+    within any `window_s` seconds. The delay doubles with each restart still
+    inside the window, so a worker that stays up resets it.
+    """
+
+    def __init__(self, max_restarts: int, window_s: float, base_delay_s: float = 0.5,
+                 max_delay_s: float = 30.0, clock=time.monotonic):
+        self.max_restarts = max_restarts
+        self.window_s = window_s
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.clock = clock
+        self.recent = deque()
+
+    def next_delay(self):
+        """Seconds to wait before the next restart, or None if the limit is exceeded."""
+        now = self.clock()
+        while self.recent and now - self.recent[0] > self.window_s:
+            self.recent.popleft()
+        if len(self.recent) >= self.max_restarts:
+            return None
+        delay = min(self.max_delay_s, self.base_delay_s * 2 ** len(self.recent))
+        self.recent.append(now)
+        return delay
+
+
+def _run_worker(app, sock: socket.socket, threads: int, log_level: str) -> None:
+    # Each worker gets its own slice of the cores so they don't oversubscribe
+    _set_torch_threads(threads)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, threads_per_worker: int = 0, log_level: str = "info",
+          max_restarts: int = 5, restart_window_s: float = 60.0) -> None:
+    if not hasattr(os, "fork"):
+        raise RuntimeError("The pre-forking launcher requires os.fork (Linux/macOS)")
+    logging.basicConfig(level=log_level.upper(), format="%(asctime)s [%(name)s] %(message)s")
+
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    # Warm up single-threaded: intra-op thread pools started before fork are
+    # not usable in the children. ONNX sessions must therefore be created with
+    # one thread (ENCODER_THREADS=1 is forced below for that backend).
+    os.environ["STARTUP_MODE"] = "eager"
+    if os.environ.get("ENCODER_BACKEND") == "onnx":
+        os.environ["ENCODER_THREADS"] = "1"
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+    started = time.perf_counter()
+    from app.api import app  # loads models (STARTUP_MODE=eager)
+    _set_torch_threads(threads)
+    logger.info("Models preloaded in %.2fs; forking %d workers x %d threads",
+                time.perf_counter() - started, workers, threads)
+
+    # Move everything allocated so far out of GC tracking so collections in
+    # the workers don't touch (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind(host, port)
+    children = set()
+    limiter = RestartLimiter(max_restarts, restart_window_s)
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                _run_worker(app, sock, threads, log_level)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    stopping = False
+    failed = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        spawn()
+    logger.info("Listening on http://%s:%d (master pid %d)", host, port, os.getpid())
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if stopping:
+            continue
+        delay = limiter.next_delay()
+        if delay is None:
+            logger.error("Worker %d exited (status %d); more than %d restarts in %.0fs, shutting down",
+                         pid, status, max_restarts, restart_window_s)
+            failed = True
+            stop(None, None)
+            continue
+        logger.warning("Worker %d exited (status %d); restarting in %.1fs", pid, status, delay)
+        # Short sleeps so SIGTERM during the backoff is not held up
+        deadline = time.monotonic() + delay
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(min(0.1, delay))
+        if not stopping:
+            spawn()
+    sock.close()
+    if failed:
+        sys.exit(1)
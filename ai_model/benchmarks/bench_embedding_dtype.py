@@ -0,0 +1,85 @@
+"""
+Memory / latency / recall benchmark for the embedding storage precisions
+(EMBEDDING_DTYPE) with exact dot-product search.
+
+Compares against re-normalizing the float32 matrix on every query, which is
+what scoring with `sentence_transformers.util.cos_sim` did. Uses synthetic
+clustered embeddings shaped like all-MiniLM-L6-v2 output, so it runs without
+downloading the model:
+
+    python benchmarks/bench_embedding_dtype.py --rows 100000 --json dtype.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_index import make_dataset, recall_at_k
+from utils.embedding_store import SUPPORTED_DTYPES, EmbeddingStore, row_key
+from utils.vector_index import ExactIndex, _top_k
+
+
+def cos_sim_search(data: np.ndarray, query: np.ndarray, k: int):
+    """Baseline: normalize the whole matrix and the query on every call."""
+    a = query / np.linalg.norm(query, axis=1, keepdims=True)
+    b = data / np.linalg.norm(data, axis=1, keepdims=True)
+    return _top_k(a @ b.T, k)
+
+
+def time_queries(search, queries: np.ndarray, k: int):
+    """Per-query latency (batch size 1, as in /predict_medicine)."""
+    ids = []
+    start = time.perf_counter()
+    for q in queries:
+        ids.append(search(q[None, :], k)[1][0])
+    return np.stack(ids), (time.perf_counter() - start) / len(queries) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=1.5, help='Within-cluster spread')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    data, queries = make_dataset(args.rows, args.dim, args.clusters, args.queries, args.noise, args.seed)
+    keys = [row_key(str(i)) for i in range(len(data))]
+    results = []
+
+    baseline_ids, baseline_ms = time_queries(lambda q, k: cos_sim_search(data, q, k), queries, args.k)
+    results.append({'storage': 'float32 + cos_sim', 'mb': data.nbytes / 1e6,
+                    'latency_ms': baseline_ms, 'recall': 1.0})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in SUPPORTED_DTYPES:
+            store = EmbeddingStore(os.path.join(tmp, f'{dtype}.npy'), os.path.join(tmp, f'{dtype}.json'))
+            matrix = store.save(data, {}, keys, dtype=dtype)
+            index = ExactIndex(matrix, normalized=True)
+            ids, ms = time_queries(index.search, queries, args.k)
+            results.append({'storage': dtype, 'mb': matrix.nbytes / 1e6, 'latency_ms': ms,
+                            'recall': recall_at_k(ids, baseline_ids)})
+            del index, matrix
+
+    print(f"rows={args.rows} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'storage':<20}{'MB':>10}{'ms/query':>10}{'recall@k':>10}")
+    for r in results:
+        print(f"{r['storage']:<20}{r['mb']:>10.1f}{r['latency_ms']:>10.3f}{r['recall']:>10.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Parity check and latency/RSS benchmark for the encoder backends.
+
+Each backend runs in its own subprocess so resident memory is measured in
+isolation. Exits non-zero if any ONNX variant's embeddings fall below the
+cosine-similarity threshold against the torch path:
+
+    python benchmarks/bench_encoder.py --backends torch onnx onnx-int8 --queries 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PARITY_TEXTS = [
+    "fever and headache",
+    "cough cold sore throat congestion",
+    "body pain with fever and fatigue",
+    "acid reflux heartburn after meals",
+    "allergy sneezing runny nose",
+    "stomach pain diarrhea loose motions",
+    "mild fever since two days, feeling weak",
+    "dry cough at night",
+    "severe headache and vomiting",
+    "itchy skin rash",
+]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024.0 if sys.platform != "darwin" else peak / (1024.0 * 1024.0)
+
+
+def run_backend(backend: str, queries: int, out_path: str) -> dict:
+    from utils import settings
+    from utils.encoders import create_encoder
+
+    start = time.perf_counter()
+    if backend == "onnx-int8":
+        encoder = create_encoder("onnx", settings.MODEL_NAME, quantize=True)
+    else:
+        encoder = create_encoder(backend, settings.MODEL_NAME)
+    load_s = time.perf_counter() - start
+
+    np.save(out_path, encoder.encode(PARITY_TEXTS))
+
+    encoder.encode(PARITY_TEXTS[:1])  # warm-up
+    latencies = []
+    for i in range(queries):
+        text = PARITY_TEXTS[i % len(PARITY_TEXTS)]
+        t0 = time.perf_counter()
+        encoder.encode([text], batch_size=1)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    lat = np.array(latencies)
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "mean_ms": float(lat.mean()),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="*", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.99)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        # Export/quantize once so the measured runs only load the ONNX files
+        from utils import settings
+        from utils.encoders import create_encoder
+        create_encoder("onnx", settings.MODEL_NAME, quantize=True)
+        return 0
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.queries, args.out)))
+        return 0
+
+    results = []
+    embeddings = {}
+    if any(b.startswith("onnx") for b in args.backends):
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--prepare"], cwd=ROOT, check=True,
+                       capture_output=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            out = os.path.join(tmp, f"{backend}.npy")
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", backend,
+                 "--queries", str(args.queries), "--out", out],
+                cwd=ROOT, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                return proc.returncode
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            embeddings[backend] = np.load(out)
+
+    ok = True
+    if "torch" in embeddings:
+        for r in results:
+            cos = (embeddings["torch"] * embeddings[r["backend"]]).sum(axis=1)
+            r["min_cosine_vs_torch"] = float(cos.min())
+            if cos.min() < args.threshold:
+                ok = False
+
+    print(f"{'backend':<11}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'peak RSS MB':>13}{'min cos':>10}")
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        cos = f"{r['min_cosine_vs_torch']:.5f}" if "min_cosine_vs_torch" in r else "-"
+        print(f"{r['backend']:<11}{r['load_s']:>8.2f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{rss:>13}{cos:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+    if not ok:
+        print(f"FAIL: cosine similarity below {args.threshold}", file=sys.stderr)
+        return 1
+    print(f"PASS: all backends within cosine {args.threshold} of torch")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Recall@k vs latency benchmark for the nearest-neighbour index backends.
+
+Uses synthetic clustered embeddings shaped like all-MiniLM-L6-v2 output so it
+runs without downloading the model:
+
+    python benchmarks/bench_index.py --rows 50000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vector_index import ExactIndex, IVFIndex, normalize
+
+
+def make_dataset(rows: int, dim: int, clusters: int, queries: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, rows)
+    data = centers[labels] + noise * rng.standard_normal((rows, dim)).astype(np.float32)
+    q_labels = rng.integers(0, clusters, queries)
+    q = centers[q_labels] + noise * rng.standard_normal((queries, dim)).astype(np.float32)
+    return normalize(data), normalize(q)
+
+
+def time_search(index, queries: np.ndarray, k: int):
+    """Per-query latency (batch size 1, as in /predict_medicine)."""
+    results = []
+    start = time.perf_counter()
+    for q in queries:
+        results.append(index.search(q[None, :], k)[1][0])
+    elapsed = time.perf_counter() - start
+    return np.stack(results), elapsed / len(queries) * 1000.0
+
+
+def recall_at_k(approx: np.ndarray, exact: np.ndarray) -> float:
+    hits = sum(len(set(a.tolist()) & set(e.tolist())) for a, e in zip(approx, exact))
+    return hits / exact.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=1.5, help='Within-cluster spread')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--nlist', type=int, nargs='*', default=[0], help='0 = sqrt(rows)')
+    parser.add_argument('--nprobe', type=int, nargs='*', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    data, queries = make_dataset(args.rows, args.dim, args.clusters, args.queries, args.noise, args.seed)
+    results = []
+
+    exact = ExactIndex(data)
+    exact_ids, exact_ms = time_search(exact, queries, args.k)
+    results.append({'backend': 'exact', 'build_s': 0.0, 'latency_ms': exact_ms, 'recall': 1.0})
+
+    for nlist in args.nlist:
+        start = time.perf_counter()
+        ivf = IVFIndex(data, nlist=nlist or None, kmeans_iters=10, seed=args.seed).build()
+        build_s = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            ivf.nprobe = max(1, min(nprobe, ivf.nlist))
+            ids, ms = time_search(ivf, queries, args.k)
+            results.append({'backend': 'ivf', 'nlist': ivf.nlist, 'nprobe': ivf.nprobe,
+                            'build_s': build_s, 'latency_ms': ms,
+                            'recall': recall_at_k(ids, exact_ids)})
+
+    print(f"rows={args.rows} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'backend':<8}{'nlist':>7}{'nprobe':>8}{'build s':>10}{'ms/query':>10}{'recall@k':>10}")
+    for r in results:
+        print(f"{r['backend']:<8}{r.get('nlist', '-'):>7}{r.get('nprobe', '-'):>8}"
+              f"{r['build_s']:>10.2f}{r['latency_ms']:>10.3f}{r['recall']:>10.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Latency and accuracy of the language detectors in utils/language_detector.py.
+
+Builds a labelled corpus from the English symptoms in the dataset, a small
+Telugu symptom vocabulary and code-mixed combinations of the two, then
+reports per-call latency, accuracy against the labels and agreement with the
+original langdetect detector:
+
+    python benchmarks/bench_language.py --samples 3000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.language_detector import detect_language_fast, detect_language_langdetect
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "data", "symptoms_medicines_en.csv")
+
+TELUGU_SYMPTOMS = [
+    "జ్వరం", "తలనొప్పి", "దగ్గు", "జలుబు", "గొంతు నొప్పి", "కడుపు నొప్పి",
+    "వాంతులు", "విరేచనాలు", "ఒళ్ళు నొప్పులు", "అలసట", "తల తిరగడం", "ఛాతీ నొప్పి",
+]
+TELUGU_GLUE = ["మరియు", "నాకు", "ఉంది", "రెండు రోజులుగా", "ఎక్కువగా"]
+ROMANIZED = ["jwaram", "tala noppi", "daggu", "jalubu", "kadupu noppi", "vantulu"]
+UNITS = ["500mg", "650 mg", "3 రోజులు", "102°F"]
+
+
+def english_symptoms():
+    with open(DATASET, newline="", encoding="utf-8") as f:
+        rows = [r["symptoms"] for r in csv.DictReader(f)]
+    symptoms = sorted({s.strip() for r in rows for s in r.split(";") if s.strip()})
+    return symptoms + ["headache", "fever", "cough", "stomach pain", "vomiting"]
+
+
+def make_corpus(samples: int, seed: int):
+    rng = random.Random(seed)
+    en_words = english_symptoms()
+    corpus = []
+    for i in range(samples):
+        kind = i % 4
+        if kind == 0:
+            text = " and ".join(rng.sample(en_words, rng.randint(1, 3)))
+            if rng.random() < 0.3:
+                text = " ".join(rng.sample(ROMANIZED, 2))
+            label = "en"
+        elif kind == 1:
+            parts = rng.sample(TELUGU_SYMPTOMS, rng.randint(1, 3))
+            if rng.random() < 0.5:
+                parts.insert(1, rng.choice(TELUGU_GLUE))
+            if rng.random() < 0.3:
+                parts.append(rng.choice(UNITS))
+            text = " ".join(parts)
+            label = "te"
+        else:
+            te = rng.sample(TELUGU_SYMPTOMS, rng.randint(1, 2))
+            en = rng.sample(en_words, rng.randint(1, 2))
+            parts = te + en
+            rng.shuffle(parts)
+            text = " ".join(parts)
+            label = "mixed"
+        corpus.append((text, label))
+    return corpus
+
+
+def run(name, fn, corpus, reference):
+    start = time.perf_counter()
+    preds = [fn(text) for text, _ in corpus]
+    elapsed = time.perf_counter() - start
+    accuracy = sum(p == label for p, (_, label) in zip(preds, corpus)) / len(corpus)
+    agreement = (sum(p == r for p, r in zip(preds, reference)) / len(corpus)
+                 if reference is not None else 1.0)
+    by_label = {}
+    for p, (_, label) in zip(preds, corpus):
+        hit, total = by_label.get(label, (0, 0))
+        by_label[label] = (hit + (p == label), total + 1)
+    return preds, {
+        "detector": name,
+        "us_per_call": elapsed / len(corpus) * 1e6,
+        "accuracy": accuracy,
+        "accuracy_by_label": {k: h / t for k, (h, t) in sorted(by_label.items())},
+        "agreement_with_langdetect": agreement,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.samples, args.seed)
+    # Warm up langdetect's profile loading so it isn't billed to the first call
+    detect_language_langdetect("warm up")
+
+    reference, base = run("langdetect", detect_language_langdetect, corpus, None)
+    results = [base]
+    for name, fn in (
+        ("fast", detect_language_fast),
+        ("hybrid", lambda t: detect_language_fast(t, fallback=True)),
+    ):
+        results.append(run(name, fn, corpus, reference)[1])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{len(corpus)} samples")
+    print(f"{'detector':>10} {'us/call':>9} {'accuracy':>9} {'en':>6} {'te':>6} {'mixed':>6} {'agree':>6}")
+    for r in results:
+        by = r["accuracy_by_label"]
+        print(f"{r['detector']:>10} {r['us_per_call']:9.1f} {r['accuracy']:9.3f} "
+              f"{by.get('en', 0):6.3f} {by.get('te', 0):6.3f} {by.get('mixed', 0):6.3f} "
+              f"{r['agreement_with_langdetect']:6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Reproducible benchmark suite for the AI service.
+
+Micro-benchmarks (per-call latency of `detect_language`, the lite and ML
+predictors and the translator) followed by an in-process load test of
+/predict_medicine: the ASGI app is driven through httpx without a socket, at
+a sweep of concurrency levels, reporting RPS and p50/p95/p99 latency.
+Response and query-embedding caches are off unless --cache is given, and each
+load-test request is a distinct query, so every request reaches the model.
+
+Results, with the git commit and the settings in effect, are written to
+`benchmarks/results/<commit>.json` (or --json) so runs can be diffed across
+commits; --compare prints the change against an earlier result file:
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --concurrency 1 8 32 --duration 5
+    python benchmarks/bench_suite.py --only micro --compare benchmarks/results/1a2b3c4d5e.json
+
+Components whose dependencies are missing (e.g. sentence-transformers for the
+ML predictor) are recorded as skipped with the reason.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+QUERIES = [
+    "fever and headache", "cough cold sore throat", "body pain fatigue",
+    "acid reflux heartburn", "allergy sneezing runny nose", "stomach pain diarrhea",
+    "vomiting nausea", "skin rash itching", "joint pain swelling", "dizziness weakness",
+]
+TELUGU_QUERIES = ["జ్వరం మరియు తలనొప్పి", "దగ్గు జలుబు", "కడుపు నొప్పి", "fever మరియు తలనొప్పి"]
+MEDICINE_NAMES = ["Paracetamol 500mg", "Dolo 650", "Crocin Advance", "Cetrizine 10mg", "ORS Solution"]
+
+# Settings recorded with every run (they change what is being measured)
+SETTINGS = [
+    "LANG_DETECTOR", "ENCODER_BACKEND", "ONNX_QUANTIZE", "EMBEDDING_DTYPE", "INDEX_BACKEND",
+    "AGGREGATION", "CANDIDATE_ROWS", "DRUGS_CORPUS", "MICRO_BATCHING", "BATCH_WINDOW_MS",
+    "BATCH_MAX_SIZE", "INFERENCE_WORKERS", "INFERENCE_QUEUE_SIZE", "RESPONSE_CACHE",
+    "QUERY_EMBED_CACHE_SIZE", "TRANSLATOR",
+]
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _summary_us(samples_ns):
+    samples = sorted(s / 1000.0 for s in samples_ns)
+    return {"calls": len(samples), "mean_us": sum(samples) / len(samples),
+            "p50_us": _percentile(samples, 0.50), "p95_us": _percentile(samples, 0.95),
+            "p99_us": _percentile(samples, 0.99)}
+
+
+def time_calls(fn, inputs, calls: int, warmup: int = 20) -> dict:
+    """Per-call latency of fn over `calls` calls, cycling through `inputs`."""
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+    samples = []
+    for i in range(calls):
+        arg = inputs[i % len(inputs)]
+        t0 = time.perf_counter_ns()
+        fn(arg)
+        samples.append(time.perf_counter_ns() - t0)
+    return _summary_us(samples)
+
+
+def _skipped(exc: BaseException) -> dict:
+    message = str(exc).strip().splitlines()
+    return {"skipped": f"{type(exc).__name__}: {message[0] if message else ''}"}
+
+
+def run_micro(calls: int) -> dict:
+    from utils.language_detector import detect_language
+
+    results = {}
+    texts = QUERIES + TELUGU_QUERIES
+    results["detect_language"] = time_calls(detect_language, texts, calls)
+
+    from utils import predictor_lite
+    lite = predictor_lite.MedicinePredictor()
+    results["predictor_lite.predict"] = time_calls(lambda q: lite.predict(q, top_k=5), QUERIES, calls)
+
+    try:
+        from utils import predictor
+        ml = predictor.MedicinePredictor()
+    except Exception as exc:  # missing ML stack or model
+        results["predictor.predict"] = _skipped(exc)
+    else:
+        # Distinct queries so the query embedding cache (if enabled) cannot hide the encoder
+        unique = [f"{QUERIES[i % len(QUERIES)]} {i}" for i in range(calls + 20)]
+        results["predictor.predict"] = time_calls(lambda q: ml.predict(q, top_k=5), unique, calls)
+        results["predictor.predict_batch[32]"] = time_calls(
+            lambda i: ml.predict_batch(unique[i:i + 32], top_k=5), list(range(0, calls, 32)) or [0],
+            max(calls // 32, 1), warmup=2)
+
+    from utils.translator_lite import TranslatorService as LiteTranslator
+    lite_tr = LiteTranslator()
+    results["translator_lite.en_to_te_batch[5]"] = time_calls(
+        lite_tr.en_to_te_batch, [MEDICINE_NAMES], calls)
+
+    try:
+        from utils.translator import TranslatorService as MarianTranslator
+        marian = MarianTranslator()
+        marian.en_to_te("fever")
+    except Exception as exc:  # transformers / sentencepiece / model weights
+        results["translator.en_to_te"] = _skipped(exc)
+    else:
+        # Far slower than everything else; a few calls are enough
+        results["translator.en_to_te"] = time_calls(marian.en_to_te, MEDICINE_NAMES,
+                                                     max(calls // 50, 5), warmup=2)
+    return results
+
+
+async def _drive(client, concurrency: int, duration: float, offset: int) -> dict:
+    latencies = []
+    statuses = {}
+    stop_at = time.perf_counter() + duration
+
+    async def worker(n: int):
+        i = offset + n
+        while time.perf_counter() < stop_at:
+            body = {"symptoms": f"{QUERIES[i % len(QUERIES)]} {i}"}
+            i += concurrency
+            t0 = time.perf_counter()
+            resp = await client.post("/predict_medicine", json=body)
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+            if resp.status_code == 200:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {"concurrency": concurrency, "requests": len(latencies), "rps": len(latencies) / wall,
+            "p50_ms": _percentile(latencies, 0.50), "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "statuses": {str(k): v for k, v in sorted(statuses.items())}}
+
+
+async def run_load(levels, duration: float, warmup: float) -> list:
+    import httpx
+    from app import api
+
+    api.load_models()
+    results = []
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.lifespan(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            offset = 0
+            for concurrency in levels:
+                await _drive(client, concurrency, warmup, offset)
+                offset += 1_000_000
+                results.append(await _drive(client, concurrency, duration, offset))
+                offset += 1_000_000
+    return results
+
+
+def _git(*args) -> str | None:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    import numpy as np
+    from utils import settings
+
+    commit = _git("rev-parse", "HEAD")
+    return {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")) if commit else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {name: getattr(settings, name, None) for name in SETTINGS},
+    }
+
+
+def _flatten(results: dict) -> dict:
+    """Comparable metrics keyed by name, e.g. 'micro.detect_language.p50_us'."""
+    flat = {}
+    for name, r in results.get("micro", {}).items():
+        for key in ("p50_us", "p95_us"):
+            if r.get(key) is not None:
+                flat[f"micro.{name}.{key}"] = r[key]
+    for r in results.get("load", []):
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if r.get(key) is not None:
+                flat[f"load.c{r['concurrency']}.{key}"] = r[key]
+    return flat
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    env = results["environment"]
+    print(f"commit={(env['commit'] or 'unknown')[:10]}{' (dirty)' if env['dirty'] else ''} "
+          f"python={env['python']} cpus={env['cpus']}")
+    if results.get("micro"):
+        print(f"\n{'micro-benchmark':<36}{'calls':>7}{'mean us':>11}{'p50 us':>11}{'p95 us':>11}{'p99 us':>11}")
+        for name, r in results["micro"].items():
+            if "skipped" in r:
+                print(f"{name:<36}  skipped: {r['skipped']}")
+            else:
+                print(f"{name:<36}{r['calls']:>7}{r['mean_us']:>11.1f}{r['p50_us']:>11.1f}"
+                      f"{r['p95_us']:>11.1f}{r['p99_us']:>11.1f}")
+    if results.get("load"):
+        print(f"\n{'concurrency':>11}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+        for r in results["load"]:
+            print(f"{r['concurrency']:>11}{r['rps']:>9.1f}{r['p50_ms'] or 0:>9.2f}{r['p95_ms'] or 0:>9.2f}"
+                  f"{r['p99_ms'] or 0:>9.2f}  {r['statuses']}")
+    if baseline is not None:
+        base_env = baseline.get("environment", {})
+        print(f"\nchange vs {(base_env.get('commit') or 'unknown')[:10]} "
+              "(rps: higher is better; latencies: lower is better)")
+        old, new = _flatten(baseline), _flatten(results)
+        for key in sorted(old.keys() & new.keys()):
+            change = (new[key] - old[key]) / old[key] * 100.0 if old[key] else float("nan")
+            print(f"  {key:<52}{old[key]:>11.2f} -> {new[key]:>11.2f}  {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=["micro", "load"], help="Run one part of the suite")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per micro-benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Warm-up seconds per level")
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the response and query-embedding caches enabled")
+    parser.add_argument("--json", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to diff against")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so this must precede importing utils/app
+    os.environ.setdefault("STARTUP_MODE", "lazy")
+    if not args.cache:
+        os.environ["RESPONSE_CACHE"] = "false"
+        os.environ["QUERY_EMBED_CACHE_SIZE"] = "0"
+
+    results = {"args": vars(args), "environment": environment()}
+    if args.only in (None, "micro"):
+        results["micro"] = run_micro(args.calls)
+    if args.only in (None, "load"):
+        results["load"] = asyncio.run(run_load(args.concurrency, args.duration, args.warmup))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    path = args.json
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{(results['environment']['commit'] or 'unknown')[:10]}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nresults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Throughput scaling of the pre-forking launcher with worker count.
+
+Starts `main.py` with WORKERS=1, 2, 4 ... on a free port, waits for /ready,
+drives /predict_medicine with a closed-loop client, and reports RPS, latency
+percentiles and per-process memory (PSS/USS from /proc, Linux only). Caches
+are disabled so every request reaches the encoder.
+
+    python benchmarks/load_test_workers.py --workers 1 2 4 --concurrency 16 --duration 15
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "fever and headache", "cough cold sore throat", "body pain fatigue",
+    "acid reflux heartburn", "allergy sneezing runny nose", "stomach pain diarrhea",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(proc: subprocess.Popen, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"service exited with status {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError("service did not become ready")
+
+
+def _memory(pid: int) -> dict:
+    """PSS/USS in MB for a process and its children (Linux /proc)."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        return {}
+    out = {}
+    for p in pids:
+        fields = {}
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                        fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+        except OSError:
+            continue
+        out[p] = {
+            "rss_mb": fields.get("Rss", 0.0),
+            "pss_mb": fields.get("Pss", 0.0),
+            "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        }
+    return out
+
+
+def _drive(port: int, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(worker_id: int):
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        i = worker_id
+        while time.monotonic() < stop_at:
+            body = json.dumps({"symptoms": f"{QUERIES[i % len(QUERIES)]} {i}"})
+            i += concurrency
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", "/predict_medicine", body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status == 200
+            except OSError:
+                ok = False
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+
+    return {"requests": len(latencies), "errors": errors, "rps": len(latencies) / duration,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        port = _free_port()
+        env = dict(os.environ, PORT=str(port), WORKERS=str(workers), RELOAD="false",
+                   RESPONSE_CACHE="false", QUERY_EMBED_CACHE_SIZE="0")
+        proc = subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_ready(proc, port, args.ready_timeout)
+            _drive(port, args.concurrency, 2.0)  # warm-up
+            run = _drive(port, args.concurrency, args.duration)
+            mem = _memory(proc.pid)
+            run.update({"workers": workers, "memory": mem})
+            results.append(run)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print(f"{'workers':>7}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'total PSS MB':>14}")
+    for r in results:
+        pss = sum(m["pss_mb"] for m in r["memory"].values()) if r["memory"] else float("nan")
+        print(f"{r['workers']:>7}{r['rps']:>9.1f}{r['p50_ms'] or 0:>9.1f}{r['p95_ms'] or 0:>9.1f}"
+              f"{r['p99_ms'] or 0:>9.1f}{r['errors']:>8}{pss:>14.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Score a large NDJSON or CSV file of patient-reported symptoms.
+
+Reads the input one line at a time, predicts in chunks and writes one NDJSON
+result line per input row, so memory stays flat for any file size. Runs the
+models in-process by default, or streams the file through a running server's
+/predict_medicine_stream endpoint with --url:
+
+    python bulk_predict.py triage.csv -o results.ndjson
+    python bulk_predict.py triage.ndjson --url http://localhost:8001 > results.ndjson
+    cat triage.ndjson | python bulk_predict.py -
+
+Input format is taken from the file extension (.csv -> CSV) unless --format is
+given. CSV needs a header with a `symptoms` column; NDJSON lines are
+{"symptoms": "...", "id": "..."} objects or bare strings. An `id`, when
+present, is echoed back on the result line.
+"""
+import argparse
+import http.client
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import settings
+from utils.bulk import FORMATS, InputFormatError, RecordParser, fatal_line, format_results, iter_lines
+
+READ_SIZE = 64 * 1024
+
+
+def read_chunks(f):
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            return
+        yield data
+
+
+def run_local(f, out, fmt: str, chunk_size: int) -> int:
+    """
+    Predict in-process, writing the same lines as /predict_medicine_stream.
+    On an unreadable input the rows parsed so far are still written, then a
+    fatal line, and InputFormatError is re-raised.
+    """
+    from app import api
+
+    api.load_models()
+    parser = RecordParser(fmt)
+    chunk = []
+    rows = 0
+
+    def flush():
+        nonlocal chunk, rows
+        texts = [symptoms for _, _, symptoms, error in chunk if error is None]
+        responses = api._predict_uncached(texts) if texts else []
+        out.writelines(format_results(chunk, (r.model_dump() for r in responses)))
+        out.flush()
+        rows += len(chunk)
+        chunk = []
+
+    try:
+        for line in iter_lines(read_chunks(f)):
+            record = parser.feed(line)
+            if record is None:
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                flush()
+    except InputFormatError as exc:
+        flush()
+        out.write(fatal_line(parser.line_no, str(exc)))
+        raise
+    flush()
+    return rows
+
+
+def run_remote(f, out, fmt: str, url: str) -> int:
+    """
+    Stream the file to the server while reading results back. Uploading runs
+    on its own thread: the server answers before the body is complete, and a
+    client that only reads after sending everything would deadlock once the
+    socket buffers fill.
+    """
+    parts = urlsplit(url)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parts.netloc)
+    conn.putrequest("POST", parts.path.rstrip("/") + "/predict_medicine_stream")
+    conn.putheader("Content-Type", "text/csv" if fmt == "csv" else "application/x-ndjson")
+    conn.putheader("Transfer-Encoding", "chunked")
+    conn.endheaders()
+
+    upload_error = []
+
+    def upload():
+        try:
+            for data in read_chunks(f):
+                conn.send(b"%x\r\n%s\r\n" % (len(data), data))
+            conn.send(b"0\r\n\r\n")
+        except OSError as exc:
+            upload_error.append(exc)
+
+    uploader = threading.Thread(target=upload, name="bulk-upload", daemon=True)
+    uploader.start()
+    resp = conn.getresponse()
+    if resp.status != 200:
+        raise SystemExit(f"Server returned {resp.status}: {resp.read().decode(errors='replace')}")
+    rows = 0
+    for line in resp:
+        out.write(line.decode("utf-8"))
+        rows += 1
+    uploader.join()
+    conn.close()
+    if upload_error:
+        raise SystemExit(f"Upload failed: {upload_error[0]}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="NDJSON or CSV file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Result NDJSON file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=settings.STREAM_CHUNK_SIZE,
+                        help="Rows per inference call in local mode")
+    parser.add_argument("--url", help="Use a running server instead of loading models locally")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "ndjson")
+    f = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        if args.url:
+            rows = run_remote(f, out, fmt, args.url)
+        else:
+            rows = run_local(f, out, fmt, max(args.chunk_size, 1))
+    except InputFormatError as exc:
+        raise SystemExit(f"Cannot read {args.input}: {exc}")
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f"{rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,4 +11,15 @@ if __name__ == "__main__":
     # Respect PORT env var (used by Hugging Face Spaces). Default to 8001 locally.
     port = int(os.environ.get("PORT", "8001"))
     reload = os.environ.get("RELOAD", "true").lower() == "true"
-    uvicorn.run("app.api:app", host="0.0.0.0", port=port, reload=reload)
+    # WORKERS > 1: preload models once, then fork workers sharing them (POSIX only)
+    workers = int(os.environ.get("WORKERS", "1"))
+    if workers > 1:
+        from app.prefork import serve
+        threads = int(os.environ.get("THREADS_PER_WORKER", "0"))
+        # Crash-looping workers: give up after this many restarts per window
+        max_restarts = int(os.environ.get("WORKER_MAX_RESTARTS", "5"))
+        restart_window_s = float(os.environ.get("WORKER_RESTART_WINDOW_S", "60"))
+        serve("0.0.0.0", port, workers, threads_per_worker=threads,
+              max_restarts=max_restarts, restart_window_s=restart_window_s)
+    else:
+        uvicorn.run("app.api:app", host="0.0.0.0", port=port, reload=reload)
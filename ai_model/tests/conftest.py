@@ -0,0 +1,12 @@
+import os
+import sys
+
+# The service imports its packages relative to ai_model/ (see app/api.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings are read at import time: keep tests off the model files and caches
+os.environ.setdefault("STARTUP_MODE", "lazy")
+os.environ.setdefault("RESPONSE_CACHE", "false")
+os.environ.setdefault("DATASET_WATCH_INTERVAL_S", "0")
+# Encoder tests load cached weights only; an uncached model skips instead of hanging
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
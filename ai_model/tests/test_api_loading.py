@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from app import api
+
+
+def test_health_answers_while_models_load(monkeypatch):
+    release = threading.Event()
+
+    def slow_load():
+        # Holds the load lock for the whole load, like load_models()
+        with api._load_lock:
+            release.wait(10)
+
+    monkeypatch.setattr(api, "load_models", slow_load)
+    monkeypatch.setattr(api, "_load_thread", None)
+    monkeypatch.setattr(api.settings, "READY_TIMEOUT_S", 0.5)
+    assert not api._ready.is_set()
+
+    # STARTUP_MODE=background: loading is under way before any request arrives
+    api._start_loading()
+    assert api._load_thread.is_alive()
+    while not api._load_lock.locked():
+        time.sleep(0.01)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            # Waits for the loader on the event loop
+            predict = asyncio.create_task(client.post("/predict_medicine", json={"symptoms": "fever"}))
+            await asyncio.sleep(0.1)
+            health = await client.get("/health")
+            assert health.status_code == 200
+            # Includes the 0.1 s above; a blocked event loop would stall until the load ends
+            assert time.perf_counter() - started < 0.4
+
+            ready = await client.get("/ready")
+            assert ready.status_code == 503
+
+            # READY_TIMEOUT_S expires while loading is still in progress
+            response = await predict
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "5"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        api._load_thread.join(5)
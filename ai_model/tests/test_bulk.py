@@ -0,0 +1,36 @@
+import io
+import json
+
+import pytest
+
+import bulk_predict
+from app import api
+from utils import predictor_lite, translator_lite
+from utils.bulk import InputFormatError, RecordParser
+
+
+def test_error_records_keep_their_id():
+    csv_parser = RecordParser("csv")
+    assert csv_parser.feed("id,symptoms") is None
+    assert csv_parser.feed("r1,") == (2, "r1", None, "Missing or empty 'symptoms'")
+    assert csv_parser.feed("r2,fever") == (3, "r2", "fever", None)
+
+    ndjson_parser = RecordParser("ndjson")
+    assert ndjson_parser.feed(json.dumps({"id": 7, "symptoms": " "})) == (1, "7", None, "Missing or empty 'symptoms'")
+    assert ndjson_parser.feed(json.dumps("")) == (2, None, None, "Missing or empty 'symptoms'")
+
+
+def test_run_local_flushes_rows_before_a_fatal_error(monkeypatch):
+    monkeypatch.setattr(api, "load_models", lambda: None)
+    monkeypatch.setattr(api, "predictor", predictor_lite.MedicinePredictor())
+    monkeypatch.setattr(api, "translator", translator_lite.TranslatorService())
+    body = "id,symptoms\na,fever\nb,\nc,headache\n" + "x" * 200000 + "\n"
+    out = io.StringIO()
+
+    with pytest.raises(InputFormatError):
+        bulk_predict.run_local(io.BytesIO(body.encode()), out, "csv", chunk_size=64)
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(line["line"], line.get("id")) for line in lines[:3]] == [(2, "a"), (3, "b"), (4, "c")]
+    assert "suggestions" in lines[0] and lines[1]["error"] == "Missing or empty 'symptoms'"
+    assert lines[3]["fatal"] is True
@@ -0,0 +1,27 @@
+import asyncio
+import json
+
+from app import api
+from utils import predictor_lite, translator_lite
+from utils.bulk import RecordParser
+from utils.cache import ResponseCache
+
+
+def test_stream_chunks_bypass_response_cache(monkeypatch):
+    monkeypatch.setattr(api, "predictor", predictor_lite.MedicinePredictor())
+    monkeypatch.setattr(api, "translator", translator_lite.TranslatorService())
+    cache = ResponseCache("test")
+    cache.set("fever", {"sentinel": True})
+    monkeypatch.setattr(api, "response_cache", cache)
+
+    parser = RecordParser("ndjson")
+    chunk = [parser.feed(json.dumps({"symptoms": text})) for text in ("fever", "headache", "cough")]
+    lines = asyncio.run(api._predict_chunk(chunk)).splitlines()
+
+    assert len(lines) == 3
+    assert all("suggestions" in json.loads(line) for line in lines)
+    # Neither looked up nor filled: the interactive entry is untouched
+    assert cache.stats()["misses"] == 0
+    assert cache.stats()["local_hits"] == 0
+    assert cache.stats()["entries"] == 1
+    assert cache.get("fever") == {"sentinel": True}
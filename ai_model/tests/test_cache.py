@@ -0,0 +1,44 @@
+import pytest
+
+from utils.cache import ResponseCache, normalize_query
+
+
+def test_normalize_query_folds_case_punctuation_and_order():
+    assert normalize_query("Fever, HEADACHE!!") == normalize_query("headache fever")
+    assert normalize_query("  cough\t& cold ") == "cold cough"
+
+
+@pytest.mark.parametrize("a, b", [
+    ("కాలు నొప్పి", "కిలో నొప్పి"),   # leg pain vs 'kilo' pain: differ only in vowel signs
+    ("జ్వరం", "జ వరం"),              # virama joins the conjunct
+    ("తలనొప్పి", "తలనొపి"),
+    ("सिर दर्द", "सर दर्द"),          # Hindi vowel sign
+    ("बुख़ार", "बुखार"),              # nukta
+])
+def test_normalize_query_keeps_combining_marks(a, b):
+    assert normalize_query(a) != normalize_query(b)
+
+
+def test_normalize_query_keeps_indic_words_whole():
+    assert normalize_query("జ్వరం, తలనొప్పి।") == "జ్వరం తలనొప్పి"
+    assert normalize_query("बुखार और सिरदर्द?") == "और बुखार सिरदर्द"
+
+
+def test_shared_entries_of_other_versions_survive_until_stale(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker = ResponseCache("v1", shared_path=path, prune_age=3600)
+    worker.set("fever", {"medicine": "Paracetamol"})
+
+    # A sibling starting on, and switching to, other versions keeps v1 entries
+    sibling = ResponseCache("v2", shared_path=path, prune_age=3600)
+    sibling.set_version("v3")
+    worker.local.clear()
+    assert worker.get("fever") == {"medicine": "Paracetamol"}
+    assert worker.shared_hits == 1
+
+    conn = worker.shared._conn()
+    conn.execute("UPDATE cache SET written = written - 7200")
+    conn.commit()
+    ResponseCache("v3", shared_path=path, prune_age=3600)
+    worker.local.clear()
+    assert worker.get("fever") is None
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+
+from utils import settings
+from utils.encoders import OnnxEncoder, TorchEncoder
+
+TEXTS = [
+    "fever and headache",
+    "cough cold sore throat congestion",
+    "acid reflux heartburn after meals",
+    "mild fever since two days, feeling weak",
+    "itchy skin rash",
+]
+
+
+@pytest.fixture(scope="module")
+def torch_embeddings():
+    try:
+        encoder = TorchEncoder(settings.MODEL_NAME, device="cpu")
+    except Exception as exc:  # model weights not downloaded and no network
+        pytest.skip(f"{settings.MODEL_NAME} unavailable: {exc}")
+    return encoder.encode(TEXTS)
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("onnx"))
+
+
+@pytest.mark.parametrize("quantize", [False, True], ids=["onnx", "onnx-int8"])
+def test_onnx_matches_torch(torch_embeddings, onnx_dir, quantize):
+    encoder = OnnxEncoder(settings.MODEL_NAME, quantize=quantize, onnx_dir=onnx_dir)
+    embeddings = encoder.encode(TEXTS, batch_size=2)
+    assert embeddings.shape == torch_embeddings.shape
+    cosine = (embeddings * torch_embeddings).sum(axis=1)
+    assert np.all(cosine >= 0.99), cosine
@@ -0,0 +1,70 @@
+import numpy as np
+
+from utils.cache import MmapVectorCache
+
+DIM = 8
+CAPACITY = 4
+
+
+def colliding_keys(cache, count):
+    """Keys that all map to the same slot."""
+    by_slot = {}
+    i = 0
+    while True:
+        key = f"query {i}"
+        keys = by_slot.setdefault(cache.key_hash(key) % cache.capacity, [])
+        keys.append(key)
+        if len(keys) == count:
+            return keys
+        i += 1
+
+
+class _WriteDuringCopy:
+    """Stands in for `vectors`: another process overwrites the slot while it is being read."""
+
+    def __init__(self, vectors, write):
+        self._vectors = vectors
+        self._write = write
+
+    def __getitem__(self, slot):
+        self._write()
+        return self._vectors[slot]
+
+
+def test_roundtrip_and_collision_miss(tmp_path):
+    cache = MmapVectorCache(str(tmp_path / "spill"), DIM, CAPACITY)
+    a, b = colliding_keys(cache, 2)
+    cache.set(a, np.full(DIM, 1.0, dtype=np.float32))
+    assert np.array_equal(cache.get(a), np.full(DIM, 1.0))
+    assert cache.get(b) is None
+    # Visible to another mapping of the same files (another worker)
+    other = MmapVectorCache(str(tmp_path / "spill"), DIM, CAPACITY)
+    assert np.array_equal(other.get(a), np.full(DIM, 1.0))
+
+
+def test_overwrite_during_read_is_a_miss(tmp_path):
+    reader = MmapVectorCache(str(tmp_path / "spill"), DIM, CAPACITY)
+    writer = MmapVectorCache(str(tmp_path / "spill"), DIM, CAPACITY)
+    a, b = colliding_keys(reader, 2)
+    reader.set(a, np.full(DIM, 1.0, dtype=np.float32))
+
+    def overwrite_then_restore_key():
+        # Key b's vector lands in the slot, then key a is published again:
+        # checking the key alone after the copy would not catch this
+        writer.set(b, np.full(DIM, 2.0, dtype=np.float32))
+        writer.keys[writer.key_hash(a) % CAPACITY] = writer.key_hash(a)
+
+    reader.vectors = _WriteDuringCopy(reader.vectors, overwrite_then_restore_key)
+    assert reader.get(a) is None
+
+
+def test_slot_being_written_is_a_miss(tmp_path):
+    cache = MmapVectorCache(str(tmp_path / "spill"), DIM, CAPACITY)
+    (a,) = colliding_keys(cache, 1)
+    cache.set(a, np.ones(DIM, dtype=np.float32))
+    slot = cache.key_hash(a) % CAPACITY
+    cache.seqs[slot] += 1  # a writer in another process is mid-write
+    assert cache.get(a) is None
+    # The next write recovers the slot
+    cache.set(a, np.ones(DIM, dtype=np.float32))
+    assert cache.get(a) is not None
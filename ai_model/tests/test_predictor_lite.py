@@ -0,0 +1,63 @@
+import random
+
+import pandas as pd
+import pytest
+
+from utils import predictor_lite
+
+VOCAB = [f"w{i}" for i in range(12)]
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    rng = random.Random(0)
+    path = tmp_path_factory.mktemp("lite") / "symptoms.csv"
+    pd.DataFrame({
+        # Small vocabulary: many rows share words and many scores tie
+        "symptoms": ["; ".join(rng.choices(VOCAB, k=rng.randint(1, 6))) for _ in range(500)],
+        "medicines": [f"m{i % 40}|m{(i * 7) % 40}" for i in range(500)],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def reference_top_rows(predictor, query_words, n_rows):
+    """Score every row from scratch; best first, ties to the higher row id."""
+    scored = []
+    for idx in range(len(predictor.symptoms)):
+        total = 0.0
+        for word in query_words:
+            ids, weights = predictor._postings.get(word, ((), ()))
+            for row, weight in zip(ids, weights):
+                if row == idx:
+                    total += float(weight)
+        if total > 0:
+            scored.append((total, idx))
+    rescored = []
+    for total, idx in scored:
+        if predictor.scoring == "overlap":
+            total /= max(len(query_words), predictor._row_lengths[idx])
+        elif predictor.scoring == "tfidf":
+            total /= sum(predictor._idf[w] ** 2 for w in query_words if w in predictor._idf) ** 0.5
+        rescored.append((total, idx))
+    return sorted(rescored, reverse=True)[:n_rows]
+
+
+@pytest.mark.parametrize("scoring", predictor_lite.SCORING_MODES)
+@pytest.mark.parametrize("n_rows", [1, 5, 50])
+def test_top_rows_matches_full_scoring(dataset, scoring, n_rows):
+    predictor = predictor_lite.MedicinePredictor(dataset, scoring)
+    rng = random.Random(1)
+    queries = [{w} for w in VOCAB[:3]] + [set(rng.sample(VOCAB, rng.randint(2, 4))) for _ in range(20)]
+    queries.append({"unknown", VOCAB[0]})
+    for words in queries:
+        rows, scores = predictor._top_rows(words, n_rows)
+        expected = reference_top_rows(predictor, words, n_rows)
+        assert rows.tolist() == [idx for _, idx in expected]
+        assert scores.tolist() == pytest.approx([total for total, _ in expected])
+
+
+def test_unknown_words_score_nothing(dataset):
+    predictor = predictor_lite.MedicinePredictor(dataset)
+    rows, scores = predictor._top_rows({"nothing", "here"}, 5)
+    assert len(rows) == 0 and len(scores) == 0
+    assert predictor.predict("nothing here") == []
@@ -0,0 +1,31 @@
+from app.prefork import RestartLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_backoff_doubles_then_gives_up():
+    clock = FakeClock()
+    limiter = RestartLimiter(max_restarts=4, window_s=60, base_delay_s=0.5, max_delay_s=3, clock=clock)
+    delays = []
+    for _ in range(4):
+        delays.append(limiter.next_delay())
+        clock.now += 1
+    assert delays == [0.5, 1.0, 2.0, 3]
+    assert limiter.next_delay() is None
+
+
+def test_stable_worker_resets_backoff():
+    clock = FakeClock()
+    limiter = RestartLimiter(max_restarts=2, window_s=10, clock=clock)
+    assert limiter.next_delay() == 0.5
+    clock.now += 1
+    assert limiter.next_delay() == 1.0
+    # Restarts older than the window no longer count
+    clock.now += 30
+    assert limiter.next_delay() == 0.5
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from app import api
+from utils import predictor_lite, translator_lite
+from utils.cache import ResponseCache
+
+
+class _ReloadDuringPredict:
+    """Lite predictor that hot-swaps the dataset while a batch is running."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.version = inner.version
+
+    def predict_batch(self, queries, top_k=5):
+        fresh = SimpleNamespace(version="reloaded")
+        api.predictor = fresh
+        api.response_cache.set_version(api._cache_version(fresh))
+        return self.inner.predict_batch(queries, top_k=top_k)
+
+
+def _setup(monkeypatch, current):
+    monkeypatch.setattr(api, "translator", translator_lite.TranslatorService())
+    monkeypatch.setattr(api, "predictor", current)
+    monkeypatch.setattr(api, "response_cache", ResponseCache(api._cache_version(current)))
+
+
+def test_response_cached_under_its_predictor_version(monkeypatch):
+    _setup(monkeypatch, predictor_lite.MedicinePredictor())
+    response = api._predict_uncached(["fever"])[0]
+    api._cache_set("fever", response)
+    assert api._cache_get("fever").model_dump() == response.model_dump()
+
+
+def test_response_from_replaced_predictor_is_not_cached(monkeypatch):
+    _setup(monkeypatch, _ReloadDuringPredict(predictor_lite.MedicinePredictor()))
+    response = api._predict_uncached(["fever"])[0]
+    assert response.suggestions
+    api._cache_set("fever", response)
+
+    assert api.response_cache.version == api._cache_version(api.predictor)
+    assert api._cache_get("fever") is None
+    assert api.response_cache.stats()["entries"] == 0
+
+
+def test_stale_write_after_version_check_is_unreachable():
+    cache = ResponseCache("v1")
+    cache.set("fever", {"old": True}, version="v1")
+    cache.set_version("v2")
+    cache.set("fever", {"old": True}, version="v1")
+    assert cache.get("fever") is None
+    cache.set("fever", {"new": True}, version="v2")
+    assert cache.get("fever") == {"new": True}
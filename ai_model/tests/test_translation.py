@@ -0,0 +1,96 @@
+import gc
+import sys
+import types
+import weakref
+
+import pandas as pd
+import pytest
+
+from app import api
+from utils import settings, translator_lite
+from utils.language_detector import detect_language
+from utils.name_table import MedicineNameTable
+from utils.predictor_lite import DEFAULT_DATASET_PATHS
+
+
+def test_dataset_generics_are_in_the_name_table():
+    table = MedicineNameTable()
+    names = {name for row in pd.read_csv(DEFAULT_DATASET_PATHS[0])["medicines"] for name in row.split("|")}
+    for name in ("Paracetamol 500mg", "Cetrizine 10mg", "Levocetirizine 5mg",
+                 "Ibuprofen 400mg", "Pantoprazole 40mg"):
+        assert name in names
+        te = table.lookup(name)
+        assert te is not None and te.endswith(name.split()[-1])
+
+
+class _FakeMarian:
+    def te_to_en_batch(self, texts):
+        return [f"en:{t}" for t in texts]
+
+
+def _fake_translator_module(monkeypatch, factory):
+    module = types.ModuleType("utils.translator")
+    module.TranslatorService = factory
+    monkeypatch.setitem(sys.modules, "utils.translator", module)
+
+
+def test_auto_uses_marian_when_it_loads(monkeypatch):
+    _fake_translator_module(monkeypatch, _FakeMarian)
+    monkeypatch.setattr(settings, "TRANSLATOR", "auto")
+    translator, mode = api._load_translator()
+    assert mode == "marian"
+    assert translator.te_to_en_batch(["జ్వరం"]) == ["en:జ్వరం"]
+
+
+def _unavailable():
+    raise OSError("model weights not found")
+
+
+def test_auto_falls_back_to_lite(monkeypatch):
+    _fake_translator_module(monkeypatch, _unavailable)
+    monkeypatch.setattr(settings, "TRANSLATOR", "auto")
+    translator, mode = api._load_translator()
+    assert mode == "lite"
+    assert translator.en_to_te_batch(["Cetrizine 10mg", "Dolo 650"]) == ["సెటిరిజైన్ 10mg", "Dolo 650"]
+
+
+def test_marian_required(monkeypatch):
+    _fake_translator_module(monkeypatch, _unavailable)
+    monkeypatch.setattr(settings, "TRANSLATOR", "marian")
+    with pytest.raises(OSError):
+        api._load_translator()
+
+
+def test_lite_never_imports_marian(monkeypatch):
+    _fake_translator_module(monkeypatch, _unavailable)
+    monkeypatch.setattr(settings, "TRANSLATOR", "lite")
+    assert api._load_translator()[1] == "lite"
+
+
+def test_telugu_queries_translated_in_one_batch(monkeypatch):
+    calls = []
+
+    class Recording(_FakeMarian):
+        def te_to_en_batch(self, texts):
+            calls.append(list(texts))
+            return super().te_to_en_batch(texts)
+
+    monkeypatch.setattr(api, "translator", Recording())
+    normalized = api._normalize_queries(["fever", "జ్వరం", "తలనొప్పి"])
+    assert calls == [["జ్వరం", "తలనొప్పి"]]
+    assert normalized == [("en", "fever"), ("te", "en:జ్వరం"), ("te", "en:తలనొప్పి")]
+
+
+def test_lite_translator_is_not_kept_alive_by_a_cache():
+    translator = translator_lite.TranslatorService()
+    translator.te_to_en("జ్వరం")
+    ref = weakref.ref(translator)
+    del translator
+    gc.collect()
+    assert ref() is None
+
+
+def test_unknown_lang_detector_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "LANG_DETECTOR", "fastest")
+    with pytest.raises(ValueError, match="LANG_DETECTOR"):
+        detect_language("jwaram")
@@ -0,0 +1,142 @@
+"""
+Row -> medicine aggregation shared by both predictors.
+
+Each dataset row lists several medicines. The rows are stored once, at load
+time, as a sparse CSR matrix (`indptr`/`indices` over a medicine vocabulary),
+with names stripped and de-duplicated up front instead of on every request.
+"""
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+AGGREGATION_MODES = ('max', 'softmax')
+
+
+class MedicineMatrix:
+    """
+    Sparse rows x medicines incidence matrix.
+
+    `aggregate_batch` scores every medicine in each query's candidate rows:
+
+    - ``max``: the best score of any row listing it (the original behaviour:
+      each medicine takes the score of the first, i.e. best, row it appears in).
+      Only the first `top_k` distinct medicines matter, so this walks the rows
+      and stops early; a full vectorised reduction touches every entry of
+      every candidate row and measured several times slower.
+    - ``softmax``: sum over the rows listing it of softmax(row scores / T) *
+      row score, so medicines backed by several relevant rows rank higher.
+      Needs every entry, computed for the whole batch as one sparse-dense
+      product (bincount over (query, medicine) keys).
+    """
+
+    def __init__(self, medicines_lists: Sequence[Sequence[str]]):
+        vocab = {}
+        indptr = [0]
+        indices: List[int] = []
+        for meds in medicines_lists:
+            row = []
+            for med in meds:
+                med = med.strip()
+                if med:
+                    mid = vocab.setdefault(med, len(vocab))
+                    if mid not in row:
+                        row.append(mid)
+            indices.extend(row)
+            indptr.append(len(indices))
+        self.names: List[str] = list(vocab)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        # Same rows as tuples of ids, for the early-exit max path
+        self._row_ids = [tuple(indices[indptr[r]:indptr[r + 1]]) for r in range(len(indptr) - 1)]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.indptr) - 1, len(self.names)
+
+    def aggregate(self, rows, scores, top_k: int, mode: str = 'max',
+                  temperature: float = 0.05) -> List[Tuple[str, float]]:
+        """Single-query form of `aggregate_batch`."""
+        return self.aggregate_batch(np.asarray(rows)[None, :], np.asarray(scores)[None, :],
+                                    top_k, mode, temperature)[0]
+
+    def aggregate_batch(self, rows: np.ndarray, scores: np.ndarray, top_k: int,
+                        mode: str = 'max', temperature: float = 0.05) -> List[List[Tuple[str, float]]]:
+        """
+        Top `top_k` (medicine, score) pairs per query. `rows` / `scores` are
+        (queries, candidates) arrays as returned by an index search; rows < 0
+        are padding. Ties keep retrieval order, then list order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        n_queries = rows.shape[0]
+        results: List[List[Tuple[str, float]]] = [[] for _ in range(n_queries)]
+        if rows.size == 0 or top_k <= 0:
+            return results
+        scores = np.where(rows >= 0, scores, -np.inf)
+        # Best rows first within each query (stable: ties keep retrieval order)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        rows = np.take_along_axis(rows, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        if mode == 'softmax':
+            return self._softmax_batch(rows, scores, top_k, temperature)
+
+        names = self.names
+        for q, (query_rows, query_scores) in enumerate(zip(rows.tolist(), scores.tolist())):
+            out = results[q]
+            seen = set()
+            for row, score in zip(query_rows, query_scores):
+                if row < 0:
+                    break
+                for mid in self._row_ids[row]:
+                    if mid not in seen:
+                        seen.add(mid)
+                        out.append((names[mid], score))
+                        if len(out) >= top_k:
+                            break
+                if len(out) >= top_k:
+                    break
+        return results
+
+    def _softmax_batch(self, rows: np.ndarray, scores: np.ndarray, top_k: int,
+                       temperature: float) -> List[List[Tuple[str, float]]]:
+        n_queries = rows.shape[0]
+        results: List[List[Tuple[str, float]]] = [[] for _ in range(n_queries)]
+        # Per-query softmax over candidate rows; padding gets zero weight
+        top = scores[:, :1]
+        weights = np.exp((scores - np.where(np.isfinite(top), top, 0.0)) / max(temperature, 1e-6))
+        weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-300)
+        row_weights = np.where(rows >= 0, weights * np.where(rows >= 0, scores, 0.0), 0.0)
+
+        valid = rows >= 0
+        cand_query = np.nonzero(valid)[0]
+        cand_rows = rows[valid]
+        cand_weights = row_weights[valid]
+        starts = self.indptr[cand_rows]
+        lengths = self.indptr[cand_rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return results
+        # Every (candidate row, medicine) entry, ordered by query, row rank, list order
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        meds = self.indices[offsets + np.arange(total)]
+        entry_query = np.repeat(cand_query, lengths)
+        entry_weights = np.repeat(cand_weights, lengths)
+
+        keys = entry_query * len(self.names) + meds
+        uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        # The sparse-dense product: row weights summed into their medicines
+        agg = np.bincount(inverse, weights=entry_weights, minlength=len(uniq))
+        # Per query: highest score first, then first appearance
+        ranked = np.lexsort((first, -agg, uniq // len(self.names)))
+        picked_first, picked_score = first[ranked], agg[ranked]
+
+        picked_query = entry_query[picked_first]
+        group_start = np.searchsorted(picked_query, np.arange(n_queries))
+        rank = np.arange(len(picked_query)) - group_start[picked_query]
+        for pos in np.nonzero(rank < top_k)[0].tolist():
+            results[picked_query[pos]].append(
+                (self.names[meds[picked_first[pos]]], float(picked_score[pos]))
+            )
+        return results
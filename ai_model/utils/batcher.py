@@ -0,0 +1,131 @@
+"""
+Asyncio micro-batcher that coalesces concurrent single-query predictions
+into one `predict_batch` call (one encoder forward pass).
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Tuple
+
+from utils.executor import Overloaded
+
+
+class MicroBatcher:
+    """
+    Collects queries arriving within `window_ms` (up to `max_batch_size`) and
+    runs them through `predict_batch` together. Batches are executed one at a
+    time, so requests that arrive while the model is busy simply form the next,
+    larger batch instead of competing for the same CPU cores.
+
+    Batches run on `executor` (the loop's default executor if None). With
+    `max_queue` > 0, `submit` raises `Overloaded` once that many queries are
+    already waiting.
+    """
+
+    def __init__(self,
+                 predict_batch: Callable[[List[str], int], list],
+                 window_ms: float = 5.0,
+                 max_batch_size: int = 64,
+                 max_queue: int = 0,
+                 executor: Optional[Executor] = None):
+        self._predict_batch = predict_batch
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_queue = max(max_queue, 0)
+        self._executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Stats used to tune the window against p99 latency
+        self.batches = 0
+        self.items = 0
+        self.last_batch_size = 0
+        self.max_seen_batch_size = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, query: str, top_k: int = 5) -> list:
+        """Queue one query and wait for its suggestions."""
+        self.start()
+        if self.max_queue and self._queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"Micro-batch queue full ({self.max_queue} waiting)")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((query, top_k, fut))
+        return await fut
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "max_seen_batch_size": self.max_seen_batch_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+    async def _collect(self) -> List[Tuple[str, int, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already waiting before sleeping on the window
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self.last_batch_size = len(batch)
+            self.max_seen_batch_size = max(self.max_seen_batch_size, len(batch))
+
+            # Group by top_k so each group is still a single predictor call
+            groups: dict = {}
+            for query, top_k, fut in batch:
+                groups.setdefault(top_k, []).append((query, fut))
+            for top_k, items in groups.items():
+                queries = [q for q, _ in items]
+                try:
+                    results = await loop.run_in_executor(self._executor, self._predict_batch, queries, top_k)
+                except Exception as exc:
+                    for _, fut in items:
+                        if not fut.done():
+                            fut.set_exception(exc)
+                    continue
+                for (_, fut), result in zip(items, results):
+                    if not fut.done():
+                        fut.set_result(result)
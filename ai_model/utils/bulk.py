@@ -0,0 +1,163 @@
+"""
+Line-oriented parsing for bulk prediction input (NDJSON or CSV).
+
+Shared by the streaming /predict_medicine_stream endpoint and bulk_predict.py
+so both accept exactly the same files. Input is consumed one line at a time,
+so memory use does not grow with the size of the file.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+FORMATS = ("ndjson", "csv")
+
+
+class InputFormatError(ValueError):
+    """The input as a whole cannot be parsed (bad CSV header, runaway line)."""
+
+
+# (line number, caller-supplied id or None, symptoms text or None, error or None)
+Record = Tuple[int, Optional[str], Optional[str], Optional[str]]
+
+
+def format_for_content_type(content_type: str) -> str:
+    """Pick the input format from a request Content-Type (NDJSON by default)."""
+    media = content_type.split(";", 1)[0].strip().lower()
+    return "csv" if media in ("text/csv", "application/csv") else "ndjson"
+
+
+class RecordParser:
+    """
+    Turns input lines into records. NDJSON lines are objects with a
+    `symptoms` field (and optional `id`) or bare JSON strings; CSV input needs
+    a header row with a `symptoms` column (and optional `id` column). Quoted
+    CSV fields cannot span lines.
+    """
+
+    def __init__(self, fmt: str = "ndjson", column: str = "symptoms", id_column: str = "id"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown bulk format {fmt!r}; expected one of {FORMATS}")
+        self.fmt = fmt
+        self.column = column
+        self.id_column = id_column
+        self._header: Optional[List[str]] = None
+        self.line_no = 0
+
+    def feed(self, line: str) -> Optional[Record]:
+        """
+        Parse one line; returns None for blank lines and the CSV header.
+        Bad lines become error records; raises InputFormatError if the rest
+        of the input cannot be read.
+        """
+        self.line_no += 1
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return None
+        try:
+            if self.fmt == "csv":
+                return self._feed_csv(line)
+            return self._feed_ndjson(line)
+        except InputFormatError:
+            raise
+        except ValueError as exc:
+            return self.line_no, None, None, str(exc)
+
+    def _feed_ndjson(self, line: str) -> Record:
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON: {exc.msg}") from None
+        if isinstance(obj, str):
+            return self._record(None, obj)
+        if not isinstance(obj, dict):
+            raise ValueError("Expected a JSON object or string")
+        return self._record(_opt_str(obj.get(self.id_column)), obj.get(self.column))
+
+    def _feed_csv(self, line: str) -> Optional[Record]:
+        row = next(csv.reader([line]))
+        if self._header is None:
+            header = [h.strip().lower() for h in row]
+            if self.column not in header:
+                raise InputFormatError(f"CSV header must include a '{self.column}' column")
+            self._header = header
+            return None
+        values = dict(zip(self._header, row))
+        return self._record(_opt_str(values.get(self.id_column)), values.get(self.column))
+
+    def _record(self, record_id: Optional[str], symptoms) -> Record:
+        # The id is kept on error records so results can be matched to input rows
+        if not isinstance(symptoms, str) or not symptoms.strip():
+            return self.line_no, record_id, None, f"Missing or empty '{self.column}'"
+        return self.line_no, record_id, symptoms, None
+
+
+def _opt_str(value) -> Optional[str]:
+    return None if value is None or value == "" else str(value)
+
+
+def iter_lines(chunks: Iterable[bytes], max_line_length: int = 65536) -> Iterator[str]:
+    """Split a byte stream into decoded lines (UTF-8, leading BOM stripped)."""
+    splitter = _LineSplitter(max_line_length)
+    for chunk in chunks:
+        yield from splitter.push(chunk)
+    yield from splitter.finish()
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes], max_line_length: int = 65536) -> AsyncIterator[str]:
+    """Async version of `iter_lines`, e.g. over `Request.stream()`."""
+    splitter = _LineSplitter(max_line_length)
+    async for chunk in chunks:
+        for line in splitter.push(chunk):
+            yield line
+    for line in splitter.finish():
+        yield line
+
+
+class _LineSplitter:
+    def __init__(self, max_line_length: int):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._buf = ""
+        self.max_line_length = max_line_length
+
+    def push(self, chunk: bytes) -> List[str]:
+        self._buf += self._decoder.decode(chunk)
+        *lines, self._buf = self._buf.split("\n")
+        if len(self._buf) > self.max_line_length:
+            raise InputFormatError(f"Input line longer than {self.max_line_length} characters")
+        return lines
+
+    def finish(self) -> List[str]:
+        self._buf += self._decoder.decode(b"", final=True)
+        rest, self._buf = self._buf, ""
+        return [rest] if rest else []
+
+
+def result_line(line_no: int, record_id: Optional[str], response: Optional[dict] = None,
+                error: Optional[str] = None) -> str:
+    """One NDJSON output line for a record (prediction or error)."""
+    out = {"line": line_no}
+    if record_id is not None:
+        out["id"] = record_id
+    if error is not None:
+        out["error"] = error
+    else:
+        out.update(response)
+    return json.dumps(out, ensure_ascii=False) + "\n"
+
+
+def fatal_line(line_no: int, error: str) -> str:
+    """Last output line when the rest of the input cannot be read."""
+    return json.dumps({"line": line_no, "error": error, "fatal": True}) + "\n"
+
+
+def format_results(chunk: List[Record], responses: Iterable[dict]) -> Iterator[str]:
+    """Output lines for a chunk, given one response per error-free record."""
+    responses = iter(responses)
+    for line_no, record_id, _, error in chunk:
+        if error is not None:
+            yield result_line(line_no, record_id, error=error)
+        else:
+            yield result_line(line_no, record_id, next(responses))
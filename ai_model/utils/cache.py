@@ -0,0 +1,367 @@
+"""
+Caching helpers for the prediction pipeline.
+
+- `normalize_query`: canonical cache key for free-text symptoms
+- `LRUCache`:       thread-safe in-process LRU with optional TTL
+- `SQLiteCache`:    shared local store; survives restarts and is visible to
+                    every worker on the host
+- `ResponseCache`:  two-level (LRU in front of SQLite) cache namespaced by a
+                    dataset/model version string
+- `QueryEmbeddingCache`: LRU of encoder outputs with an optional spill to a
+                    memory-mapped, direct-mapped on-disk table
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class _PunctuationTable(dict):
+    """str.translate table mapping punctuation and symbols (P*, S*) to spaces.
+
+    Filled lazily per code point. Combining marks (M*), such as Telugu and
+    Hindi vowel signs and viramas, are part of their word and are kept.
+    """
+
+    def __missing__(self, codepoint: int):
+        value = " " if unicodedata.category(chr(codepoint))[0] in "PS" else codepoint
+        self[codepoint] = value
+        return value
+
+
+_PUNCTUATION = _PunctuationTable()
+
+
+def normalize_query(text: str) -> str:
+    """Casefold, strip punctuation, collapse whitespace and sort tokens."""
+    tokens = text.casefold().translate(_PUNCTUATION).split()
+    return " ".join(sorted(tokens))
+
+
+class LRUCache:
+    """Bounded LRU mapping; entries older than `ttl` seconds are treated as missing."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """JSON values in a local SQLite file (WAL mode), safe to share across processes."""
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, version TEXT NOT NULL,"
+            " value TEXT NOT NULL, expires REAL, written REAL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "written" not in columns:
+            try:
+                conn.execute("ALTER TABLE cache ADD COLUMN written REAL")
+            except sqlite3.OperationalError:  # another process added it first
+                pass
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads, nor with
+        # forked worker processes (thread-locals survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Any:
+        row = self._conn().execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires < time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, version: str = "") -> None:
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, version, value, expires, written) VALUES (?, ?, ?, ?, ?)",
+            (key, version, json.dumps(value, ensure_ascii=False), expires, now),
+        )
+        conn.commit()
+
+    def prune(self, current_version: str, max_age: float) -> int:
+        """
+        Delete expired entries, and entries from other versions not written
+        for `max_age` seconds. Other processes sharing the file may still be
+        serving (or already serving) another version, so its entries are only
+        dropped once nobody has written them for a while.
+        """
+        now = time.time()
+        conn = self._conn()
+        cur = conn.execute(
+            "DELETE FROM cache WHERE (expires IS NOT NULL AND expires < ?)"
+            " OR (version != ? AND COALESCE(written, 0) < ?)",
+            (now, current_version, now - max_age),
+        )
+        conn.commit()
+        return cur.rowcount
+
+
+class ResponseCache:
+    """In-process LRU backed by an optional shared SQLite tier."""
+
+    def __init__(self, version: str, maxsize: int = 10000, ttl: Optional[float] = None,
+                 shared_path: Optional[str] = None, prune_age: float = 86400.0):
+        self.version = version
+        self.prune_age = prune_age
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = SQLiteCache(shared_path, ttl=ttl) if shared_path else None
+        if self.shared is not None:
+            self.shared.prune(version, self.prune_age)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.version}:{key}"
+
+    def set_version(self, version: str) -> None:
+        """Switch to a new dataset/model version, pruning stale shared entries."""
+        if version == self.version:
+            return
+        self.version = version
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.prune(version, self.prune_age)
+
+    def get(self, key: str) -> Any:
+        full_key = self._key(key)
+        value = self.local.get(full_key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+        if self.shared is not None:
+            value = self.shared.get(full_key)
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(full_key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, version: Optional[str] = None) -> None:
+        """
+        Store `value` for `key`. Pass the `version` the value was computed
+        under: if the cache has moved on since, the value is dropped, and a
+        write racing with set_version() lands under the old, unread key.
+        """
+        version = version or self.version
+        if version != self.version:
+            return
+        full_key = f"{version}:{key}"
+        self.local.set(full_key, value)
+        if self.shared is not None:
+            self.shared.set(full_key, value, version=version)
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self.local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.local_hits + self.shared_hits) / lookups) if lookups else 0.0,
+            "shared_backend": "sqlite" if self.shared is not None else None,
+        }
+
+
+class MmapVectorCache:
+    """
+    Fixed-capacity on-disk vector table opened with mmap. Each key maps to a
+    single slot (hash modulo capacity); the slot's stored key hash is checked
+    on read, so collisions and overwrites by other processes only cause misses.
+
+    Reads take no lock. Each slot has a sequence number that writers make odd
+    while they write; a read copies the vector and keeps it only if the
+    sequence number and key are unchanged afterwards (a seqlock). Writers are
+    serialized by a thread lock and, where fcntl exists, a file lock.
+    """
+
+    def __init__(self, path: str, dim: int, capacity: int = 65536):
+        self.capacity = capacity
+        root, _ = os.path.splitext(path)
+        os.makedirs(os.path.dirname(os.path.abspath(root)), exist_ok=True)
+        self.vectors = self._open(f"{root}.vectors.npy", np.float32, (capacity, dim))
+        self.keys = self._open(f"{root}.keys.npy", np.uint64, (capacity,))
+        self.seqs = self._open(f"{root}.seq.npy", np.uint64, (capacity,))
+        self._lock = threading.Lock()
+        self._lock_path = f"{root}.lock"
+
+    @staticmethod
+    def _open(path: str, dtype, shape) -> np.memmap:
+        if os.path.exists(path):
+            try:
+                arr = np.load(path, mmap_mode="r+")
+                if arr.shape == shape and arr.dtype == dtype:
+                    return arr
+            except (OSError, ValueError):
+                pass
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    @staticmethod
+    def key_hash(key: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        h = self.key_hash(key)
+        slot = h % self.capacity
+        seq = int(self.seqs[slot])
+        if seq & 1 or int(self.keys[slot]) != h:
+            return None
+        vector = np.array(self.vectors[slot])
+        # A writer (in any process) may have replaced the slot during the copy
+        if int(self.seqs[slot]) != seq or int(self.keys[slot]) != h:
+            return None
+        return vector
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def set(self, key: str, vector: np.ndarray) -> None:
+        h = self.key_hash(key)
+        slot = h % self.capacity
+        with self._write_lock():
+            # Odd while writing (| 1 also recovers from a writer that died mid-write)
+            seq = int(self.seqs[slot]) | 1
+            self.seqs[slot] = seq
+            self.keys[slot] = 0
+            self.vectors[slot] = vector
+            self.keys[slot] = h
+            self.seqs[slot] = seq + 1
+
+
+class QueryEmbeddingCache:
+    """Caches encoder outputs per normalized query string."""
+
+    def __init__(self, namespace: str, dim: int, maxsize: int = 4096,
+                 spill_path: Optional[str] = None, spill_capacity: int = 65536):
+        # Namespace (model name) is part of every key so a model change never
+        # returns embeddings from another model.
+        self.namespace = namespace
+        self.local = LRUCache(maxsize=maxsize)
+        self.spill_path = spill_path
+        self.spill = MmapVectorCache(spill_path, dim=dim, capacity=spill_capacity) if spill_path else None
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # The encoder is uncased; token order still matters, so it is kept
+        return " ".join(text.casefold().split())
+
+    def _key(self, text: str) -> str:
+        return f"{self.namespace}\0{text}"
+
+    def get_many(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the (already normalized) texts that have one."""
+        found: Dict[str, np.ndarray] = {}
+        for text in dict.fromkeys(texts):
+            key = self._key(text)
+            vec = self.local.get(key)
+            if vec is not None:
+                self.hits += 1
+            elif self.spill is not None and (vec := self.spill.get(key)) is not None:
+                self.spill_hits += 1
+                self.local.set(key, vec)
+            else:
+                self.misses += 1
+                continue
+            found[text] = vec
+        return found
+
+    def set_many(self, items: Dict[str, np.ndarray]) -> None:
+        for text, vec in items.items():
+            key = self._key(text)
+            self.local.set(key, vec)
+            if self.spill is not None:
+                self.spill.set(key, vec)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.local),
+            "hits": self.hits,
+            "spill_hits": self.spill_hits,
+            "misses": self.misses,
+            "spill_path": self.spill_path,
+        }
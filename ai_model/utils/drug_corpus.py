@@ -0,0 +1,184 @@
+"""
+Secondary retrieval source built from the drugs.com side-effects corpus
+(`Ai/drugs_side_effects_drugs_com.csv.zip`).
+
+The zip is read as a stream (the CSV is never extracted to disk or loaded
+whole). Rows are reduced to one document per medical condition: the condition
+plus the aliases drugs.com lists for it, paired with that condition's
+most-reviewed drugs. Documents are encoded in fixed-size chunks straight into a
+file-backed matrix, so peak memory depends on the chunk size and the number of
+distinct conditions, not on the number of rows in the corpus.
+"""
+from __future__ import annotations
+
+import csv
+import heapq
+import io
+import logging
+import os
+import re
+import zipfile
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from utils import settings
+from utils.embedding_store import EmbeddingStore, file_sha256, row_key
+from utils.vector_index import index_path, load_or_build_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'Ai', 'drugs_side_effects_drugs_com.csv.zip',
+)
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+EMB_PATH = os.path.join(MODELS_DIR, 'drugs_com.npy')
+META_PATH = os.path.join(MODELS_DIR, 'drugs_com_meta.json')
+
+ENCODE_CHUNK_ROWS = 256
+# Aliases are short; a longer ';'-separated part means the prose has started
+MAX_ALIAS_WORDS = 6
+_WS = re.compile(r'\s+')
+
+
+def _clean(text: str) -> str:
+    return _WS.sub(' ', text or '').strip()
+
+
+def normalize_drug_name(name: str) -> str:
+    """Collapse whitespace; capitalise all-lowercase generic names ('doxycycline')."""
+    name = _clean(name)
+    if name and name == name.lower():
+        name = name[0].upper() + name[1:]
+    return name
+
+
+def condition_text(condition: str, description: str) -> str:
+    """
+    Searchable text for a condition: its name, the heading drugs.com uses
+    and the listed aliases ("Acne Other names: Acne Vulgaris; Blackheads; ...").
+    The alias list runs straight into the description prose, so parsing stops
+    at the first part too long to be an alias.
+    """
+    parts = [_clean(condition)]
+    description = _clean(description)
+    if ' Other names: ' in description:
+        heading, names = description.split(' Other names: ', 1)
+        parts.append(heading)
+        for alias in names.split(';'):
+            if len(alias.split()) > MAX_ALIAS_WORDS:
+                break
+            parts.append(alias.strip())
+        else:
+            parts.pop()
+    seen = set()
+    unique = []
+    for part in parts:
+        if part and part.casefold() not in seen:
+            seen.add(part.casefold())
+            unique.append(part)
+    return '; '.join(unique)
+
+
+def iter_rows(zip_path: str) -> Iterator[dict]:
+    """Stream CSV rows out of the zip, decompressing incrementally."""
+    with zipfile.ZipFile(zip_path) as zf:
+        member = next(n for n in zf.namelist() if n.lower().endswith('.csv'))
+        with zf.open(member) as raw:
+            yield from csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+
+
+def _popularity(row: dict) -> Tuple[float, float]:
+    def num(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+    return num(row.get('no_of_reviews')), num(row.get('rating'))
+
+
+def build_documents(zip_path: str, max_medicines: int = 10) -> List[Tuple[str, List[str]]]:
+    """
+    One (condition text, medicines) document per condition, medicines ordered
+    by review count then rating. Only the best `max_medicines` drugs are kept
+    per condition while streaming, so memory stays bounded.
+    """
+    docs: Dict[str, Dict[str, Tuple[Tuple[float, float], str]]] = {}
+    texts: Dict[str, str] = {}
+    for row in iter_rows(zip_path):
+        condition = _clean(row.get('medical_condition', ''))
+        drug = normalize_drug_name(row.get('drug_name', ''))
+        if not condition or not drug:
+            continue
+        key = condition.casefold()
+        if key not in texts:
+            texts[key] = condition_text(condition, row.get('medical_condition_description', ''))
+        drugs = docs.setdefault(key, {})
+        score = _popularity(row)
+        name_key = drug.casefold()
+        if name_key not in drugs or drugs[name_key][0] < score:
+            drugs[name_key] = (score, drug)
+        if len(drugs) > 2 * max_medicines:
+            docs[key] = dict(heapq.nlargest(max_medicines, drugs.items(), key=lambda kv: kv[1][0]))
+    documents = []
+    for key, drugs in docs.items():
+        ranked = sorted(drugs.values(), key=lambda v: v[0], reverse=True)[:max_medicines]
+        documents.append((texts[key], [name for _, name in ranked]))
+    return documents
+
+
+class DrugCorpusIndex:
+    """
+    Embedding index over the corpus documents. Uses the primary predictor's
+    encoder so scores are directly comparable with the curated dataset.
+    """
+
+    def __init__(self, encoder, model_name: str, corpus_path: str | None = None,
+                 index_backend: str = 'exact', max_medicines: int = 10):
+        self.corpus_path = corpus_path or DEFAULT_CORPUS_PATH
+        self.encoder = encoder
+        self.texts: List[str] = []
+        self.medicines_lists: List[List[str]] = []
+        self.corpus_hash = file_sha256(self.corpus_path)
+        expected = {
+            'model_name': model_name,
+            'encoder': encoder.name,
+            'corpus_sha256': self.corpus_hash,
+            'max_medicines': max_medicines,
+            'dtype': settings.EMBEDDING_DTYPE,
+            'normalized': True,
+        }
+        store = EmbeddingStore(EMB_PATH, META_PATH)
+        emb = store.load(expected)
+        if emb is not None:
+            docs = store.meta.get('documents') or []
+            if len(docs) != len(emb):
+                emb = None
+        if emb is None:
+            docs = [{'text': text, 'medicines': meds}
+                    for text, meds in build_documents(self.corpus_path, max_medicines)]
+            texts = [d['text'] for d in docs]
+            emb = store.save_chunks(self._encode_chunks(texts),
+                                    (len(texts), encoder.dimension), settings.EMBEDDING_DTYPE,
+                                    dict(expected, documents=docs),
+                                    [row_key(t) for t in texts])
+            logger.info("Encoded %d drugs.com condition documents", len(texts))
+        self.texts = [d['text'] for d in docs]
+        self.medicines_lists = [d['medicines'] for d in docs]
+        self.embeddings = emb
+        params = {}
+        if index_backend == 'ivf':
+            params = {'nlist': settings.IVF_NLIST or None, 'nprobe': settings.IVF_NPROBE}
+        fingerprint = f"{model_name}:{encoder.name}:{self.corpus_hash}:{emb.dtype}"
+        self.index = load_or_build_index(index_backend, emb, index_path(EMB_PATH, index_backend),
+                                         fingerprint, normalized=True, **params)
+
+    def _encode_chunks(self, texts: List[str]) -> Iterator[np.ndarray]:
+        for start in range(0, len(texts), ENCODE_CHUNK_ROWS):
+            chunk = texts[start:start + ENCODE_CHUNK_ROWS]
+            # Converted (or quantized) to EMBEDDING_DTYPE by the store
+            yield self.encoder.encode(chunk)
+
+    def __len__(self) -> int:
+        return len(self.texts)
@@ -0,0 +1,212 @@
+"""
+Versioned on-disk store for the symptom embedding matrix.
+
+Layout (for base path `models/medicine_predictor`):
+- `medicine_predictor.npy`:       float32/float16/int8 matrix, opened with
+                                   mmap so every worker process shares the
+                                   same pages through the OS page cache
+- `medicine_predictor_scale.npy`: per-row float32 scales (int8 only)
+- `medicine_predictor_rows.npy`:  per-row key (hash of the row's symptom
+                                   text), so a changed dataset only
+                                   re-encodes rows whose text is new
+- `medicine_predictor_meta.json`: compact metadata (format version, model
+                                   name, dataset hash, shape, dtype)
+
+The metadata file is written last and acts as the commit marker; a matrix is
+only used when its metadata matches what the caller expects.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+ROW_KEY_BYTES = 16
+SUPPORTED_DTYPES = ('float32', 'float16', 'int8')
+
+
+class QuantizedMatrix:
+    """
+    int8 rows with one float32 scale per row: row i ~= codes[i] * scales[i].
+
+    Rows are L2-normalized before quantization, so each row's largest
+    component maps to +-127. Indexing returns dequantized float32 rows, which
+    lets the vector indexes treat it like a dense matrix; exact search scores
+    the codes directly and applies the scales afterwards.
+    """
+
+    dtype = np.dtype(np.int8)
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray):
+        self.codes = codes
+        self.scales = np.asarray(scales, dtype=np.float32)
+
+    @classmethod
+    def quantize(cls, x: np.ndarray) -> 'QuantizedMatrix':
+        x = np.asarray(x, dtype=np.float32)
+        scales = np.abs(x).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(x / scales[:, None]).astype(np.int8)
+        return cls(codes, scales)
+
+    @property
+    def shape(self) -> tuple:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        return self.codes[rows].astype(np.float32) * self.scales[rows][..., None]
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def row_key(text: str) -> bytes:
+    """Key identifying an embedding by the exact text it was encoded from."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=ROW_KEY_BYTES).digest()
+
+
+class EmbeddingStore:
+    def __init__(self, matrix_path: str, meta_path: str):
+        self.matrix_path = matrix_path
+        self.meta_path = meta_path
+        self.keys_path = os.path.splitext(matrix_path)[0] + '_rows.npy'
+        self.scale_path = os.path.splitext(matrix_path)[0] + '_scale.npy'
+        # Metadata of the last successful load()
+        self.meta: dict | None = None
+
+    def read_meta(self) -> dict | None:
+        if not os.path.exists(self.meta_path):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning("Unreadable embedding metadata %s: %s", self.meta_path, exc)
+            return None
+
+    def load(self, expected: dict) -> np.ndarray | QuantizedMatrix | None:
+        """
+        Return the stored matrix as a read-only memory map (wrapped with its
+        scales for int8), or None when it is missing or stale (any key in
+        `expected` differs from the stored meta).
+        """
+        meta = self.read_meta()
+        if meta is None or not os.path.exists(self.matrix_path):
+            logger.info("No embedding cache at %s; building", self.matrix_path)
+            return None
+        if meta.get('format_version') != FORMAT_VERSION:
+            logger.info("Embedding cache format changed; rebuilding")
+            return None
+        stale = [key for key, value in expected.items() if meta.get(key) != value]
+        if stale:
+            logger.info("Embedding cache is stale (%s changed); rebuilding", ', '.join(stale))
+            return None
+        try:
+            matrix = np.load(self.matrix_path, mmap_mode='r')
+        except (OSError, ValueError) as exc:
+            logger.warning("Corrupt embedding cache %s (%s); rebuilding", self.matrix_path, exc)
+            return None
+        if list(matrix.shape) != meta.get('shape') or str(matrix.dtype) != meta.get('dtype'):
+            logger.warning("Embedding cache does not match its metadata; rebuilding")
+            return None
+        if matrix.dtype == np.int8:
+            try:
+                scales = np.load(self.scale_path)
+            except (OSError, ValueError) as exc:
+                logger.warning("Missing embedding scales %s (%s); rebuilding", self.scale_path, exc)
+                return None
+            if scales.shape != (len(matrix),):
+                logger.warning("Embedding scales do not match the matrix; rebuilding")
+                return None
+            matrix = QuantizedMatrix(matrix, scales)
+        self.meta = meta
+        return matrix
+
+    def load_keys(self) -> list[bytes] | None:
+        """Row keys written alongside the matrix by save(), if present."""
+        try:
+            keys = np.load(self.keys_path)
+        except (OSError, ValueError):
+            return None
+        if keys.ndim != 2 or keys.shape[1] != ROW_KEY_BYTES:
+            return None
+        return [row.tobytes() for row in keys]
+
+    def save(self, matrix: np.ndarray, meta: dict, keys: list[bytes], dtype=None):
+        """
+        Atomically write the matrix (converted to `dtype`, default its own),
+        its row keys and metadata, returning the new memory map. Maps of the
+        previous matrix stay valid.
+        """
+        return self.save_chunks([matrix], matrix.shape, dtype or matrix.dtype, meta, keys)
+
+    def save_chunks(self, chunks, shape: tuple, dtype, meta: dict, keys: list[bytes]):
+        """
+        Like save(), but writes the matrix from an iterable of float row
+        blocks into a file-backed array, so only one block is in memory at a
+        time. int8 blocks are quantized per row as they are written.
+        """
+        dtype = np.dtype(dtype)
+        quantized = dtype == np.int8
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        # Per-process temp names: preforked workers may reload concurrently
+        suffix = f'.{os.getpid()}.tmp'
+        tmp_matrix = self.matrix_path + suffix
+        out = np.lib.format.open_memmap(tmp_matrix, mode='w+', dtype=dtype, shape=tuple(shape))
+        scales = np.empty(shape[0] if quantized else 0, dtype=np.float32)
+        row = 0
+        for block in chunks:
+            if quantized:
+                q = QuantizedMatrix.quantize(block)
+                block = q.codes
+                scales[row:row + len(block)] = q.scales
+            out[row:row + len(block)] = block
+            row += len(block)
+        if row != shape[0]:
+            del out
+            os.remove(tmp_matrix)
+            raise ValueError(f"Expected {shape[0]} embedding rows, got {row}")
+        out.flush()
+        del out
+        tmp_keys = self.keys_path + suffix
+        with open(tmp_keys, 'wb') as f:
+            np.save(f, np.frombuffer(b''.join(keys), dtype=np.uint8).reshape(len(keys), ROW_KEY_BYTES))
+        if quantized:
+            tmp_scales = self.scale_path + suffix
+            with open(tmp_scales, 'wb') as f:
+                np.save(f, scales)
+        full_meta = dict(meta, format_version=FORMAT_VERSION,
+                         shape=list(shape), dtype=str(dtype))
+        tmp_meta = self.meta_path + suffix
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(full_meta, f, indent=2, ensure_ascii=False)
+        # Drop the old metadata first so a crash between the two renames never
+        # pairs the new matrix with stale metadata.
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_keys, self.keys_path)
+        if quantized:
+            os.replace(tmp_scales, self.scale_path)
+        os.replace(tmp_meta, self.meta_path)
+        self.meta = full_meta
+        matrix = np.load(self.matrix_path, mmap_mode='r')
+        return QuantizedMatrix(matrix, scales) if quantized else matrix
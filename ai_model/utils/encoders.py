@@ -0,0 +1,195 @@
+"""
+Sentence encoder backends for the ML predictor.
+
+- `torch`: sentence-transformers on PyTorch (default)
+- `onnx`:  the same transformer exported once to ONNX and run with
+           onnxruntime on CPU, optionally dynamically quantized to int8
+
+Every backend returns L2-normalized float32 embeddings of shape (n, dim).
+"""
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import re
+from typing import List
+
+import numpy as np
+
+ONNX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'onnx')
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (x / norms).astype(np.float32, copy=False)
+
+
+class TorchEncoder:
+    name = 'torch'
+
+    def __init__(self, model_name: str, device: str | None = None, threads: int = 0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model = SentenceTransformer(model_name, device=self.device)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        emb = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return emb.astype(np.float32, copy=False)
+
+
+class OnnxEncoder:
+    """Mean-pooled transformer encoder served by onnxruntime."""
+
+    def __init__(self, model_name: str, quantize: bool = False, onnx_dir: str | None = None,
+                 threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = 'onnx-int8' if quantize else 'onnx'
+        self.export_dir = os.path.join(onnx_dir or ONNX_DIR, re.sub(r'[^\w.-]+', '__', model_name))
+        fp32_path = os.path.join(self.export_dir, 'model.onnx')
+        int8_path = os.path.join(self.export_dir, 'model.int8.onnx')
+        if not os.path.exists(fp32_path):
+            export_onnx(model_name, self.export_dir)
+        if quantize and not os.path.exists(int8_path):
+            quantize_onnx(fp32_path, int8_path)
+
+        with open(os.path.join(self.export_dir, 'encoder_config.json'), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self.max_seq_length = config['max_seq_length']
+        self._dimension = config['dimension']
+        # The standalone tokenizers runtime keeps torch/transformers out of the process
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.export_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config['pad_token_id'], pad_token=config['pad_token'])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            int8_path if quantize else fp32_path, options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        out = np.empty((len(texts), self._dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch(chunk)
+            tokens = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            feeds = {k: v for k, v in tokens.items() if k in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            # Mean pooling over non-padding tokens, as in the sentence-transformers model
+            mask = tokens['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            out[start:start + len(chunk)] = pooled
+        return _normalize(out)
+
+
+def export_onnx(model_name: str, export_dir: str) -> None:
+    """Export the sentence-transformer's underlying transformer to ONNX (needs torch once)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device='cpu')
+    pooling = st[1]
+    # sentence-transformers < 6 exposes flags, newer versions a mode string
+    mean_pooled = (getattr(pooling, 'pooling_mode_mean_tokens', False)
+                   or getattr(pooling, 'pooling_mode', None) == 'mean')
+    if not mean_pooled:
+        raise ValueError(f"ONNX backend only supports mean-pooled models; {model_name} is not")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+
+    os.makedirs(export_dir, exist_ok=True)
+    sample = tokenizer(['fever and headache'], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(input_names, args)))[0]
+
+    export_kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter; keep the TorchScript one
+        export_kwargs['dynamo'] = False
+    tmp_path = os.path.join(export_dir, 'model.onnx.tmp')
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(transformer),
+            tuple(sample[name] for name in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            **export_kwargs,
+        )
+    tokenizer.save_pretrained(export_dir)
+    with open(os.path.join(export_dir, 'encoder_config.json'), 'w', encoding='utf-8') as f:
+        json.dump({'model_name': model_name,
+                   'max_seq_length': st.max_seq_length,
+                   'pad_token': tokenizer.pad_token,
+                   'pad_token_id': tokenizer.pad_token_id,
+                   'dimension': st.get_sentence_embedding_dimension()}, f, indent=2)
+    os.replace(tmp_path, os.path.join(export_dir, 'model.onnx'))
+
+
+def quantize_onnx(src_path: str, dst_path: str) -> None:
+    """Dynamic (weight-only) int8 quantization of the exported model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = dst_path + '.tmp'
+    quantize_dynamic(src_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, dst_path)
+
+
+def require_backend(backend: str) -> None:
+    """Import the runtime dependencies of `backend`, raising ImportError if missing."""
+    if backend == 'onnx':
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+    else:
+        import sentence_transformers  # noqa: F401
+        import torch  # noqa: F401
+
+
+def create_encoder(backend: str, model_name: str, device: str | None = None, quantize: bool = False,
+                   threads: int = 0):
+    """`threads=0` keeps the runtime's default intra-op thread count."""
+    if backend == 'torch':
+        return TorchEncoder(model_name, device=device, threads=threads)
+    if backend == 'onnx':
+        return OnnxEncoder(model_name, quantize=quantize, threads=threads)
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose from: ['onnx', 'torch']")
@@ -0,0 +1,82 @@
+"""
+Bounded thread pool for model inference.
+
+Keeps torch/ONNX work off AnyIO's shared threadpool (which also serves
+/health and other sync endpoints) and rejects new work once too much is
+waiting, so overload turns into fast 503s instead of ever-growing latency.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+
+class Overloaded(RuntimeError):
+    """Raised when inference work is rejected because the queue is full."""
+
+
+class InferenceExecutor(Executor):
+    """
+    ThreadPoolExecutor with admission control and queue/in-flight gauges.
+
+    At most `max_workers` tasks run at once; up to `max_queue` more may wait
+    for a thread (0 = unbounded). `submit` raises `Overloaded` beyond that.
+    Usable anywhere an Executor is, e.g. `loop.run_in_executor(executor, ...)`.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 128,
+                 thread_name_prefix: str = "inference"):
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max(max_queue, 0)
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted and not finished (queued + in flight)
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending - self._in_flight
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._lock:
+            if self.max_queue and self._pending - self._in_flight >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"Inference queue full ({self.max_queue} waiting)")
+            self._pending += 1
+        try:
+            return self._pool.submit(self._call, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._pending -= 1
+                self.completed += 1
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._pending - self._in_flight,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
@@ -1,10 +1,70 @@
-from langdetect import detect
 import re
 
+from utils import settings
+
 TELUGU_RANGE = re.compile(r"[\u0C00-\u0C7F]")
 
+# Share of Latin letters (among Telugu + Latin letters) below which text is
+# still labelled 'te', so units and brand fragments like "500mg" don't flip
+# an otherwise Telugu query to 'mixed'.
+TE_MAX_LATIN_SHARE = 0.2
+# In "hybrid" mode, Telugu/Latin mixes with a Latin share below this bound
+# are close enough to call that langdetect decides between 'te' and 'mixed'.
+AMBIGUOUS_MAX_LATIN_SHARE = 0.5
 
-def detect_language(text: str) -> str:
+_langdetect = None
+
+
+def _detect_statistical(text: str) -> str:
+    """langdetect, imported on first use and seeded so results are repeatable."""
+    global _langdetect
+    if _langdetect is None:
+        from langdetect import DetectorFactory, detect
+        DetectorFactory.seed = 0
+        _langdetect = detect
+    return _langdetect(text)
+
+
+def _script_counts(text: str):
+    """Count Telugu and Latin letters in a single pass over the string."""
+    te = latin = 0
+    for ch in text:
+        if "\u0c00" <= ch <= "\u0c7f":
+            te += 1
+        elif ch.isalpha() and ch < "\u0250":  # Basic Latin through Latin Extended-B
+            latin += 1
+    return te, latin
+
+
+def detect_language_fast(text: str, fallback: bool = False) -> str:
+    """
+    Classify 'en', 'te', or 'mixed' from script ratios.
+
+    Latin-only input is always 'en': langdetect's Telugu profile is
+    script-based, so romanized Telugu never came back as 'te' either. With
+    ``fallback=True``, Telugu text with a sizeable Latin share is passed to
+    langdetect to choose between 'te' and 'mixed'.
+    """
+    text = text.strip()
+    if not text or text.isascii():
+        return 'en'
+
+    te, latin = _script_counts(text)
+    if te == 0:
+        return 'en'
+
+    latin_share = latin / (te + latin)
+    if latin_share < TE_MAX_LATIN_SHARE:
+        return 'te'
+    if fallback and latin_share < AMBIGUOUS_MAX_LATIN_SHARE:
+        try:
+            return 'te' if _detect_statistical(text) == 'te' else 'mixed'
+        except Exception:
+            pass
+    return 'mixed'
+
+
+def detect_language_langdetect(text: str) -> str:
     """
     Detect language label: 'en', 'te', or 'mixed'.
     - Uses langdetect primary signal
@@ -17,7 +77,7 @@ def detect_language(text: str) -> str:
     has_te_chars = bool(TELUGU_RANGE.search(text))
 
     try:
-        lang = detect(text)
+        lang = _detect_statistical(text)
     except Exception:
         # Fallback to unicode heuristic
         return 'te' if has_te_chars else 'en'
@@ -29,3 +89,12 @@ def detect_language(text: str) -> str:
         return 'te'
 
     return 'en'
+
+
+def detect_language(text: str) -> str:
+    """Detect 'en', 'te', or 'mixed' using the detector chosen by LANG_DETECTOR."""
+    if settings.LANG_DETECTOR not in settings.LANG_DETECTORS:
+        raise ValueError(f"LANG_DETECTOR must be one of {settings.LANG_DETECTORS}")
+    if settings.LANG_DETECTOR == "langdetect":
+        return detect_language_langdetect(text)
+    return detect_language_fast(text, fallback=settings.LANG_DETECTOR == "hybrid")
@@ -0,0 +1,54 @@
+"""
+English -> Telugu medicine-name lookup table.
+
+Seeded from the backend's `Medicine.name_te` column via
+`python manage.py export_medicine_names` (see Backend/medicines). Names found
+here never need a round trip through the translation model.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'medicine_names_te.json')
+
+
+class MedicineNameTable:
+    def __init__(self, path: str | None = None):
+        self.path = path or DEFAULT_PATH
+        self._names: Dict[str, str] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            self._names = {}
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not read medicine name table %s: %s", self.path, exc)
+            data = {}
+        self._names = {str(en).casefold().strip(): str(te) for en, te in data.items() if te}
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Telugu name for `name`, or None. Falls back to the longest known
+        leading phrase so "Paracetamol 500mg" maps to "<Telugu> 500mg".
+        """
+        key = name.casefold().strip()
+        if key in self._names:
+            return self._names[key]
+        words = name.split()
+        for end in range(len(words) - 1, 0, -1):
+            te = self._names.get(' '.join(words[:end]).casefold())
+            if te is not None:
+                return ' '.join([te] + words[end:])
+        return None
+
+    def __len__(self) -> int:
+        return len(self._names)
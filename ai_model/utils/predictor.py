@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import os
-import json
 from dataclasses import dataclass
 from typing import List
 
+import numpy as np
 import pandas as pd
-import torch
-from sentence_transformers import SentenceTransformer, util
+
+from utils import metrics, settings
+from utils.aggregation import AGGREGATION_MODES, MedicineMatrix
+from utils.cache import QueryEmbeddingCache
+from utils.encoders import create_encoder, require_backend
+from utils.embedding_store import SUPPORTED_DTYPES, EmbeddingStore, file_sha256, row_key
+from utils.vector_index import index_path, load_or_build_index
+
+# Fail at import time when the encoder runtime is missing so callers can fall
+# back to the lite predictor.
+require_backend(settings.ENCODER_BACKEND)
 
 
 DEFAULT_DATASET_PATHS = [
@@ -15,8 +24,8 @@ DEFAULT_DATASET_PATHS = [
     os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'Ai', 'symptoms_medicines_en.csv'),
 ]
 
-MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
-EMB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'medicine_predictor.pt')
+MODEL_NAME = settings.MODEL_NAME
+EMB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'medicine_predictor.npy')
 META_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'medicine_predictor_meta.json')
 
 
@@ -27,14 +36,67 @@ class Suggestion:
 
 
 class MedicinePredictor:
-    def __init__(self, dataset_path: str | None = None, device: str | None = None):
+    def __init__(self, dataset_path: str | None = None, device: str | None = None,
+                 index_backend: str | None = None, encoder_backend: str | None = None,
+                 encoder=None, query_cache: QueryEmbeddingCache | None = None,
+                 secondary=None):
         self.dataset_path = dataset_path or self._resolve_dataset_path()
-        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model = SentenceTransformer(MODEL_NAME, device=self.device)
+        # `encoder` / `query_cache` let reloaded() share them with a running predictor
+        self.encoder = encoder or create_encoder(
+            encoder_backend or settings.ENCODER_BACKEND, MODEL_NAME,
+            device=device, quantize=settings.ONNX_QUANTIZE, threads=settings.ENCODER_THREADS)
         self.symptoms: List[str] = []
         self.medicines_lists: List[List[str]] = []
-        self.embeddings: torch.Tensor | None = None
+        self.embeddings: np.ndarray | None = None
+        self.dataset_hash: str | None = None
+        self.index = None
+        self.index_backend = index_backend or settings.INDEX_BACKEND
+        # Row counts from the last _load_or_build (reused/encoded/removed)
+        self.build_stats: dict = {}
+        self.query_cache = query_cache or QueryEmbeddingCache(
+            f"{MODEL_NAME}:{self.encoder.name}",
+            dim=self.encoder.dimension,
+            maxsize=settings.QUERY_EMBED_CACHE_SIZE,
+            spill_path=settings.QUERY_EMBED_SPILL_PATH or None,
+            spill_capacity=settings.QUERY_EMBED_SPILL_CAPACITY,
+        )
         self._load_or_build()
+        self._build_index(self.index_backend)
+        # Optional second retrieval source (drugs.com corpus), merged by score
+        self.secondary = secondary
+        if self.secondary is None and settings.DRUGS_CORPUS:
+            from utils.drug_corpus import DrugCorpusIndex
+            self.secondary = DrugCorpusIndex(self.encoder, MODEL_NAME,
+                                             settings.DRUGS_CORPUS_PATH or None,
+                                             index_backend=self.index_backend,
+                                             max_medicines=settings.DRUGS_CORPUS_MAX_MEDICINES)
+        # Sparse row -> medicine matrix over curated rows, then corpus rows
+        extra = self.secondary.medicines_lists if self.secondary is not None else []
+        self.medicine_matrix = MedicineMatrix(self.medicines_lists + extra)
+        if settings.AGGREGATION not in AGGREGATION_MODES:
+            raise ValueError(f"AGGREGATION must be one of {AGGREGATION_MODES}")
+
+    def reloaded(self) -> "MedicinePredictor":
+        """
+        A new predictor for the current contents of the dataset, sharing this
+        one's encoder and query cache. Only rows with new symptom text are
+        encoded; this predictor keeps serving unchanged until it is swapped out.
+        """
+        return MedicinePredictor(self.dataset_path, index_backend=self.index_backend,
+                                 encoder=self.encoder, query_cache=self.query_cache,
+                                 secondary=self.secondary)
+
+    @property
+    def version(self) -> str:
+        """Identifies the dataset + model combination; used to invalidate caches."""
+        version = f"ml:{MODEL_NAME}:{self.encoder.name}:{self.dataset_hash}"
+        if self.secondary is not None:
+            version += f":drugs-com:{self.secondary.corpus_hash[:16]}:{settings.DRUGS_CORPUS_WEIGHT}"
+        if settings.AGGREGATION != 'max':
+            version += f":{settings.AGGREGATION}:{settings.AGGREGATION_TEMPERATURE}"
+        if settings.CANDIDATE_ROWS:
+            version += f":rows{settings.CANDIDATE_ROWS}"
+        return version
 
     def _resolve_dataset_path(self) -> str:
         for p in DEFAULT_DATASET_PATHS:
@@ -53,48 +115,111 @@ class MedicinePredictor:
         self.medicines_lists = [str(m).split('|') for m in df['medicines'].fillna('')]
 
     def _load_or_build(self):
-        try:
-            if os.path.exists(EMB_PATH) and os.path.exists(META_PATH):
-                data = torch.load(EMB_PATH, map_location='cpu')
-                self.embeddings = data
-                with open(META_PATH, 'r', encoding='utf-8') as f:
-                    meta = json.load(f)
-                self.symptoms = meta['symptoms']
-                self.medicines_lists = meta['medicines_lists']
-                return
-        except Exception:
-            # fall through to rebuild
-            pass
-
-        # build from dataset
+        """
+        Load the memory-mapped embedding cache. When the CSV changed, rows whose
+        symptom text is already in the cache reuse their vectors and only new
+        text is encoded; a model or dtype change re-encodes everything.
+        """
         self._load_dataset()
-        emb = self.model.encode(self.symptoms, convert_to_tensor=True, show_progress_bar=False)
-        self.embeddings = emb.cpu()
-        torch.save(self.embeddings, EMB_PATH)
-        with open(META_PATH, 'w', encoding='utf-8') as f:
-            json.dump({'symptoms': self.symptoms, 'medicines_lists': self.medicines_lists}, f, ensure_ascii=False)
+        if settings.EMBEDDING_DTYPE not in SUPPORTED_DTYPES:
+            raise ValueError(f"EMBEDDING_DTYPE must be one of {SUPPORTED_DTYPES}")
+        self.dataset_hash = file_sha256(self.dataset_path)
+        compatible = {
+            'model_name': MODEL_NAME,
+            'encoder': self.encoder.name,
+            'dtype': settings.EMBEDDING_DTYPE,
+            'normalized': True,
+        }
+        store = EmbeddingStore(EMB_PATH, META_PATH)
+        old = store.load(compatible)
+        if (old is not None and store.meta.get('dataset_sha256') == self.dataset_hash
+                and len(old) == len(self.symptoms)):
+            self.embeddings = old
+            self.build_stats = {'rows': len(old), 'reused': len(old), 'encoded': 0, 'removed': 0}
+            return
+
+        keys = [row_key(text) for text in self.symptoms]
+        old_keys = store.load_keys() if old is not None else None
+        if old_keys is None or len(old_keys) != len(old):
+            old_keys = []
+        old_rows = {key: i for i, key in enumerate(old_keys)}
+
+        # int8 rows are staged as float32 and quantized by the store
+        staging = np.float32 if settings.EMBEDDING_DTYPE == 'int8' else settings.EMBEDDING_DTYPE
+        emb = np.empty((len(keys), self.encoder.dimension), dtype=staging)
+        reuse = [(i, old_rows[key]) for i, key in enumerate(keys) if key in old_rows]
+        if reuse:
+            dst, src = map(list, zip(*reuse))
+            emb[dst] = old[src]
+        # Encode each new symptom text once, however many rows share it
+        reused = {i for i, _ in reuse}
+        todo = {}
+        for i, text in enumerate(self.symptoms):
+            if i not in reused:
+                todo.setdefault(text, []).append(i)
+        if todo:
+            vectors = self.encoder.encode(list(todo))
+            for rows, vector in zip(todo.values(), vectors):
+                emb[rows] = vector
+        self.embeddings = store.save(emb, dict(compatible, dataset_sha256=self.dataset_hash), keys,
+                                     dtype=settings.EMBEDDING_DTYPE)
+        self.build_stats = {
+            'rows': len(keys),
+            'reused': len(reuse),
+            'encoded': len(todo),
+            'removed': len(set(old_keys) - set(keys)),
+        }
+
+    def _build_index(self, backend: str):
+        """Load the persisted nearest-neighbour index for these embeddings, or build it once."""
+        fingerprint = f"{MODEL_NAME}:{self.encoder.name}:{self.dataset_hash}:{self.embeddings.dtype}"
+        params = {}
+        if backend == 'ivf':
+            params = {'nlist': settings.IVF_NLIST or None, 'nprobe': settings.IVF_NPROBE}
+        self.index = load_or_build_index(backend, self.embeddings, index_path(EMB_PATH, backend),
+                                         fingerprint, normalized=True, **params)
 
     def predict(self, query: str, top_k: int = 5) -> List[Suggestion]:
-        if not query.strip():
-            return []
-        if self.embeddings is None:
-            return []
-        q_emb = self.model.encode([query], convert_to_tensor=True, show_progress_bar=False)
-        cos_scores = util.cos_sim(q_emb, self.embeddings)[0]
-        top_k = min(top_k, len(self.symptoms))
-        top_results = torch.topk(cos_scores, k=top_k)
-        # Aggregate medicines from top rows, keep unique order by best score
-        agg = []
-        seen = set()
-        for score, idx in zip(top_results.values.tolist(), top_results.indices.tolist()):
-            meds = self.medicines_lists[idx]
-            for med in meds:
-                med = med.strip()
-                if med and med not in seen:
-                    seen.add(med)
-                    agg.append(Suggestion(medicine=med, score=float(score)))
-                if len(agg) >= top_k:
-                    break
-            if len(agg) >= top_k:
-                break
-        return agg
+        return self.predict_batch([query], top_k=top_k)[0]
+
+    def predict_batch(self, queries: List[str], top_k: int = 5) -> List[List[Suggestion]]:
+        """Predict for many queries with a single encode and similarity pass."""
+        results: List[List[Suggestion]] = [[] for _ in queries]
+        if self.index is None:
+            return results
+        active = [i for i, q in enumerate(queries) if q.strip()]
+        if not active:
+            return results
+        with metrics.stage('encode'):
+            q_emb = self._encode_queries([queries[i] for i in active])
+        n_rows = settings.CANDIDATE_ROWS or top_k
+        with metrics.stage('search'):
+            top_scores, top_indices = self.index.search(q_emb, min(n_rows, len(self.symptoms)))
+            secondary = self.secondary
+            if secondary is not None and len(secondary):
+                sec_scores, sec_indices = secondary.index.search(q_emb, min(n_rows, len(secondary)))
+                # Corpus rows follow the curated rows in medicine_matrix; curated
+                # rows come first so they win ties
+                top_scores = np.concatenate([top_scores, sec_scores * settings.DRUGS_CORPUS_WEIGHT], axis=1)
+                top_indices = np.concatenate(
+                    [top_indices, np.where(sec_indices >= 0, sec_indices + len(self.symptoms), -1)], axis=1)
+        # One row -> medicine aggregation for the whole batch
+        with metrics.stage('aggregate'):
+            aggregated = self.medicine_matrix.aggregate_batch(
+                top_indices, top_scores, top_k,
+                mode=settings.AGGREGATION, temperature=settings.AGGREGATION_TEMPERATURE)
+        for i, pairs in zip(active, aggregated):
+            results[i] = [Suggestion(medicine=med, score=score) for med, score in pairs]
+        return results
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode queries, reusing cached vectors and encoding each new string once."""
+        texts = [self.query_cache.normalize(q) for q in queries]
+        cached = self.query_cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t in texts if t not in cached))
+        if missing:
+            emb = self.encoder.encode(missing, batch_size=max(32, len(missing)))
+            fresh = dict(zip(missing, emb))
+            self.query_cache.set_many(fresh)
+            cached.update(fresh)
+        return np.stack([cached[t] for t in texts])
@@ -6,10 +6,18 @@ from __future__ import annotations
 
 import os
 import json
+import math
+from collections import Counter
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
+
+import numpy as np
 import pandas as pd
 
+from utils import metrics, settings
+from utils.aggregation import AGGREGATION_MODES, MedicineMatrix
+from utils.embedding_store import file_sha256
+
 
 DEFAULT_DATASET_PATHS = [
     os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'symptoms_medicines_en.csv'),
@@ -17,6 +25,15 @@ DEFAULT_DATASET_PATHS = [
 ]
 
 
+SCORING_MODES = ('overlap', 'bm25', 'tfidf')
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _tokenize(text: str) -> List[str]:
+    return text.lower().replace(';', ' ').split()
+
+
 @dataclass
 class Suggestion:
     medicine: str
@@ -26,12 +43,41 @@ class Suggestion:
 class MedicinePredictor:
     """Simple keyword-based predictor. Upgrades to ML when deps available."""
     
-    def __init__(self, dataset_path: str | None = None):
+    def __init__(self, dataset_path: str | None = None, scoring: str | None = None):
         self.dataset_path = dataset_path or self._resolve_dataset_path()
+        self.scoring = scoring or settings.LITE_SCORING
+        if self.scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown lite scoring '{self.scoring}'. Choose from: {SCORING_MODES}")
         self.symptoms: List[str] = []
         self.medicines_lists: List[List[str]] = []
+        # token -> (row ids, per-row weight) postings, built once at load time
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._row_lengths = np.zeros(0, dtype=np.int32)
+        self._idf: Dict[str, float] = {}
+        self.medicine_matrix = MedicineMatrix([])
+        self.dataset_hash: str | None = None
+        if settings.AGGREGATION not in AGGREGATION_MODES:
+            raise ValueError(f"AGGREGATION must be one of {AGGREGATION_MODES}")
         self._load_dataset()
 
+    def reloaded(self) -> "MedicinePredictor":
+        """A new predictor for the current dataset contents (the index is cheap to rebuild)."""
+        return MedicinePredictor(self.dataset_path, self.scoring)
+
+    @property
+    def build_stats(self) -> dict:
+        return {'rows': len(self.symptoms)}
+
+    @property
+    def version(self) -> str:
+        """Identifies the dataset + scoring combination; used to invalidate caches."""
+        version = f"lite:{self.scoring}:{self.dataset_hash}"
+        if settings.AGGREGATION != 'max':
+            version += f":{settings.AGGREGATION}:{settings.AGGREGATION_TEMPERATURE}"
+        if settings.CANDIDATE_ROWS:
+            version += f":rows{settings.CANDIDATE_ROWS}"
+        return version
+
     def _resolve_dataset_path(self) -> str:
         for p in DEFAULT_DATASET_PATHS:
             if os.path.exists(p):
@@ -46,41 +92,106 @@ class MedicinePredictor:
             raise ValueError("Dataset must have 'symptoms' and 'medicines' columns")
         self.symptoms = [str(s).lower() for s in df['symptoms'].fillna('')]
         self.medicines_lists = [str(m).split('|') for m in df['medicines'].fillna('')]
+        self.medicine_matrix = MedicineMatrix(self.medicines_lists)
+        self.dataset_hash = file_sha256(self.dataset_path)
+        self._build_index()
+
+    def _build_index(self):
+        """Precompute the token -> rows inverted index and per-posting weights."""
+        doc_tokens = [Counter(_tokenize(text)) for text in self.symptoms]
+        n_docs = len(doc_tokens)
+        # Unique-word count per row, as used by the overlap score
+        self._row_lengths = np.array([len(tokens) for tokens in doc_tokens], dtype=np.int32)
+        doc_lengths = np.array([sum(tokens.values()) for tokens in doc_tokens], dtype=np.float32)
+        avg_len = float(doc_lengths.mean()) if n_docs else 0.0
+
+        rows: Dict[str, List[int]] = {}
+        tfs: Dict[str, List[int]] = {}
+        for idx, tokens in enumerate(doc_tokens):
+            for token, tf in tokens.items():
+                rows.setdefault(token, []).append(idx)
+                tfs.setdefault(token, []).append(tf)
+
+        self._idf = {
+            token: math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for token, ids in rows.items()
+        }
+        doc_norms = np.zeros(n_docs, dtype=np.float32)
+        if self.scoring == 'tfidf':
+            for token, ids in rows.items():
+                doc_norms[ids] += (np.array(tfs[token], dtype=np.float32) * self._idf[token]) ** 2
+            doc_norms = np.sqrt(doc_norms)
+            doc_norms[doc_norms == 0] = 1.0
+
+        self._postings = {}
+        for token, ids in rows.items():
+            ids_arr = np.array(ids, dtype=np.int64)
+            tf = np.array(tfs[token], dtype=np.float32)
+            idf = self._idf[token]
+            if self.scoring == 'bm25':
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[ids_arr] / max(avg_len, 1e-9))
+                weights = idf * tf * (BM25_K1 + 1) / (tf + norm)
+            elif self.scoring == 'tfidf':
+                # Contribution to cosine(query, doc) with a binary idf-weighted query
+                weights = idf * idf * tf / doc_norms[ids_arr]
+            else:
+                weights = np.ones(len(ids_arr), dtype=np.float32)
+            self._postings[token] = (ids_arr, weights.astype(np.float32))
+
+    def _top_rows(self, query_words, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The `n_rows` best (row ids, scores), best first; ties go to the higher
+        row id. Only rows sharing a token with the query get a score.
+        """
+        hits = [self._postings[w] for w in query_words if w in self._postings]
+        if not hits:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        if len(hits) == 1:
+            rows, totals = hits[0][0], hits[0][1].astype(np.float64)
+        else:
+            # Accumulate into a dense per-row array (index = row id): much
+            # cheaper than merging the postings, which needs a sort
+            rows = None
+            totals = np.bincount(np.concatenate([ids for ids, _ in hits]),
+                                 weights=np.concatenate([weights for _, weights in hits]),
+                                 minlength=len(self._row_lengths))
+        if self.scoring == 'overlap':
+            # Simple score: overlap / total unique words
+            lengths = self._row_lengths if rows is None else self._row_lengths[rows]
+            totals = totals / np.maximum(len(query_words), lengths)
+        elif self.scoring == 'tfidf':
+            q_norm = math.sqrt(sum(self._idf[w] ** 2 for w in query_words if w in self._idf))
+            totals = totals / q_norm
+        # Posting weights are positive, so untouched rows are exactly the zeros
+        threshold = 0.0
+        if len(totals) > n_rows:
+            threshold = np.partition(totals, len(totals) - n_rows)[len(totals) - n_rows]
+        # Keep every row tied with the n-th best so ties resolve by row id below
+        keep = np.flatnonzero(totals >= threshold) if threshold > 0 else np.flatnonzero(totals > 0)
+        totals = totals[keep]
+        rows = keep if rows is None else rows[keep]
+        order = np.lexsort((-rows, -totals))[:n_rows]
+        return rows[order], totals[order]
 
     def predict(self, query: str, top_k: int = 5) -> List[Suggestion]:
         """Simple keyword-based matching."""
-        if not query.strip():
-            return []
-        
-        query_lower = query.lower()
-        query_words = set(query_lower.replace(';', ' ').split())
-        
-        # Score each row by keyword overlap
-        scores = []
-        for idx, symptom_text in enumerate(self.symptoms):
-            symptom_words = set(symptom_text.replace(';', ' ').split())
-            overlap = len(query_words & symptom_words)
-            if overlap > 0:
-                # Simple score: overlap / total unique words
-                score = overlap / max(len(query_words), len(symptom_words))
-                scores.append((score, idx))
-        
-        # Sort by score descending
-        scores.sort(reverse=True)
-        
-        # Collect unique medicines
-        results = []
-        seen = set()
-        for score, idx in scores[:top_k]:
-            meds = self.medicines_lists[idx]
-            for med in meds:
-                med = med.strip()
-                if med and med not in seen:
-                    seen.add(med)
-                    results.append(Suggestion(medicine=med, score=float(score)))
-                if len(results) >= top_k:
-                    break
-            if len(results) >= top_k:
-                break
-        
-        return results
+        return self.predict_batch([query], top_k=top_k)[0]
+
+    def predict_batch(self, queries: List[str], top_k: int = 5) -> List[List[Suggestion]]:
+        """Keyword scoring per query, then one medicine aggregation for the batch."""
+        n_rows = settings.CANDIDATE_ROWS or top_k
+        rows = np.full((len(queries), n_rows), -1, dtype=np.int64)
+        row_scores = np.zeros((len(queries), n_rows), dtype=np.float64)
+        with metrics.stage('search'):
+            for q, query in enumerate(queries):
+                if not query.strip():
+                    continue
+                best_rows, best_scores = self._top_rows(set(_tokenize(query)), n_rows)
+                rows[q, :len(best_rows)] = best_rows
+                row_scores[q, :len(best_rows)] = best_scores
+        with metrics.stage('aggregate'):
+            aggregated = self.medicine_matrix.aggregate_batch(
+                rows, row_scores, top_k,
+                mode=settings.AGGREGATION, temperature=settings.AGGREGATION_TEMPERATURE)
+        return [[Suggestion(medicine=med, score=score) for med, score in pairs]
+                for pairs in aggregated]
@@ -0,0 +1,132 @@
+"""
+Runtime settings for the AI service, read from environment variables.
+"""
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+# Sentence-transformer used for symptom embeddings. Changing it invalidates
+# the on-disk embedding cache automatically.
+MODEL_NAME = os.environ.get("MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Encoder runtime: "torch" (sentence-transformers) or "onnx" (onnxruntime on
+# CPU, exported once to models/onnx/). ONNX_QUANTIZE=true runs an int8
+# dynamically quantized copy of the ONNX model.
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+ONNX_QUANTIZE = _env_bool("ONNX_QUANTIZE", False)
+# Intra-op threads for the encoder runtime; 0 keeps the library default
+ENCODER_THREADS = int(os.environ.get("ENCODER_THREADS", "0"))
+
+# Storage precision of the cached embedding matrix: "float32", "float16" or
+# "int8" (per-row scale; a quarter of the float32 memory)
+EMBEDDING_DTYPE = os.environ.get("EMBEDDING_DTYPE", "float32")
+
+# How models are loaded:
+#   "background" - bind immediately, warm models on a background thread (default)
+#   "lazy"       - load on the first prediction request
+#   "eager"      - load while importing app.api (used by the preforking launcher)
+# Prediction requests wait up to READY_TIMEOUT_S for loading before a 503.
+STARTUP_MODE = os.environ.get("STARTUP_MODE", "background")
+READY_TIMEOUT_S = float(os.environ.get("READY_TIMEOUT_S", "60"))
+
+# Upper bound on items accepted by /predict_medicine_batch
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "256"))
+
+# Micro-batching of concurrent /predict_medicine calls into one encoder pass.
+# A batch is flushed when BATCH_MAX_SIZE queries are waiting or BATCH_WINDOW_MS
+# has elapsed since the first one arrived, whichever comes first.
+MICRO_BATCHING = _env_bool("MICRO_BATCHING", True)
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "64"))
+
+# Nearest-neighbour index over symptom embeddings: "exact" (brute force) or
+# "ivf" (inverted file). IVF_NLIST=0 picks sqrt(rows) buckets; IVF_NPROBE is
+# the number of buckets scanned per query (higher = better recall, slower).
+INDEX_BACKEND = os.environ.get("INDEX_BACKEND", "exact")
+IVF_NLIST = int(os.environ.get("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "8"))
+
+# Lite (keyword) predictor scoring: "overlap" (shared words / unique words),
+# "bm25" or "tfidf"
+LITE_SCORING = os.environ.get("LITE_SCORING", "overlap")
+
+# Response cache for /predict_medicine keyed on the normalized query.
+# RESPONSE_CACHE_PATH enables a shared SQLite tier that survives restarts and
+# is shared by all workers; leave empty for in-process LRU only.
+RESPONSE_CACHE = _env_bool("RESPONSE_CACHE", True)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", "")
+# Shared entries from other dataset/model versions are pruned once unwritten
+# for this many seconds (other workers may still be serving that version).
+RESPONSE_CACHE_PRUNE_AGE = float(os.environ.get("RESPONSE_CACHE_PRUNE_AGE", "86400"))
+
+# Cache of encoder outputs per normalized query inside the ML predictor.
+# QUERY_EMBED_CACHE_SIZE=0 disables the in-process LRU; set
+# QUERY_EMBED_SPILL_PATH to also keep vectors in a memory-mapped file.
+QUERY_EMBED_CACHE_SIZE = int(os.environ.get("QUERY_EMBED_CACHE_SIZE", "4096"))
+QUERY_EMBED_SPILL_PATH = os.environ.get("QUERY_EMBED_SPILL_PATH", "")
+QUERY_EMBED_SPILL_CAPACITY = int(os.environ.get("QUERY_EMBED_SPILL_CAPACITY", "65536"))
+
+# Translator used by the API:
+#   "auto"   - MarianMT (utils/translator.py) when transformers, sentencepiece
+#              and the model weights load; otherwise the lite translator
+#   "marian" - MarianMT; fail loading if it is unavailable
+#   "lite"   - name table only, no translation model
+TRANSLATOR = os.environ.get("TRANSLATOR", "auto").lower()
+TRANSLATORS = ("auto", "marian", "lite")
+
+# Translation: per-direction LRU size for MarianMT outputs, and the
+# English -> Telugu medicine-name table (default data/medicine_names_te.json,
+# regenerate with `python manage.py export_medicine_names` in Backend/)
+TRANSLATION_CACHE_SIZE = int(os.environ.get("TRANSLATION_CACHE_SIZE", "4096"))
+MEDICINE_NAMES_PATH = os.environ.get("MEDICINE_NAMES_PATH", "")
+
+# Language detection on the request path:
+#   "fast"       - Telugu/Latin script ratio only, no langdetect (default)
+#   "hybrid"     - script ratio, langdetect for borderline Telugu/Latin mixes
+#   "langdetect" - the original langdetect-first detector
+LANG_DETECTOR = os.environ.get("LANG_DETECTOR", "fast").lower()
+LANG_DETECTORS = ("fast", "hybrid", "langdetect")
+
+# Dedicated inference thread pool with backpressure. Once INFERENCE_QUEUE_SIZE
+# tasks (or micro-batched queries) are waiting, new predictions get a 503 with
+# Retry-After: OVERLOAD_RETRY_AFTER_S instead of queueing. 0 = unbounded.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("INFERENCE_QUEUE_SIZE", "128"))
+OVERLOAD_RETRY_AFTER_S = int(os.environ.get("OVERLOAD_RETRY_AFTER_S", "1"))
+
+# Rows per inference call for the streaming /predict_medicine_stream endpoint
+# and bulk_predict.py
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "64"))
+
+# Dataset hot reload. DATASET_WATCH_INTERVAL_S > 0 polls the CSV and reloads
+# when it changes; POST /admin/reload_dataset does the same on demand and is
+# only enabled when ADMIN_TOKEN is set (sent as the X-Admin-Token header).
+DATASET_WATCH_INTERVAL_S = float(os.environ.get("DATASET_WATCH_INTERVAL_S", "0"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Second retrieval source: the drugs.com corpus (Ai/drugs_side_effects_drugs_com.csv.zip),
+# one document per condition with its most-reviewed drugs. Only used by the ML
+# predictor; hits are merged with the curated dataset by score after scaling by
+# DRUGS_CORPUS_WEIGHT.
+DRUGS_CORPUS = _env_bool("DRUGS_CORPUS", False)
+DRUGS_CORPUS_PATH = os.environ.get("DRUGS_CORPUS_PATH", "")
+DRUGS_CORPUS_WEIGHT = float(os.environ.get("DRUGS_CORPUS_WEIGHT", "1.0"))
+DRUGS_CORPUS_MAX_MEDICINES = int(os.environ.get("DRUGS_CORPUS_MAX_MEDICINES", "10"))
+
+# How retrieved rows are turned into per-medicine scores:
+#   "max"     - a medicine scores as its best row (original ranking)
+#   "softmax" - sum over its rows of softmax(row score / AGGREGATION_TEMPERATURE)
+#               * row score, rewarding medicines backed by several rows
+# CANDIDATE_ROWS rows are retrieved per query (0 = the requested top_k).
+AGGREGATION = os.environ.get("AGGREGATION", "max")
+AGGREGATION_TEMPERATURE = float(os.environ.get("AGGREGATION_TEMPERATURE", "0.05"))
+CANDIDATE_ROWS = int(os.environ.get("CANDIDATE_ROWS", "0"))
+
+# Return a Server-Timing header (per-stage milliseconds) on prediction
+# responses; stage histograms are always exported at /metrics.
+SERVER_TIMING = _env_bool("SERVER_TIMING", True)
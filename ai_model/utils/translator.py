@@ -1,20 +1,36 @@
-from functools import lru_cache
+from typing import List
 
 from transformers import MarianMTModel, MarianTokenizer
 
+from utils import settings
+from utils.cache import LRUCache
+from utils.name_table import MedicineNameTable
+
 
 class MarianTranslator:
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, cache_size: int = 4096, max_batch_size: int = 32):
         self.model_name = model_name
         self.tokenizer = MarianTokenizer.from_pretrained(model_name)
         self.model = MarianMTModel.from_pretrained(model_name)
+        self.max_batch_size = max_batch_size
+        # Per-instance cache (an lru_cache on the method would key on `self`)
+        self._cache = LRUCache(maxsize=cache_size)
 
-    @lru_cache(maxsize=256)
     def translate_text(self, text: str) -> str:
-        batch = self.tokenizer([text], return_tensors="pt", padding=True)
-        gen = self.model.generate(**batch, max_length=256)
-        out = self.tokenizer.batch_decode(gen, skip_special_tokens=True)
-        return out[0]
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """Translate many strings; uncached ones go through one padded generate() per chunk."""
+        results = {t: self._cache.get(t) for t in dict.fromkeys(texts)}
+        missing = [t for t, out in results.items() if out is None]
+        for start in range(0, len(missing), self.max_batch_size):
+            chunk = missing[start:start + self.max_batch_size]
+            batch = self.tokenizer(chunk, return_tensors="pt", padding=True)
+            gen = self.model.generate(**batch, max_length=256)
+            for text, out in zip(chunk, self.tokenizer.batch_decode(gen, skip_special_tokens=True)):
+                self._cache.set(text, out)
+                results[text] = out
+        return [results[t] for t in texts]
 
 
 class TranslatorService:
@@ -23,11 +39,25 @@ class TranslatorService:
     def __init__(self,
                  te_to_en_model: str = "Helsinki-NLP/opus-mt-te-en",
                  en_to_te_model: str = "Helsinki-NLP/opus-mt-en-te"):
-        self._te_en = MarianTranslator(te_to_en_model)
-        self._en_te = MarianTranslator(en_to_te_model)
+        self._te_en = MarianTranslator(te_to_en_model, cache_size=settings.TRANSLATION_CACHE_SIZE)
+        self._en_te = MarianTranslator(en_to_te_model, cache_size=settings.TRANSLATION_CACHE_SIZE)
+        self.names = MedicineNameTable(settings.MEDICINE_NAMES_PATH or None)
 
     def te_to_en(self, text: str) -> str:
         return self._te_en.translate_text(text)
 
+    def te_to_en_batch(self, texts: List[str]) -> List[str]:
+        return self._te_en.translate_batch(texts)
+
     def en_to_te(self, text: str) -> str:
-        return self._en_te.translate_text(text)
+        return self.en_to_te_batch([text])[0]
+
+    def en_to_te_batch(self, texts: List[str]) -> List[str]:
+        """Medicine names from the lookup table first; the rest in one model batch."""
+        out = [self.names.lookup(t) for t in texts]
+        missing = [i for i, te in enumerate(out) if te is None]
+        if missing:
+            translated = self._en_te.translate_batch([texts[i] for i in missing])
+            for i, te in zip(missing, translated):
+                out[i] = te
+        return out
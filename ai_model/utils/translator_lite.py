@@ -3,7 +3,10 @@ Lightweight translator - no ML dependencies required.
 Returns text as-is (identity function) for development/testing.
 For real translation, install: pip install transformers sentencepiece torch
 """
-from functools import lru_cache
+from typing import List
+
+from utils import settings
+from utils.name_table import MedicineNameTable
 
 
 class TranslatorService:
@@ -12,7 +15,8 @@ class TranslatorService:
     
     In lite mode:
     - Telugu to English: Returns original text with note
-    - English to Telugu: Returns original text
+    - English to Telugu: Known medicine names from the name table,
+      otherwise the original text
     
     To enable real translation, ensure transformers + sentencepiece are installed.
     """
@@ -22,8 +26,8 @@ class TranslatorService:
                  en_to_te_model: str = "Helsinki-NLP/opus-mt-en-te"):
         # Lite mode - no actual translation
         self._mode = "lite"
+        self.names = MedicineNameTable(settings.MEDICINE_NAMES_PATH or None)
 
-    @lru_cache(maxsize=256)
     def te_to_en(self, text: str) -> str:
         """
         In lite mode: Returns text as-is with a note.
@@ -33,10 +37,14 @@ class TranslatorService:
         # The predictor will still work with Telugu keywords if they match
         return text
 
-    @lru_cache(maxsize=256)
+    def te_to_en_batch(self, texts: List[str]) -> List[str]:
+        return [self.te_to_en(t) for t in texts]
+
     def en_to_te(self, text: str) -> str:
         """
-        In lite mode: Returns text as-is.
-        English medicine names stay in English.
+        In lite mode: Telugu name from the lookup table if known, else text as-is.
         """
-        return text
+        return self.names.lookup(text) or text
+
+    def en_to_te_batch(self, texts: List[str]) -> List[str]:
+        return [self.en_to_te(t) for t in texts]
@@ -0,0 +1,216 @@
+"""
+Nearest-neighbour indexes over L2-normalized symptom embeddings.
+
+Backends:
+- `exact`: brute-force inner product over every row (default, recall 1.0)
+- `ivf`:   inverted-file index; rows are bucketed by spherical k-means and a
+           query only scores the rows in its `nprobe` closest buckets
+
+All backends take float32 query matrices of shape (m, dim) and return
+`(scores, indices)` arrays of shape (m, k). Slots with no candidate are
+padded with score `-inf` and index `-1`.
+
+Pass `normalized=True` for matrices that are already L2-normalized (e.g. a
+memory-mapped store) so the index references them instead of copying.
+"""
+from __future__ import annotations
+
+import os
+from typing import Tuple
+
+import numpy as np
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+_SCORE_CHUNK_ROWS = 4096
+
+
+def _scores(queries: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Inner products of queries against every matrix row, as float32."""
+    if matrix.dtype == np.float32:
+        return queries @ matrix.T
+    # int8 storage (embedding_store.QuantizedMatrix): score the codes, then
+    # apply each row's scale, instead of dequantizing the rows first
+    scales = getattr(matrix, 'scales', None)
+    rows = matrix.codes if scales is not None else matrix
+    # Upcast reduced-precision rows chunk by chunk to keep temporaries bounded
+    out = np.empty((len(queries), len(matrix)), dtype=np.float32)
+    for start in range(0, len(rows), _SCORE_CHUNK_ROWS):
+        chunk = np.asarray(rows[start:start + _SCORE_CHUNK_ROWS], dtype=np.float32)
+        out[:, start:start + len(chunk)] = queries @ chunk.T
+    if scales is not None:
+        out *= scales
+    return out
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a 2-D score matrix, sorted by descending score."""
+    m, n = scores.shape
+    k_eff = min(k, n)
+    out_scores = np.full((m, k), -np.inf, dtype=np.float32)
+    out_idx = np.full((m, k), -1, dtype=np.int64)
+    if k_eff == 0:
+        return out_scores, out_idx
+    if k_eff < n:
+        part = np.argpartition(-scores, k_eff - 1, axis=1)[:, :k_eff]
+    else:
+        part = np.broadcast_to(np.arange(n), (m, n))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    out_idx[:, :k_eff] = np.take_along_axis(part, order, axis=1)
+    out_scores[:, :k_eff] = np.take_along_axis(part_scores, order, axis=1)
+    return out_scores, out_idx
+
+
+class ExactIndex:
+    """Brute-force inner-product search."""
+
+    backend = 'exact'
+
+    def __init__(self, embeddings: np.ndarray, normalized: bool = False):
+        self.embeddings = embeddings if normalized else normalize(embeddings)
+
+    @property
+    def params(self) -> dict:
+        return {}
+
+    def build(self) -> 'ExactIndex':
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return _top_k(_scores(queries, self.embeddings), k)
+
+    def save(self, path: str, fingerprint: str) -> None:
+        # Nothing beyond the embeddings themselves to persist
+        pass
+
+    @classmethod
+    def load(cls, path: str, embeddings: np.ndarray, fingerprint: str,
+             normalized: bool = False, **params) -> 'ExactIndex | None':
+        return cls(embeddings, normalized=normalized)
+
+
+class IVFIndex:
+    """Inverted-file index with spherical k-means coarse quantizer."""
+
+    backend = 'ivf'
+
+    def __init__(self, embeddings: np.ndarray, nlist: int | None = None, nprobe: int = 8,
+                 kmeans_iters: int = 20, seed: int = 0, normalized: bool = False):
+        self.embeddings = embeddings if normalized else normalize(embeddings)
+        n = len(self.embeddings)
+        self.nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+        self.nprobe = max(1, min(nprobe, self.nlist))
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self.centroids = np.zeros((0, self.embeddings.shape[1]), dtype=np.float32)
+        self.order = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    @property
+    def params(self) -> dict:
+        return {'nlist': self.nlist, 'nprobe': self.nprobe,
+                'kmeans_iters': self.kmeans_iters, 'seed': self.seed}
+
+    def build(self) -> 'IVFIndex':
+        x = self.embeddings
+        rng = np.random.default_rng(self.seed)
+        # Train on a sample; ~256 points per centroid is plenty for k-means
+        sample_size = min(len(x), self.nlist * 256)
+        sample = np.asarray(x[np.sort(rng.choice(len(x), sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=self.nlist)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters with random sample points
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize(sums)
+        self.centroids = centroids
+
+        assign = np.empty(len(x), dtype=np.int64)
+        for start in range(0, len(x), 8192):
+            chunk = np.asarray(x[start:start + 8192], dtype=np.float32)
+            assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        self.order = np.argsort(assign, kind='stable')
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assign, minlength=self.nlist))]
+        ).astype(np.int64)
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        m = len(queries)
+        out_scores = np.full((m, k), -np.inf, dtype=np.float32)
+        out_idx = np.full((m, k), -1, dtype=np.int64)
+        coarse = queries @ self.centroids.T
+        if self.nprobe < self.nlist:
+            probes = np.argpartition(-coarse, self.nprobe - 1, axis=1)[:, :self.nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), (m, self.nlist))
+        for i in range(m):
+            ids = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes[i]])
+            if len(ids) == 0:
+                continue
+            candidates = np.asarray(self.embeddings[ids], dtype=np.float32)
+            scores, local = _top_k((candidates @ queries[i])[None, :], k)
+            found = local[0] >= 0
+            out_scores[i, found] = scores[0, found]
+            out_idx[i, found] = ids[local[0, found]]
+        return out_scores, out_idx
+
+    def save(self, path: str, fingerprint: str) -> None:
+        tmp = path + f'.{os.getpid()}.tmp.npz'
+        np.savez(tmp, fingerprint=np.array(fingerprint), centroids=self.centroids,
+                 order=self.order, offsets=self.offsets,
+                 params=np.array([self.nlist, self.kmeans_iters, self.seed]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, embeddings: np.ndarray, fingerprint: str,
+             normalized: bool = False, **params) -> 'IVFIndex | None':
+        index = cls(embeddings, normalized=normalized, **params)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if str(data['fingerprint']) != fingerprint:
+                return None
+            if data['params'].tolist() != [index.nlist, index.kmeans_iters, index.seed]:
+                return None
+            index.centroids = data['centroids']
+            index.order = data['order']
+            index.offsets = data['offsets']
+        return index
+
+
+BACKENDS = {
+    ExactIndex.backend: ExactIndex,
+    IVFIndex.backend: IVFIndex,
+}
+
+
+def index_path(base_path: str, backend: str) -> str:
+    """Index file stored next to the embedding cache, e.g. `<base>_index_ivf.npz`."""
+    root, _ = os.path.splitext(base_path)
+    return f'{root}_index_{backend}.npz'
+
+
+def load_or_build_index(backend: str, embeddings: np.ndarray, path: str, fingerprint: str,
+                        normalized: bool = False, **params):
+    """Load a persisted index matching `fingerprint`, or build and persist one."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown index backend '{backend}'. Choose from: {sorted(BACKENDS)}")
+    cls = BACKENDS[backend]
+    index = cls.load(path, embeddings, fingerprint, normalized=normalized, **params)
+    if index is None:
+        index = cls(embeddings, normalized=normalized, **params).build()
+        index.save(path, fingerprint)
+    return index
@@ -0,0 +1,68 @@
+"""
+Polling file watcher used to hot-reload the dataset when curators edit it.
+
+Polls (mtime, size) rather than relying on inotify so it behaves the same on
+every platform and on network/bind-mounted volumes.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Callable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _signature(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileWatcher:
+    """
+    Calls `on_change()` on a daemon thread after `path` changes. A change is
+    only reported once the file has stayed the same for one full interval, so
+    an editor's partial writes don't trigger a reload of a half-written file.
+    `path` may be a callable, re-evaluated on every poll (None = not yet known).
+    """
+
+    def __init__(self, path: Union[str, Callable[[], Optional[str]]],
+                 on_change: Callable[[], None], interval: float = 2.0):
+        self._path = path if callable(path) else (lambda: path)
+        self.on_change = on_change
+        self.interval = max(interval, 0.1)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        seen = _signature(self._path())
+        pending = None
+        while not self._stop.wait(self.interval):
+            current = _signature(self._path())
+            if current is None or current == seen:
+                pending = None
+                continue
+            if current != pending:
+                # Changed since the last poll; wait for it to settle
+                pending = current
+                continue
+            seen, pending = current, None
+            try:
+                self.on_change()
+            except Exception:
+                logger.exception("Reload after change to %s failed", self._path())